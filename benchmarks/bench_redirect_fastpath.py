@@ -0,0 +1,93 @@
+"""Compare per-request overhead of the redirect fast path with Starlette routing.
+
+Both ASGI apps are called directly in-process, with lookups answered from the
+redirect cache, so the difference is the framework overhead per request.
+
+    uv run python benchmarks/bench_redirect_fastpath.py --requests 100000
+"""
+
+import argparse
+import asyncio
+import time
+
+from shortener.app import app, fast_app
+from shortener.cache import UrlCache
+from shortener.settings import AppSettings
+from shortener.storage import PostgresStorage
+
+
+class _NoDatabase:
+    """Stand-in database; every lookup is expected to hit the cache."""
+
+    async def execute_one(self, query: str, *args):
+        raise AssertionError("benchmark lookup missed the cache")
+
+
+async def _receive() -> dict:
+    return {"type": "http.request", "body": b"", "more_body": False}
+
+
+async def _drive(asgi_app, keys: list[str], requests: int) -> float:
+    """Send requests GET /{key} requests through asgi_app and return seconds taken."""
+
+    async def send(message: dict) -> None:
+        if message["type"] == "http.response.start" and message["status"] != 307:
+            raise AssertionError(f"unexpected status {message['status']}")
+
+    scopes = [
+        {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": "GET",
+            "scheme": "http",
+            "path": f"/{key}",
+            "raw_path": f"/{key}".encode(),
+            "root_path": "",
+            "query_string": b"",
+            "headers": [(b"host", b"localhost")],
+            "client": ("127.0.0.1", 50000),
+            "server": ("127.0.0.1", 8000),
+            "app": app,
+        }
+        for key in keys
+    ]
+
+    start = time.perf_counter()
+    for i in range(requests):
+        await asgi_app(dict(scopes[i % len(scopes)]), _receive, send)
+    return time.perf_counter() - start
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=50000)
+    parser.add_argument("--keys", type=int, default=1000)
+    args = parser.parse_args()
+
+    keys = [f"key{i}" for i in range(args.keys)]
+    cache = UrlCache(max_size=args.keys, ttl=3600, stats_enabled=False)
+    for key in keys:
+        cache.set(key, f"https://example.com/{key}")
+
+    app.state.db = None
+    app.state.storage = PostgresStorage(_NoDatabase())  # type: ignore[arg-type]
+    app.state.settings = AppSettings()
+    app.state.url_cache = cache
+
+    # Warm up both paths before timing
+    await _drive(app, keys, 1000)
+    await _drive(fast_app, keys, 1000)
+
+    starlette_seconds = await _drive(app, keys, args.requests)
+    fast_seconds = await _drive(fast_app, keys, args.requests)
+
+    starlette_us = starlette_seconds / args.requests * 1e6
+    fast_us = fast_seconds / args.requests * 1e6
+    print(f"starlette routing: {starlette_us:8.2f} us/request")
+    print(f"asgi fast path:    {fast_us:8.2f} us/request")
+    print(f"saved:             {starlette_us - fast_us:8.2f} us/request ({starlette_us / fast_us:.1f}x faster)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,299 @@
+"""Load test of the redirect and CRUD paths with Zipf-distributed key traffic.
+
+Drives the real application either in-process through its ASGI interface or
+over a local socket served by uvicorn, against an in-memory backend or
+Postgres, and reports throughput and p50/p99/p999 latency per operation.
+Results are written as JSON; passing an earlier result file as --baseline
+fails the run if throughput or p99 latency regress by more than
+--max-regression.
+
+    uv run --extra dev python benchmarks/loadtest.py --scenario mixed --output before.json
+    uv run --extra dev python benchmarks/loadtest.py --scenario mixed --baseline before.json
+
+Backends:
+    memory          the in-process MemoryStorage backend (no database latency)
+    sqlite          the SqliteStorage backend on a temporary file
+    postgres        the database configured with the DB_* environment variables
+    testcontainers  a throwaway postgres:15 container, as used by tests/conftest.py
+"""
+
+import argparse
+import asyncio
+import contextlib
+import itertools
+import json
+import logging
+import os
+import platform
+import random
+import socket
+import sys
+import tempfile
+import time
+import uuid
+from bisect import bisect
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator
+
+import httpx
+import uvicorn
+
+from shortener.actions import bulk_create_url_targets
+from shortener.app import app, fast_app
+from shortener.server import uvicorn_options
+
+# Share of each operation in a scenario
+SCENARIOS: dict[str, dict[str, float]] = {
+    "redirect": {"redirect": 1.0},
+    "crud": {"create": 0.4, "update": 0.4, "list": 0.2},
+    "mixed": {"redirect": 0.90, "create": 0.04, "update": 0.05, "list": 0.01},
+}
+BACKENDS = ("memory", "sqlite", "postgres", "testcontainers")
+TRANSPORTS = ("inprocess", "socket")
+
+# Status code that counts as success for each operation
+_EXPECTED_STATUS = {"redirect": 307, "create": 201, "update": 200, "list": 200}
+
+_SEED_BATCH = 10000
+
+
+class ZipfKeys:
+    """Samples keys with probability proportional to 1 / rank ** s."""
+
+    def __init__(self, keys: list[str], s: float):
+        self.keys: list[str] = keys
+        self.cum_weights: list[float] = list(itertools.accumulate(1 / rank**s for rank in range(1, len(keys) + 1)))
+
+    def sample(self, rng: random.Random) -> str:
+        return self.keys[bisect(self.cum_weights, rng.random() * self.cum_weights[-1])]
+
+
+def percentiles(latencies: list[float]) -> dict[str, float]:
+    """Return p50/p99/p999 of latencies (seconds) in milliseconds."""
+    if not latencies:
+        return {"p50": 0.0, "p99": 0.0, "p999": 0.0}
+    ordered = sorted(latencies)
+    return {
+        name: round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000, 4)
+        for name, q in (("p50", 0.50), ("p99", 0.99), ("p999", 0.999))
+    }
+
+
+async def _request(client: httpx.AsyncClient, op: str, keys: ZipfKeys, rng: random.Random, run_id: str, n: int) -> int:
+    if op == "redirect":
+        response = await client.get(f"/{keys.sample(rng)}")
+    elif op == "create":
+        response = await client.post(
+            "/urls/", json={"short_url": f"b{run_id}{n}", "target_url": f"https://example.com/new/{n}"}
+        )
+    elif op == "update":
+        response = await client.put(f"/urls/{keys.sample(rng)}", json={"target_url": f"https://example.com/upd/{n}"})
+    else:
+        response = await client.get("/urls/?limit=100")
+    return response.status_code
+
+
+async def run_scenario(
+    client: httpx.AsyncClient,
+    mix: dict[str, float],
+    keys: ZipfKeys,
+    requests: int,
+    concurrency: int,
+    seed: int,
+    record: bool = True,
+) -> dict[str, Any]:
+    """Send requests operations drawn from mix with concurrency clients and summarize them."""
+    ops, weights = list(mix), list(mix.values())
+    latencies: dict[str, list[float]] = {op: [] for op in ops}
+    errors: dict[str, int] = {op: 0 for op in ops}
+    counter = itertools.count()
+    run_id = uuid.uuid4().hex[:8]
+
+    async def worker(worker_id: int) -> None:
+        rng = random.Random(seed * 1000 + worker_id)
+        while (n := next(counter)) < requests:
+            op = rng.choices(ops, weights)[0]
+            start = time.perf_counter()
+            status = await _request(client, op, keys, rng, run_id, n)
+            latencies[op].append(time.perf_counter() - start)
+            if status != _EXPECTED_STATUS[op]:
+                errors[op] += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    if not record:
+        return {}
+
+    all_latencies = [latency for op_latencies in latencies.values() for latency in op_latencies]
+    return {
+        "requests": requests,
+        "seconds": round(elapsed, 4),
+        "throughput_rps": round(requests / elapsed, 2),
+        "latency_ms": percentiles(all_latencies),
+        "errors": sum(errors.values()),
+        "operations": {
+            op: {"count": len(latencies[op]), "errors": errors[op], "latency_ms": percentiles(latencies[op])}
+            for op in ops
+            if latencies[op]
+        },
+    }
+
+
+def compare(results: dict[str, Any], baseline: dict[str, Any], max_regression: float) -> list[str]:
+    """Return a message for every scenario whose throughput or p99 regressed beyond max_regression."""
+    regressions = []
+    for field in ("backend", "transport", "concurrency"):
+        if baseline.get("meta", {}).get(field) != results["meta"][field]:
+            print(f"warning: baseline was run with a different {field}", file=sys.stderr)
+    for name, result in results["scenarios"].items():
+        previous = baseline.get("scenarios", {}).get(name)
+        if previous is None:
+            continue
+        throughput_change = result["throughput_rps"] / previous["throughput_rps"] - 1
+        p99_change = result["latency_ms"]["p99"] / max(previous["latency_ms"]["p99"], 1e-9) - 1
+        print(f"{name}: throughput {throughput_change:+.1%}, p99 {p99_change:+.1%} vs baseline")
+        if throughput_change < -max_regression:
+            regressions.append(f"{name}: throughput dropped {-throughput_change:.1%}")
+        if p99_change > max_regression:
+            regressions.append(f"{name}: p99 latency rose {p99_change:.1%}")
+    return regressions
+
+
+@contextlib.contextmanager
+def _postgres_container():
+    from testcontainers.postgres import PostgresContainer
+
+    postgres = PostgresContainer(
+        image="postgres:15", username="localuser", password="password123", dbname="urldatabase"
+    )
+    postgres.start()
+    try:
+        os.environ["DB_HOST"] = postgres.get_container_host_ip()
+        os.environ["DB_PORT"] = str(postgres.get_exposed_port(5432))
+        os.environ["DB_DATABASE"] = "urldatabase"
+        os.environ["DB_USER"] = "localuser"
+        os.environ["DB_PASSWORD"] = "password123"
+        yield
+    finally:
+        postgres.stop()
+
+
+@contextlib.asynccontextmanager
+async def _backend(backend: str, keys: list[str]) -> AsyncIterator[None]:
+    """Set up app.state for backend and seed it with keys."""
+    items = [(key, f"https://example.com/{key}") for key in keys]
+
+    if backend in ("memory", "sqlite"):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            os.environ["APP_STORAGE_BACKEND"] = backend
+            os.environ["APP_SQLITE_PATH"] = os.path.join(tmp_dir, "loadtest.db")
+            async with app.router.lifespan_context(app):
+                await app.state.storage.bulk_create(items)
+                yield
+        return
+
+    with _postgres_container() if backend == "testcontainers" else contextlib.nullcontext():
+        async with app.router.lifespan_context(app):
+            for i in range(0, len(items), _SEED_BATCH):
+                await bulk_create_url_targets(items[i : i + _SEED_BATCH], app.state.storage)
+            yield
+
+
+@contextlib.asynccontextmanager
+async def _client(transport: str, concurrency: int) -> AsyncIterator[httpx.AsyncClient]:
+    """Yield an HTTP client talking to the application in-process or over a local socket."""
+    asgi_app = fast_app if app.state.settings.fast_redirect_enabled else app
+    if transport == "inprocess":
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=asgi_app), base_url="http://bench") as client:
+            yield client
+        return
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+    options = uvicorn_options(app.state.settings)
+    config = uvicorn.Config(asgi_app, lifespan="off", log_level="warning", access_log=False, **options)
+    server = uvicorn.Server(config)
+    server_task = asyncio.create_task(server.serve(sockets=[sock]))
+    while not server.started:
+        await asyncio.sleep(0.01)
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits) as client:
+            yield client
+    finally:
+        server.should_exit = True
+        await server_task
+        sock.close()
+
+
+async def main(args: argparse.Namespace) -> int:
+    # The application lifespan logs at INFO, which would include every client request
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    keys = [f"k{i}" for i in range(args.keys)]
+    zipf_keys = ZipfKeys(keys, args.zipf_s)
+    results: dict[str, Any] = {
+        "meta": {
+            "backend": args.backend,
+            "transport": args.transport,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "keys": args.keys,
+            "zipf_s": args.zipf_s,
+            "seed": args.seed,
+            "python": platform.python_version(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+        },
+        "scenarios": {},
+    }
+
+    async with _backend(args.backend, keys):
+        async with _client(args.transport, args.concurrency) as client:
+            for name in args.scenario:
+                await run_scenario(
+                    client, SCENARIOS[name], zipf_keys, args.warmup, args.concurrency, args.seed, record=False
+                )
+                result = await run_scenario(
+                    client, SCENARIOS[name], zipf_keys, args.requests, args.concurrency, args.seed
+                )
+                results["scenarios"][name] = result
+                latency = result["latency_ms"]
+                print(
+                    f"{name:>8}: {result['throughput_rps']:>10.1f} req/s  p50 {latency['p50']:.3f} ms  "
+                    f"p99 {latency['p99']:.3f} ms  p999 {latency['p999']:.3f} ms  errors {result['errors']}"
+                )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.max_regression)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenario", choices=SCENARIOS, action="append", help="Repeatable (default: all)")
+    parser.add_argument("--backend", choices=BACKENDS, default="memory")
+    parser.add_argument("--transport", choices=TRANSPORTS, default="inprocess")
+    parser.add_argument("--requests", type=int, default=20000, help="Requests per scenario")
+    parser.add_argument("--warmup", type=int, default=1000, help="Unrecorded requests before each scenario")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--keys", type=int, default=10000, help="Number of seeded keys")
+    parser.add_argument("--zipf-s", type=float, default=1.1, help="Zipf exponent of the key popularity")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="Write results to this JSON file")
+    parser.add_argument("--baseline", help="Earlier results file to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.10, help="Allowed relative regression (0.10 = 10%%)")
+    parsed_args = parser.parse_args()
+    parsed_args.scenario = parsed_args.scenario or list(SCENARIOS)
+    sys.exit(asyncio.run(main(parsed_args)))
@@ -1,13 +1,23 @@
-"""Business logic and database operations using raw SQL."""
+"""Business logic on top of the storage backends and the Postgres database."""
 
+import asyncio
 import logging
-from typing import Dict, List
+import time
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator, Dict, List
 
 import psycopg
-from psycopg import errors as psycopg_errors
 from starlette.exceptions import HTTPException
 
+from shortener.cache import UrlCache
 from shortener.database import Database
+from shortener.keyfilter import KeyFilter
+from shortener.keygen import KeyAllocator
+from shortener.metrics import METRICS
+from shortener.redirects import DEFAULT_REDIRECT_POLICY, RedirectPolicy
+from shortener.singleflight import SingleFlight
+from shortener.stale import StaleCache
+from shortener.storage import Storage, StorageError, TargetRow
 
 
 class UrlNotFoundException(HTTPException):
@@ -30,12 +40,12 @@ def _validate_short_url(short_url: str) -> None:
         raise UrlValidationError(detail="Short URL cannot be empty")
 
 
-async def check_db_up(db: Database) -> bool:
-    """Check connectivity to the database."""
+async def check_db_up(storage: Storage) -> bool:
+    """Check connectivity to the storage backend."""
     try:
-        await db.execute_one("SELECT 1")
-        return True
-    except (psycopg.OperationalError, psycopg.DatabaseError) as e:
+        with METRICS.time_query("check_db_up"):
+            return await storage.ping()
+    except (psycopg.OperationalError, psycopg.DatabaseError, StorageError) as e:
         logging.error(f"Database connection error: {str(e)}")
         return False
     except Exception as e:
@@ -43,31 +53,139 @@ async def check_db_up(db: Database) -> bool:
         return False
 
 
-async def get_url_target(short_url: str, db: Database) -> str:
+async def build_key_filter(db: Database, capacity: int, error_rate: float) -> KeyFilter:
     """
-    Get the target URL for a given short URL key.
+    Build a key filter containing every url_key currently stored.
 
     Args:
-        short_url: The short URL key to look up
         db: Database instance
+        capacity: Minimum number of keys the filter is sized for
+        error_rate: Target false-positive rate at capacity
+
+    Returns:
+        A populated KeyFilter
+    """
+    async with db.get_connection() as conn:
+        result = await conn.execute("SELECT count(*) FROM short_urls")
+        row = await result.fetchone()
+        existing = row[0] if row else 0
+
+        # Leave room for growth so the false-positive rate stays near the target
+        key_filter = KeyFilter(capacity=max(capacity, existing * 2), error_rate=error_rate)
+
+        async with conn.cursor(name="key_filter_build") as cur:
+            cur.itersize = 10000
+            await cur.execute("SELECT url_key FROM short_urls")
+            async for (url_key,) in cur:
+                key_filter.add(url_key)
+
+    return key_filter
+
+
+async def _fetch_url_target(short_url: str, storage: Storage, consistent: bool) -> TargetRow | None:
+    with METRICS.time_query("get_url_target"):
+        return await storage.get_target(short_url, consistent=consistent)
+
+
+async def get_url_target(
+    short_url: str,
+    storage: Storage,
+    cache: UrlCache | None = None,
+    key_filter: KeyFilter | None = None,
+    consistent: bool = False,
+    coalescer: SingleFlight | None = None,
+) -> str:
+    """
+    Get the target URL for a given short URL key.
+
+    Takes the same arguments as get_redirect.
 
     Returns:
         The target URL as a string
 
+    Raises:
+        UrlNotFoundException: If the short URL doesn't exist
+    """
+    target, _, _ = await get_redirect(
+        short_url, storage, cache=cache, key_filter=key_filter, consistent=consistent, coalescer=coalescer
+    )
+    return target
+
+
+async def get_redirect(
+    short_url: str,
+    storage: Storage,
+    cache: UrlCache | None = None,
+    key_filter: KeyFilter | None = None,
+    consistent: bool = False,
+    coalescer: SingleFlight | None = None,
+    stale: StaleCache | None = None,
+) -> tuple[str, int | None, bool]:
+    """
+    Get the target URL and the link's own redirect status for a given short URL key.
+
+    Targets read from the storage are remembered in stale, and while the
+    storage is unavailable the remembered target is returned instead of
+    raising a 503.
+
+    Args:
+        short_url: The short URL key to look up
+        storage: Storage backend
+        cache: Optional redirect cache consulted before the storage
+        key_filter: Optional filter used to reject unknown keys without a query
+        consistent: Read from the primary, bypassing the cache, so that writes
+            made just before are always visible. Keys invalidated in cache
+            within its invalidation_window are read from the primary as well
+        coalescer: Optional single-flight group letting concurrent lookups of
+            the same key share one query
+        stale: Optional last-known-good cache to fall back on when the
+            storage fails
+
+    Returns:
+        The target URL, the redirect status, None if the link follows the
+        default redirect policy, and whether the target came from stale
+
     Raises:
         UrlNotFoundException: If the short URL doesn't exist
     """
     _validate_short_url(short_url)
 
-    try:
-        result = await db.execute_one("SELECT target FROM short_urls WHERE url_key = %s", short_url)
+    if consistent:
+        cache = None
+    elif cache is not None:
+        cached = cache.get_redirect(short_url)
+        if cached is not None:
+            return cached[0], cached[1], False
+        # A lagging replica may still return the row just invalidated, which
+        # would then be cached again for the full TTL
+        consistent = cache.recently_invalidated(short_url)
+
+    if key_filter is not None and short_url not in key_filter:
+        raise UrlNotFoundException(detail=f"URL with key '{short_url}' not found")
 
-        if result is None:
+    try:
+        if coalescer is not None:
+            # A consistent read must not join a lookup that may go to a replica
+            row = await coalescer.do((short_url, consistent), lambda: _fetch_url_target(short_url, storage, consistent))
+        else:
+            row = await _fetch_url_target(short_url, storage, consistent)
+
+        # Expired links are filtered out by the storage query itself
+        if row is None:
             raise UrlNotFoundException(detail=f"URL with key '{short_url}' not found")
-        return result[0]
+
+        target, expires_at, redirect_status = row
+        if cache is not None:
+            cache.set(short_url, target, ttl=_seconds_until(expires_at), redirect_status=redirect_status)
+        if stale is not None:
+            stale.remember(short_url, target, redirect_status=redirect_status, expires_at=expires_at)
+        return target, redirect_status, False
     except UrlNotFoundException:
         raise
-    except (psycopg.OperationalError, psycopg.DatabaseError) as e:
+    except (psycopg.OperationalError, psycopg.DatabaseError, StorageError) as e:
+        remembered = stale.get_redirect(short_url) if stale is not None and not consistent else None
+        if remembered is not None:
+            return remembered[0], remembered[1], True
         logging.error(f"Database error when retrieving URL: {str(e)}")
         raise HTTPException(status_code=503, detail="Database unavailable")
     except Exception as e:
@@ -75,20 +193,23 @@ async def get_url_target(short_url: str, db: Database) -> str:
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
-async def get_all_short_urls(db: Database) -> List[Dict[str, str]]:
+async def get_all_short_urls(storage: Storage) -> List[Dict[str, str]]:
     """
     Get all short URLs and their targets.
 
     Args:
-        db: Database instance
+        storage: Storage backend
 
     Returns:
         List of dictionaries containing short_url and target_url
     """
     try:
-        results = await db.execute_all("SELECT url_key, target FROM short_urls ORDER BY created_at DESC")
-        return [{"short_url": row[0], "target_url": row[1]} for row in results]
-    except (psycopg.OperationalError, psycopg.DatabaseError) as e:
+        with METRICS.time_query("get_all_short_urls"):
+            return [
+                {"short_url": url_key, "target_url": target}
+                async for url_key, target, *_ in storage.iter_rows(newest_first=True)
+            ]
+    except (psycopg.OperationalError, psycopg.DatabaseError, StorageError) as e:
         logging.error(f"Database error retrieving all URLs: {str(e)}")
         raise HTTPException(status_code=503, detail="Database unavailable")
     except Exception as e:
@@ -96,14 +217,120 @@ async def get_all_short_urls(db: Database) -> List[Dict[str, str]]:
         raise HTTPException(status_code=500, detail="Error retrieving URLs")
 
 
-async def create_url_target(short_url: str, target_url: str, db: Database) -> bool:
+async def get_short_urls_page(
+    storage: Storage, limit: int, after: tuple[datetime, int] | None = None, consistent: bool = False
+) -> tuple[List[Dict[str, str]], tuple[datetime, int] | None]:
+    """
+    Get one page of short URLs, newest first, using keyset pagination.
+
+    Args:
+        storage: Storage backend
+        limit: Maximum number of URLs to return
+        after: (created_at, id) of the last row of the previous page
+        consistent: Read from the primary instead of a replica
+
+    Returns:
+        The page of URLs and the position to pass as after for the next page,
+        or None if this is the last page
+    """
+    try:
+        # One extra row tells us whether another page follows
+        with METRICS.time_query("get_short_urls_page"):
+            rows = await storage.list_page(limit + 1, after=after, consistent=consistent)
+    except (psycopg.OperationalError, psycopg.DatabaseError, StorageError) as e:
+        logging.error(f"Database error retrieving URL page: {str(e)}")
+        raise HTTPException(status_code=503, detail="Database unavailable")
+    except Exception as e:
+        logging.error(f"Unexpected error retrieving URL page: {str(e)}")
+        raise HTTPException(status_code=500, detail="Error retrieving URLs")
+
+    page = rows[:limit]
+    next_after = (page[-1][3], page[-1][0]) if len(rows) > limit else None
+    return [{"short_url": row[1], "target_url": row[2]} for row in page], next_after
+
+
+async def iter_short_urls(storage: Storage, batch_size: int = 1000) -> AsyncIterator[Dict[str, str]]:
+    """
+    Iterate over all short URLs, newest first.
+
+    Only batch_size rows are held in memory at a time. With Postgres the rows
+    come from a server-side cursor on a read replica if any are configured,
+    and the pooled connection is held until iteration finishes.
+
+    Args:
+        storage: Storage backend
+        batch_size: Number of rows fetched per round trip
+
+    Yields:
+        Dictionaries containing short_url and target_url
+    """
+    async for url_key, target, *_ in storage.iter_rows(batch_size=batch_size, newest_first=True):
+        yield {"short_url": url_key, "target_url": target}
+
+
+async def iter_export_rows(storage: Storage, batch_size: int = 1000) -> AsyncIterator[Dict[str, str]]:
+    """
+    Iterate over every short URL including its creation time, in insertion order.
+
+    Args:
+        storage: Storage backend
+        batch_size: Number of rows fetched per round trip
+
+    Yields:
+        Dictionaries containing short_url, target_url and created_at (ISO 8601)
+    """
+    async for url_key, target, created_at, *_ in storage.iter_rows(batch_size=batch_size):
+        yield {"short_url": url_key, "target_url": target, "created_at": created_at.isoformat()}
+
+
+async def iter_export_csv(db: Database) -> AsyncIterator[bytes]:
+    """
+    Stream every live short URL as CSV produced by the server with COPY ... TO STDOUT.
+
+    Like iter_export_rows it leaves out links that have expired but not yet
+    been swept.
+
+    Args:
+        db: Database instance
+
+    Yields:
+        Chunks of CSV data, starting with a header row
+    """
+    async with db.get_connection(replica=True) as conn:
+        async with conn.cursor() as cur:
+            async with cur.copy(
+                "COPY (SELECT url_key AS short_url, target AS target_url, created_at FROM short_urls "
+                "WHERE expires_at IS NULL OR expires_at > now() ORDER BY id) TO STDOUT WITH (FORMAT csv, HEADER)"
+            ) as copy:
+                async for data in copy:
+                    yield bytes(data)
+
+
+def _seconds_until(expires_at: datetime | None) -> float | None:
+    """Return the seconds left until expires_at, or None for links that do not expire."""
+    if expires_at is None:
+        return None
+    return (expires_at - datetime.now(timezone.utc)).total_seconds()
+
+
+async def create_url_target(
+    short_url: str,
+    target_url: str,
+    storage: Storage,
+    key_filter: KeyFilter | None = None,
+    expires_at: datetime | None = None,
+    redirect_status: int | None = None,
+) -> bool:
     """
     Create a new short URL mapping.
 
     Args:
         short_url: The short URL key to create
         target_url: The target URL it should redirect to
-        db: Database instance
+        storage: Storage backend
+        key_filter: Optional key filter to record the new key in
+        expires_at: Optional time (timezone-aware) after which the link is gone
+        redirect_status: Optional redirect status overriding the policy default
 
     Returns:
         True if successful, False if URL already exists
@@ -116,35 +343,378 @@ async def create_url_target(short_url: str, target_url: str, db: Database) -> bo
     if not target_url:
         raise UrlValidationError(detail="Target URL cannot be empty")
 
+    # Added before the insert so a concurrent lookup never sees a false negative
+    if key_filter is not None:
+        key_filter.add(short_url)
+
     try:
-        await db.execute(
-            "INSERT INTO short_urls (url_key, target) VALUES (%s, %s)",
+        with METRICS.time_query("create_url_target"):
+            return await storage.create(short_url, target_url, expires_at=expires_at, redirect_status=redirect_status)
+    except (psycopg.OperationalError, psycopg.DatabaseError, StorageError) as e:
+        logging.error(f"Database error creating URL: {str(e)}")
+        raise HTTPException(status_code=503, detail="Database unavailable")
+    except Exception as e:
+        logging.error(f"Unexpected error creating URL: {str(e)}")
+        raise HTTPException(status_code=500, detail="Error creating URL")
+
+
+# Attempts to find a generated key that was not already taken by a custom one
+GENERATED_KEY_ATTEMPTS = 5
+
+
+async def create_generated_url_target(
+    target_url: str,
+    storage: Storage,
+    key_allocator: KeyAllocator,
+    key_filter: KeyFilter | None = None,
+    expires_at: datetime | None = None,
+    redirect_status: int | None = None,
+) -> str:
+    """
+    Create a new short URL mapping under a server-generated key.
+
+    Generated keys never collide with each other, but a custom key chosen
+    earlier may look like a generated one; such keys are skipped.
+
+    Args:
+        target_url: The target URL it should redirect to
+        storage: Storage backend
+        key_allocator: Allocator handing out this worker's keys
+        key_filter: Optional key filter to record the new key in
+        expires_at: Optional time (timezone-aware) after which the link is gone
+        redirect_status: Optional redirect status overriding the policy default
+
+    Returns:
+        The generated short URL key
+
+    Raises:
+        HTTPException: For database errors, or if no free key was found
+    """
+    for _ in range(GENERATED_KEY_ATTEMPTS):
+        try:
+            short_url = await key_allocator.next_key()
+        except (psycopg.OperationalError, psycopg.DatabaseError, StorageError) as e:
+            logging.error(f"Database error reserving key block: {str(e)}")
+            raise HTTPException(status_code=503, detail="Database unavailable")
+        if await create_url_target(
             short_url,
             target_url,
+            storage,
+            key_filter=key_filter,
+            expires_at=expires_at,
+            redirect_status=redirect_status,
+        ):
+            return short_url
+        logging.warning(f"Generated key '{short_url}' already taken by a custom key, skipping")
+
+    raise HTTPException(status_code=500, detail="Error generating URL key")
+
+
+async def bulk_create_url_targets(
+    items: List[tuple[str, str]], storage: Storage, key_filter: KeyFilter | None = None
+) -> set[str]:
+    """
+    Create many short URL mappings in one transaction.
+
+    With Postgres, items are copied into a temporary staging table with COPY
+    and merged into short_urls with a single INSERT ... ON CONFLICT DO NOTHING.
+    If a key appears more than once in items, its first occurrence wins.
+
+    Args:
+        items: (short_url, target_url) pairs, already validated
+        storage: Storage backend
+        key_filter: Optional key filter to record the new keys in
+
+    Returns:
+        The set of keys that were created; all other keys already existed
+
+    Raises:
+        HTTPException: For database errors
+    """
+    if not items:
+        return set()
+
+    if key_filter is not None:
+        for short_url, _ in items:
+            key_filter.add(short_url)
+
+    try:
+        with METRICS.time_query("bulk_create_url_targets"):
+            return await storage.bulk_create(items)
+    except (psycopg.OperationalError, psycopg.DatabaseError, StorageError) as e:
+        logging.error(f"Database error bulk creating URLs: {str(e)}")
+        raise HTTPException(status_code=503, detail="Database unavailable")
+    except Exception as e:
+        logging.error(f"Unexpected error bulk creating URLs: {str(e)}")
+        raise HTTPException(status_code=500, detail="Error creating URLs")
+
+
+# Bucket resolutions from finest to coarsest
+HIT_RESOLUTIONS = ("minute", "hour", "day")
+
+# Range returned by get_url_stats when no start is given
+STATS_DEFAULT_WINDOWS = {
+    "minute": timedelta(hours=1),
+    "hour": timedelta(days=1),
+    "day": timedelta(days=30),
+}
+
+
+async def record_hits(counts: Dict[str, int], db: Database) -> None:
+    """
+    Add buffered click counts to url_hits and the current minute bucket.
+
+    Both upserts are sent in one round trip. Keys are written in sorted order
+    so concurrent flushes from several workers lock rows in the same order and
+    cannot deadlock. Keys deleted since they were counted are skipped. Hits
+    are attributed to the minute in which they are flushed.
+
+    Args:
+        counts: Number of new hits per url_key
+        db: Database instance
+
+    Raises:
+        psycopg.Error: If the upsert fails; the caller keeps the counts and retries
+    """
+    url_keys = sorted(counts)
+    params = (url_keys, [counts[url_key] for url_key in url_keys])
+    with METRICS.time_query("record_hits"):
+        await db.execute_pipeline(
+            [
+                (
+                    "INSERT INTO url_hits (url_key, hits, last_hit_at) "
+                    "SELECT t.url_key, t.hits, CURRENT_TIMESTAMP "
+                    "FROM unnest(%s::text[], %s::bigint[]) AS t(url_key, hits) "
+                    "JOIN short_urls s ON s.url_key = t.url_key ORDER BY t.url_key "
+                    "ON CONFLICT (url_key) DO UPDATE "
+                    "SET hits = url_hits.hits + EXCLUDED.hits, last_hit_at = EXCLUDED.last_hit_at",
+                    params,
+                ),
+                (
+                    "INSERT INTO url_hit_buckets (url_key, resolution, bucket_start, hits) "
+                    "SELECT t.url_key, 'minute', date_trunc('minute', LOCALTIMESTAMP), t.hits "
+                    "FROM unnest(%s::text[], %s::bigint[]) AS t(url_key, hits) "
+                    "JOIN short_urls s ON s.url_key = t.url_key ORDER BY t.url_key "
+                    "ON CONFLICT (url_key, resolution, bucket_start) DO UPDATE "
+                    "SET hits = url_hit_buckets.hits + EXCLUDED.hits",
+                    params,
+                ),
+            ]
         )
-        return True
-    except psycopg_errors.UniqueViolation:
-        # URL key already exists
-        return False
+
+
+async def rollup_hit_buckets(db: Database, minute_retention: timedelta, hour_retention: timedelta) -> int:
+    """
+    Compact old minute buckets into hour buckets and old hour buckets into day buckets.
+
+    Only whole hours (or days) older than the retention period are moved, so
+    a coarse bucket is never split between resolutions. An advisory lock makes
+    sure only one worker runs the rollup at a time.
+
+    Args:
+        db: Database instance
+        minute_retention: How long minute buckets are kept
+        hour_retention: How long hour buckets are kept
+
+    Returns:
+        Number of fine-grained buckets that were compacted
+    """
+    # The INSERT only reports the coarse buckets it wrote, so the moved rows are counted separately
+    rollup_sql = (
+        "WITH moved AS ("
+        "DELETE FROM url_hit_buckets WHERE resolution = %s "
+        "AND bucket_start < date_trunc(%s, LOCALTIMESTAMP - %s) "
+        "RETURNING url_key, bucket_start, hits), "
+        "merged AS ("
+        "INSERT INTO url_hit_buckets (url_key, resolution, bucket_start, hits) "
+        "SELECT url_key, %s, date_trunc(%s, bucket_start), sum(hits) FROM moved GROUP BY 1, 3 ORDER BY 1, 3 "
+        "ON CONFLICT (url_key, resolution, bucket_start) DO UPDATE SET hits = url_hit_buckets.hits + EXCLUDED.hits) "
+        "SELECT count(*) FROM moved"
+    )
+    compacted = 0
+    with METRICS.time_query("rollup_hit_buckets"):
+        async with db.get_connection() as conn:
+            result = await conn.execute("SELECT pg_try_advisory_xact_lock(hashtext('rollup_hit_buckets'))")
+            row = await result.fetchone()
+            if not row or not row[0]:
+                return 0
+
+            for fine, coarse, retention in (("minute", "hour", minute_retention), ("hour", "day", hour_retention)):
+                result = await conn.execute(rollup_sql, (fine, coarse, retention, coarse, coarse))  # type: ignore[arg-type]
+                row = await result.fetchone()
+                compacted += row[0] if row else 0
+    return compacted
+
+
+async def get_url_stats(
+    short_url: str,
+    db: Database,
+    resolution: str = "hour",
+    since: datetime | None = None,
+    until: datetime | None = None,
+) -> tuple[int, List[tuple[datetime, int]]]:
+    """
+    Get the total and time-bucketed click counts of a short URL.
+
+    Reads only pre-aggregated buckets: the requested resolution plus any finer
+    buckets in the range that have not been rolled up yet.
+
+    Args:
+        short_url: The short URL key to get stats for
+        db: Database instance
+        resolution: "minute", "hour" or "day"
+        since: Start of the range (inclusive), defaults to STATS_DEFAULT_WINDOWS[resolution] ago
+        until: End of the range (exclusive), defaults to no limit
+
+    Returns:
+        All-time hit count and a list of (bucket start, hits) in time order
+
+    Raises:
+        UrlNotFoundException: If the short URL doesn't exist
+        HTTPException: For database errors
+    """
+    _validate_short_url(short_url)
+    resolutions = list(HIT_RESOLUTIONS[: HIT_RESOLUTIONS.index(resolution) + 1])
+
+    try:
+        with METRICS.time_query("get_url_stats"):
+            total_rows, bucket_rows = await db.execute_pipeline(
+                [
+                    (
+                        "SELECT COALESCE(h.hits, 0) FROM short_urls s LEFT JOIN url_hits h ON h.url_key = s.url_key "
+                        "WHERE s.url_key = %s",
+                        (short_url,),
+                    ),
+                    (
+                        "SELECT date_trunc(%s, bucket_start) AS bucket, sum(hits)::bigint FROM url_hit_buckets "
+                        "WHERE url_key = %s AND resolution = ANY(%s) "
+                        "AND bucket_start >= COALESCE(%s::timestamp, date_trunc(%s, LOCALTIMESTAMP - %s::interval)) "
+                        "AND (%s::timestamp IS NULL OR bucket_start < %s::timestamp) "
+                        "GROUP BY bucket ORDER BY bucket",
+                        (
+                            resolution,
+                            short_url,
+                            resolutions,
+                            since,
+                            resolution,
+                            STATS_DEFAULT_WINDOWS[resolution],
+                            until,
+                            until,
+                        ),
+                    ),
+                ]
+            )
     except (psycopg.OperationalError, psycopg.DatabaseError) as e:
-        logging.error(f"Database error creating URL: {str(e)}")
+        logging.error(f"Database error retrieving URL stats: {str(e)}")
         raise HTTPException(status_code=503, detail="Database unavailable")
     except Exception as e:
-        logging.error(f"Unexpected error creating URL: {str(e)}")
-        raise HTTPException(status_code=500, detail="Error creating URL")
+        logging.error(f"Unexpected error retrieving URL stats: {str(e)}")
+        raise HTTPException(status_code=500, detail="Error retrieving URL stats")
+
+    if not total_rows:
+        raise UrlNotFoundException(detail=f"URL with key '{short_url}' not found")
+    return total_rows[0][0], [(row[0], row[1]) for row in bucket_rows]
 
 
-async def update_url_target(short_url: str, new_target_url: str, db: Database) -> bool:
+async def get_hot_keys(db: Database, limit: int, window: timedelta) -> List[str]:
+    """
+    Get the most requested keys of a recent time window from the click buckets.
+
+    Only minute buckets are counted, so the query is an index range scan of
+    idx_url_hit_buckets_rollup; clicks older than the minute retention
+    have been rolled up and are left out.
+
+    Args:
+        db: Database instance
+        limit: Maximum number of keys to return
+        window: How far back to count clicks
+
+    Returns:
+        Keys ordered by clicks in the window, most clicked first
+    """
+    with METRICS.time_query("get_hot_keys"):
+        rows = await db.execute_all(
+            "SELECT url_key FROM url_hit_buckets WHERE resolution = %s AND bucket_start >= LOCALTIMESTAMP - %s::interval "
+            "GROUP BY url_key ORDER BY sum(hits) DESC LIMIT %s",
+            HIT_RESOLUTIONS[0],
+            window,
+            limit,
+            replica=True,
+        )
+    return [row[0] for row in rows]
+
+
+async def warm_url_cache(
+    keys: List[str], storage: Storage, cache: UrlCache, batch_size: int = 500, budget: float = 5.0
+) -> int:
+    """
+    Load the targets of keys into the redirect cache with batched lookups.
+
+    Stops early once budget seconds have passed, so a slow database delays
+    readiness by a bounded time. Keys are loaded in the given order, so the
+    hottest keys should come first.
+
+    Args:
+        keys: Keys to preload
+        storage: Storage backend
+        cache: Redirect cache to fill
+        batch_size: Number of keys looked up per query
+        budget: Seconds the warm-up may take
+
+    Returns:
+        Number of targets loaded into the cache
+    """
+    deadline = time.monotonic() + budget
+    targets: Dict[str, TargetRow] = {}
+    for i in range(0, len(keys), batch_size):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        try:
+            with METRICS.time_query("warm_url_cache"):
+                targets.update(await asyncio.wait_for(storage.get_targets(keys[i : i + batch_size]), remaining))
+        except asyncio.TimeoutError:
+            break
+
+    # Coldest first, so the hottest keys are the last to be evicted
+    for url_key in reversed(keys):
+        if url_key in targets:
+            target, expires_at, redirect_status = targets[url_key]
+            cache.set(url_key, target, ttl=_seconds_until(expires_at), redirect_status=redirect_status)
+    return len(targets)
+
+
+async def update_url_target(
+    short_url: str,
+    new_target_url: str,
+    storage: Storage,
+    cache: UrlCache | None = None,
+    expires_at: datetime | None = None,
+    redirect_status: int | None = None,
+    policy: RedirectPolicy = DEFAULT_REDIRECT_POLICY,
+    stale: StaleCache | None = None,
+) -> int | None:
     """
     Update an existing short URL mapping.
 
+    The expiry and redirect status are replaced as well, so a link updated
+    without them no longer expires and follows the default redirect policy.
+    CDNs and browsers are not told about the change, so the previous
+    redirect may still be served from their caches for a while.
+
     Args:
         short_url: The short URL key to update
         new_target_url: The new target URL
-        db: Database instance
+        storage: Storage backend
+        cache: Optional redirect cache to invalidate
+        expires_at: Optional time (timezone-aware) after which the link is gone
+        redirect_status: Optional redirect status overriding the policy default
+        policy: Redirect policy the previous redirect was sent under
+        stale: Optional last-known-good cache to drop the old target from
 
     Returns:
-        True if URL was updated, False if URL doesn't exist
+        Seconds the previous redirect may still be served from HTTP caches,
+        or None if URL doesn't exist or has expired
 
     Raises:
         HTTPException: For database errors
@@ -155,13 +725,16 @@ async def update_url_target(short_url: str, new_target_url: str, db: Database) -
         raise UrlValidationError(detail="Target URL cannot be empty")
 
     try:
-        async with db.get_connection() as conn:
-            result = await conn.execute(
-                "UPDATE short_urls SET target = %s WHERE url_key = %s",
-                (new_target_url, short_url),  # type: ignore[arg-type]
+        with METRICS.time_query("update_url_target"):
+            previous = await storage.update(
+                short_url, new_target_url, expires_at=expires_at, redirect_status=redirect_status
             )
-            return result.rowcount > 0
-    except (psycopg.OperationalError, psycopg.DatabaseError) as e:
+        if cache is not None:
+            cache.invalidate(short_url)
+        if stale is not None:
+            stale.forget(short_url)
+        return policy.cached_for(previous[2]) if previous is not None else None
+    except (psycopg.OperationalError, psycopg.DatabaseError, StorageError) as e:
         logging.error(f"Database error updating URL: {str(e)}")
         raise HTTPException(status_code=503, detail="Database unavailable")
     except Exception as e:
@@ -169,13 +742,22 @@ async def update_url_target(short_url: str, new_target_url: str, db: Database) -
         raise HTTPException(status_code=500, detail="Error updating URL")
 
 
-async def delete_url_target(short_url: str, db: Database) -> bool:
+async def delete_url_target(
+    short_url: str,
+    storage: Storage,
+    cache: UrlCache | None = None,
+    key_filter: KeyFilter | None = None,
+    stale: StaleCache | None = None,
+) -> bool:
     """
     Delete a short URL mapping.
 
     Args:
         short_url: The short URL key to delete
-        db: Database instance
+        storage: Storage backend
+        cache: Optional redirect cache to invalidate
+        key_filter: Optional key filter to remove the key from
+        stale: Optional last-known-good cache to remove the key from
 
     Returns:
         True if URL was deleted, False if URL doesn't exist
@@ -186,15 +768,59 @@ async def delete_url_target(short_url: str, db: Database) -> bool:
     _validate_short_url(short_url)
 
     try:
-        async with db.get_connection() as conn:
-            result = await conn.execute(
-                "DELETE FROM short_urls WHERE url_key = %s",
-                (short_url,),  # type: ignore[arg-type]
-            )
-            return result.rowcount > 0
-    except (psycopg.OperationalError, psycopg.DatabaseError) as e:
+        with METRICS.time_query("delete_url_target"):
+            deleted = await storage.delete(short_url)
+        if cache is not None:
+            cache.invalidate(short_url)
+        if key_filter is not None and deleted:
+            key_filter.remove(short_url)
+        if stale is not None:
+            stale.forget(short_url)
+        return deleted
+    except (psycopg.OperationalError, psycopg.DatabaseError, StorageError) as e:
         logging.error(f"Database error deleting URL: {str(e)}")
         raise HTTPException(status_code=503, detail="Database unavailable")
     except Exception as e:
         logging.error(f"Unexpected error deleting URL: {str(e)}")
         raise HTTPException(status_code=500, detail="Error deleting URL")
+
+
+async def sweep_expired_urls(
+    storage: Storage,
+    cache: UrlCache | None = None,
+    key_filter: KeyFilter | None = None,
+    batch_size: int = 1000,
+    max_batches: int = 100,
+) -> int:
+    """
+    Delete expired links in small batches.
+
+    Each batch is its own short transaction, so row locks are held only for
+    one batch and lookups and writes proceed in between. At most max_batches
+    batches run per call; the rest is left for the next run.
+
+    Args:
+        storage: Storage backend
+        cache: Optional redirect cache to evict the deleted keys from
+        key_filter: Optional key filter to remove the deleted keys from
+        batch_size: Number of links deleted per transaction
+        max_batches: Maximum number of batches to run
+
+    Returns:
+        Number of links deleted
+    """
+    deleted = 0
+    for _ in range(max_batches):
+        with METRICS.time_query("sweep_expired_urls"):
+            url_keys = await storage.delete_expired(batch_size)
+        for url_key in url_keys:
+            if cache is not None:
+                cache.invalidate(url_key)
+            if key_filter is not None:
+                key_filter.remove(url_key)
+        deleted += len(url_keys)
+        if len(url_keys) < batch_size:
+            break
+        # Let requests run between batches
+        await asyncio.sleep(0)
+    return deleted
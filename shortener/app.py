@@ -1,26 +1,68 @@
+import asyncio
 import contextlib
 import logging
 import os
-from typing import AsyncGenerator, Union
+import time
+from datetime import timedelta
+from typing import AsyncGenerator, Awaitable, Callable, Union
 
-import uvicorn
 from starlette.applications import Starlette
+from starlette.middleware import Middleware
 from starlette.exceptions import HTTPException
 from starlette.requests import Request
 from starlette.responses import JSONResponse
 from starlette.routing import Mount
 from starlette.routing import Route
 
-from shortener.actions import UrlNotFoundException, UrlValidationError, check_db_up
+from shortener.actions import (
+    UrlNotFoundException,
+    UrlValidationError,
+    build_key_filter,
+    check_db_up,
+    get_hot_keys,
+    record_hits,
+    rollup_hit_buckets,
+    sweep_expired_urls,
+    warm_url_cache,
+)
+from shortener.breaker import CLOSED
+from shortener.cache import UrlCache
 from shortener.database import Database, get_database
-from shortener.models import CREATE_TABLE_SQL, CREATE_INDEX_SQL
+from shortener.fastpath import RedirectFastPath
+from shortener.hits import HitCounter
+from shortener.keyfilter import KeyFilter
+from shortener.keygen import KeyAllocator
+from shortener.models import (
+    ADD_EXPIRES_AT_COLUMN_SQL,
+    ADD_REDIRECT_STATUS_COLUMN_SQL,
+    CREATE_CREATED_AT_INDEX_SQL,
+    CREATE_EXPIRES_AT_INDEX_SQL,
+    CREATE_HIT_BUCKETS_INDEX_SQL,
+    CREATE_HIT_BUCKETS_TABLE_SQL,
+    CREATE_HITS_TABLE_SQL,
+    CREATE_INDEX_SQL,
+    CREATE_KEY_SEQUENCE_SQL,
+    CREATE_TABLE_SQL,
+)
+from shortener.ratelimit import RateLimiter, RateLimitMiddleware
+from shortener.redirects import RedirectPolicy
+from shortener.server import serve
+from shortener.shedding import LoadShedder, LoadSheddingMiddleware
 from shortener.settings import PostgresSettings, AppSettings
-from shortener.views import ping, status, redirect_url, url_routes
+from shortener.singleflight import SingleFlight
+from shortener.stale import StaleCache, write_stale_file
+from shortener.storage import PostgresStorage, create_storage
+from shortener.metrics import METRICS, MetricsMiddleware
+from shortener.views import RESERVED_KEYS, metrics, ping, status, redirect_url, url_routes
 
 
+# Keeps references to fire-and-forget tasks until they finish
+_background_tasks: set[asyncio.Task] = set()
+
 routes = [
     Route("/ping", ping),
     Route("/status", status),
+    Route("/metrics", metrics),
     Route("/{short_url:str}", redirect_url),
     Mount("/urls", routes=url_routes),
 ]
@@ -49,11 +91,19 @@ async def initialize_database(db: Database) -> bool:
         # Create table and index
         async with db.get_connection() as conn:
             await conn.execute(CREATE_TABLE_SQL)
+            await conn.execute(ADD_EXPIRES_AT_COLUMN_SQL)
+            await conn.execute(ADD_REDIRECT_STATUS_COLUMN_SQL)
+            await conn.execute(CREATE_EXPIRES_AT_INDEX_SQL)
             await conn.execute(CREATE_INDEX_SQL)
+            await conn.execute(CREATE_CREATED_AT_INDEX_SQL)
+            await conn.execute(CREATE_HITS_TABLE_SQL)
+            await conn.execute(CREATE_HIT_BUCKETS_TABLE_SQL)
+            await conn.execute(CREATE_HIT_BUCKETS_INDEX_SQL)
+            await conn.execute(CREATE_KEY_SEQUENCE_SQL)
         logging.info("Database tables initialized successfully")
 
         # Verify connection
-        if not await check_db_up(db):
+        if not await check_db_up(PostgresStorage(db)):
             logging.error("Database health check failed")
             return False
         return True
@@ -62,6 +112,166 @@ async def initialize_database(db: Database) -> bool:
         return False
 
 
+async def load_key_filter(db: Database, settings: AppSettings) -> KeyFilter | None:
+    """Build the negative-lookup filter, or return None if it cannot be built."""
+    try:
+        key_filter = await build_key_filter(
+            db, capacity=settings.key_filter_capacity, error_rate=settings.key_filter_error_rate
+        )
+    except Exception as e:
+        logging.error(f"Key filter build failed, unknown keys will hit the database: {str(e)}")
+        return None
+
+    stats = key_filter.stats()
+    logging.info(
+        f"Key filter loaded: {stats['keys']} keys, {stats['memory_bytes']} bytes, "
+        f"estimated false-positive rate {stats['false_positive_rate']:.4%}"
+    )
+    return key_filter
+
+
+async def reload_key_filter(app: Starlette) -> None:
+    """Rebuild the key filter in the background, keeping the old one until done."""
+    try:
+        key_filter = await load_key_filter(app.state.db, app.state.settings)
+        if key_filter is not None:
+            for op, url_key in app.state.key_filter_backlog:
+                _apply_key_filter_change(key_filter, op, url_key)
+            app.state.key_filter = key_filter
+    finally:
+        app.state.key_filter_backlog = None
+
+
+def _apply_key_filter_change(key_filter: KeyFilter, op: str, url_key: str) -> None:
+    if op == "create":
+        key_filter.add(url_key)
+    elif op == "delete":
+        key_filter.remove(url_key)
+
+
+def apply_url_change(app: Starlette, op: str, url_key: str) -> None:
+    """Bring this process's cache and key filter up to date with a change made elsewhere."""
+    url_cache: UrlCache | None = getattr(app.state, "url_cache", None)
+    key_filter: KeyFilter | None = getattr(app.state, "key_filter", None)
+    stale_cache: StaleCache | None = getattr(app.state, "stale_cache", None)
+
+    if op == "reset":
+        # Notifications may have been missed, so nothing cached can be trusted; the
+        # stale cache is kept, since it is only served while the database is down
+        if url_cache is not None:
+            url_cache.clear()
+        if key_filter is not None and getattr(app.state, "key_filter_backlog", None) is None:
+            # Changes that arrive while the table is scanned are replayed onto the new filter
+            app.state.key_filter_backlog = []
+            task = asyncio.get_running_loop().create_task(reload_key_filter(app))
+            _background_tasks.add(task)
+            task.add_done_callback(_background_tasks.discard)
+        return
+
+    if url_cache is not None:
+        url_cache.invalidate(url_key)
+    if stale_cache is not None:
+        stale_cache.forget(url_key)
+    if key_filter is not None:
+        _apply_key_filter_change(key_filter, op, url_key)
+        backlog: list[tuple[str, str]] | None = getattr(app.state, "key_filter_backlog", None)
+        if backlog is not None:
+            backlog.append((op, url_key))
+
+
+def read_hot_keys_file(path: str, limit: int) -> list[str]:
+    """Return the first limit keys of a hot-key file, one key per line, or none if it does not exist."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            return [line.strip() for line, _ in zip(f, range(limit)) if line.strip()]
+    except FileNotFoundError:
+        return []
+
+
+def write_hot_keys_file(path: str, keys: list[str]) -> None:
+    """Atomically replace the hot-key file with keys."""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.writelines(f"{key}\n" for key in keys)
+    os.replace(tmp_path, path)
+
+
+async def warm_up(app: Starlette) -> None:
+    """Preload the hottest keys into the redirect cache, then mark the worker ready.
+
+    Reading the hot keys and loading their targets share cache_warmup_budget,
+    so readiness is delayed by a bounded time however slow the database is.
+    """
+    settings: AppSettings = app.state.settings
+    url_cache: UrlCache | None = app.state.url_cache
+    try:
+        if url_cache is None or not settings.cache_warmup_enabled:
+            return
+        start = time.monotonic()
+        limit = min(settings.cache_warmup_keys, url_cache.max_size)
+        keys = read_hot_keys_file(settings.cache_warmup_file, limit) if settings.cache_warmup_file else []
+        if not keys and app.state.db is not None:
+            keys = await asyncio.wait_for(
+                get_hot_keys(app.state.db, limit, timedelta(hours=settings.cache_warmup_window_hours)),
+                settings.cache_warmup_budget,
+            )
+
+        loaded = await warm_url_cache(
+            keys,
+            app.state.storage,
+            url_cache,
+            batch_size=settings.cache_warmup_batch_size,
+            budget=settings.cache_warmup_budget - (time.monotonic() - start),
+        )
+        logging.info(f"Cache warm-up loaded {loaded} of {len(keys)} hot keys in {time.monotonic() - start:.2f}s")
+    except asyncio.TimeoutError:
+        logging.warning("Hot keys not read within the cache warm-up budget, starting with a cold cache")
+    except Exception as e:
+        logging.error(f"Cache warm-up failed, starting with a cold cache: {str(e)}")
+    finally:
+        app.state.ready = True
+
+
+async def reload_snapshot(app: Starlette) -> None:
+    """Map a replaced snapshot file and drop cached targets that may have changed with it."""
+    if await app.state.storage.reload():
+        url_cache: UrlCache | None = getattr(app.state, "url_cache", None)
+        if url_cache is not None:
+            url_cache.clear()
+
+
+async def evict_idle_rate_limits(app: Starlette) -> None:
+    """Drop the rate limit buckets of clients that have been idle long enough to be full again."""
+    app.state.rate_limiter.evict_idle()
+
+
+async def save_stale_cache(app: Starlette) -> None:
+    """Write the last-known-good redirects to the stale cache file from a thread, logging failures."""
+    path = app.state.settings.stale_cache_file
+    entries = app.state.stale_cache.items()
+    try:
+        await asyncio.to_thread(write_stale_file, path, entries)
+        logging.info(f"Saved {len(entries)} last-known-good redirects to {path}")
+    except OSError as e:
+        logging.error(f"Could not save the stale cache: {str(e)}")
+
+
+async def probe_database(app: Starlette) -> None:
+    """Send a health check through an open circuit breaker, so it closes even without traffic."""
+    if app.state.db.breaker.state != CLOSED:
+        await check_db_up(app.state.storage)
+
+
+async def run_periodically(name: str, job: Callable[[], Awaitable[object]], interval: float) -> None:
+    """Await job every interval seconds until cancelled, logging and surviving failures."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await job()
+        except Exception as e:
+            logging.error(f"Periodic {name} failed: {str(e)}")
+
+
 @contextlib.asynccontextmanager
 async def lifespan(app: Starlette) -> AsyncGenerator[None, None]:
     """Application lifespan context manager for startup/shutdown events."""
@@ -72,33 +282,245 @@ async def lifespan(app: Starlette) -> AsyncGenerator[None, None]:
     )
 
     # Load settings
-    db_settings = PostgresSettings()
     app_settings = AppSettings()
+    db_settings = PostgresSettings().per_worker(app_settings.workers)
 
     try:
-        logging.info("Initializing database connection")
-        db = get_database(db_settings)
+        # Store settings in app state
+        app.state.settings = app_settings
+        app.state.ready = False
+        METRICS.enabled = app_settings.metrics_enabled
 
-        # Connect to database
-        await db.connect()
+        # Redirect lookup cache, shared by all requests in this process
+        app.state.url_cache = (
+            UrlCache(
+                max_size=app_settings.cache_max_size,
+                ttl=app_settings.cache_ttl,
+                stats_enabled=app_settings.cache_stats_enabled,
+                invalidation_window=app_settings.cache_invalidation_window,
+            )
+            if app_settings.cache_enabled
+            else None
+        )
 
-        # Store database in app state
-        app.state.db = db
+        # Cache misses for the same key wait on one shared query
+        app.state.lookup_coalescer = SingleFlight() if app_settings.lookup_coalescing_enabled else None
+        app.state.redirect_policy = RedirectPolicy(
+            status=app_settings.redirect_status,
+            max_age=app_settings.redirect_max_age,
+            permanent_max_age=app_settings.redirect_permanent_max_age,
+            stale_while_revalidate=app_settings.redirect_stale_while_revalidate,
+        )
 
-        # Store settings in app state
-        app.state.settings = app_settings
+        # Clients over their budget get 429s before any query is made
+        app.state.rate_limiter = (
+            RateLimiter(
+                redirects_per_minute=app_settings.rate_limit_redirects_per_minute,
+                writes_per_minute=app_settings.rate_limit_per_minute,
+                api_key_header=app_settings.rate_limit_api_key_header,
+                api_keys=app_settings.rate_limit_api_keys,
+                max_clients=app_settings.rate_limit_max_clients,
+            )
+            if app_settings.rate_limit_enabled
+            else None
+        )
+
+        # Postgres-only features stay off with the other storage backends
+        db = None
+        app.state.db = None
+        app.state.key_allocator = None
+        app.state.key_filter = None
+        app.state.hit_counter = None
+        app.state.stale_cache = None
+        hit_counter_task = None
+        periodic_tasks = []
+
+        if app_settings.storage_backend == "postgres":
+            logging.info("Initializing database connection")
+            db = get_database(db_settings)
+
+            # Connect to database
+            await db.connect()
 
-        # Initialize schema and verify connection
-        if not await initialize_database(db):
-            logging.error("Failed to initialize database")
-        else:
-            logging.info("Database connection established")
+            # Store database in app state
+            app.state.db = db
+
+            # Redirects keep working from the last targets read while the database is down
+            if app_settings.stale_cache_enabled:
+                app.state.stale_cache = StaleCache(max_size=app_settings.stale_cache_max_size)
+                if app_settings.stale_cache_file:
+                    try:
+                        loaded = app.state.stale_cache.load(app_settings.stale_cache_file)
+                        logging.info(f"Loaded {loaded} last-known-good redirects from {app_settings.stale_cache_file}")
+                    except OSError as e:
+                        logging.error(f"Could not load the stale cache: {str(e)}")
+
+            # An open circuit breaker is probed even when no requests come in
+            if db_settings.breaker_failure_threshold > 0:
+                periodic_tasks.append(
+                    asyncio.create_task(
+                        run_periodically(
+                            "database breaker probe", lambda: probe_database(app), db_settings.breaker_reset_timeout
+                        )
+                    )
+                )
+
+            # Keys for POST /urls/ without a short_url, reserved in blocks per worker
+            app.state.key_allocator = KeyAllocator(db, reserved_keys=RESERVED_KEYS)
+
+            # Initialize schema and verify connection
+            if not await initialize_database(db):
+                logging.error("Failed to initialize database")
+            else:
+                logging.info("Database connection established")
+                if app_settings.key_filter_enabled:
+                    app.state.key_filter = await load_key_filter(db, app_settings)
+
+            # Evict entries changed by other workers
+            db.add_change_callback(lambda op, url_key: apply_url_change(app, op, url_key))
+            await db.start_listener()
+
+            # Click counts are buffered in memory and flushed in the background
+            if app_settings.hit_counting_enabled:
+                app.state.hit_counter = HitCounter(
+                    lambda counts: record_hits(counts, db),
+                    flush_interval=app_settings.hit_flush_interval,
+                    flush_threshold=app_settings.hit_flush_threshold,
+                    max_keys=app_settings.hit_max_pending_keys,
+                    max_retry_interval=app_settings.hit_max_retry_interval,
+                )
+                hit_counter_task = asyncio.create_task(app.state.hit_counter.run())
+
+            # Old minute and hour buckets are compacted into coarser ones
+            if app_settings.stats_rollup_interval > 0:
+                minute_retention = timedelta(hours=app_settings.stats_minute_retention_hours)
+                hour_retention = timedelta(days=app_settings.stats_hour_retention_days)
+                periodic_tasks.append(
+                    asyncio.create_task(
+                        run_periodically(
+                            "click bucket rollup",
+                            lambda: rollup_hit_buckets(db, minute_retention, hour_retention),
+                            app_settings.stats_rollup_interval,
+                        )
+                    )
+                )
+
+        # Bulk and then API requests get fast 503s while the loop or the pool is overloaded
+        app.state.load_shedder = None
+        if app_settings.shed_enabled:
+            app.state.load_shedder = LoadShedder(
+                max_loop_lag=app_settings.shed_max_loop_lag,
+                max_pool_waiting=app_settings.shed_max_pool_waiting,
+                max_checkout_wait=app_settings.shed_max_checkout_wait,
+                hold=app_settings.shed_hold,
+                pool_stats=db.pool_stats if db is not None else None,
+            )
+            load_shedder = app.state.load_shedder
+            periodic_tasks.append(
+                asyncio.create_task(
+                    run_periodically(
+                        "load sampling",
+                        lambda: load_shedder.sample(app_settings.shed_sample_interval),
+                        app_settings.shed_sample_interval,
+                    )
+                )
+            )
+
+        # The store behind the redirect and CRUD endpoints
+        storage = create_storage(app_settings, db)
+        await storage.connect()
+        app.state.storage = storage
+        logging.info(f"Using {storage.name} storage backend")
+
+        # /status reports not ready until the hot keys are cached
+        warm_up_task = asyncio.create_task(warm_up(app))
+
+        # A snapshot renamed over the served one is picked up without a restart
+        if app_settings.storage_backend == "snapshot" and app_settings.snapshot_reload_interval > 0:
+            periodic_tasks.append(
+                asyncio.create_task(
+                    run_periodically(
+                        "snapshot reload", lambda: reload_snapshot(app), app_settings.snapshot_reload_interval
+                    )
+                )
+            )
+
+        # Expired links are deleted in small batches; snapshots are rebuilt by export instead
+        if app_settings.storage_backend != "snapshot" and app_settings.expiry_sweep_interval > 0:
+            periodic_tasks.append(
+                asyncio.create_task(
+                    run_periodically(
+                        "expired link sweep",
+                        lambda: sweep_expired_urls(
+                            app.state.storage,
+                            cache=app.state.url_cache,
+                            key_filter=app.state.key_filter,
+                            batch_size=app_settings.expiry_sweep_batch_size,
+                            max_batches=app_settings.expiry_sweep_max_batches,
+                        ),
+                        app_settings.expiry_sweep_interval,
+                    )
+                )
+            )
+
+        # The stale cache file is refreshed now and then, not only on a clean shutdown
+        if (
+            app.state.stale_cache is not None
+            and app_settings.stale_cache_file
+            and app_settings.stale_cache_save_interval > 0
+        ):
+            periodic_tasks.append(
+                asyncio.create_task(
+                    run_periodically(
+                        "stale cache save",
+                        lambda: save_stale_cache(app),
+                        app_settings.stale_cache_save_interval,
+                    )
+                )
+            )
+
+        # Buckets of clients that went quiet are dropped once they are full again
+        if app.state.rate_limiter is not None and app_settings.rate_limit_eviction_interval > 0:
+            periodic_tasks.append(
+                asyncio.create_task(
+                    run_periodically(
+                        "rate limit bucket eviction",
+                        lambda: evict_idle_rate_limits(app),
+                        app_settings.rate_limit_eviction_interval,
+                    )
+                )
+            )
 
         yield
 
         # Cleanup
-        await db.disconnect()
-        logging.info("Application shutdown, database connection closed")
+        warm_up_task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await warm_up_task
+        if app.state.url_cache is not None and app_settings.cache_warmup_file:
+            # The next start warms up with what this worker served last
+            try:
+                write_hot_keys_file(
+                    app_settings.cache_warmup_file, app.state.url_cache.hot_keys(app_settings.cache_warmup_keys)
+                )
+            except OSError as e:
+                logging.error(f"Could not save hot keys: {str(e)}")
+        if app.state.stale_cache is not None and app_settings.stale_cache_file:
+            # A worker restarted during an outage can still redirect
+            await save_stale_cache(app)
+        for task in periodic_tasks:
+            task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+        if hit_counter_task is not None:
+            # Cancelling makes the counter write out its remaining hits
+            hit_counter_task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await hit_counter_task
+        await storage.disconnect()
+        if db is not None:
+            await db.disconnect()
+        logging.info("Application shutdown, storage closed")
     except Exception as e:
         logging.error(f"Error during application startup: {str(e)}")
         raise
@@ -119,13 +541,19 @@ app = Starlette(
     routes=routes,
     lifespan=lifespan,
     exception_handlers=exception_handlers,
+    middleware=[Middleware(MetricsMiddleware), Middleware(LoadSheddingMiddleware), Middleware(RateLimitMiddleware)],
 )
 
+# Serves GET /{short_url} redirects at the ASGI level, everything else goes to app
+fast_app = RedirectFastPath(app, exception_handlers)
+
 
 def main():
     port: Union[str, int] = os.getenv("APPLICATION_PORT", 8000)
     host: str = os.getenv("APPLICATION_HOST", "0.0.0.0")
-    uvicorn.run(app, host=host, port=int(port), loop="uvloop")
+    settings = AppSettings()
+    app_path = "shortener.app:fast_app" if settings.fast_redirect_enabled else "shortener.app:app"
+    serve(app_path, host=host, port=int(port), settings=settings)
 
 
 if __name__ == "__main__":
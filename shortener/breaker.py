@@ -0,0 +1,87 @@
+"""Circuit breaker that stops sending queries to a database that keeps failing."""
+
+import logging
+import time
+
+import psycopg
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(psycopg.OperationalError):
+    """Raised instead of checking out a connection while the breaker is open.
+
+    It is an OperationalError, so callers handle it like the connection
+    failure it stands in for.
+    """
+
+
+class CircuitBreaker:
+    """Counts consecutive connection failures and fails fast once there are too many.
+
+    After failure_threshold failures in a row the breaker opens and every
+    call is refused at once instead of waiting up to the pool timeout for a
+    connection. reset_timeout seconds later it is half-open: the next call
+    goes through as a probe while the others are still refused. A probe that
+    succeeds closes the breaker, one that fails opens it for another
+    reset_timeout. A probe that ends neither way, e.g. because its request
+    was cancelled, is replaced by another one after reset_timeout.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 10.0):
+        """Initialize a closed breaker; a failure_threshold of 0 or less never opens it."""
+        self.failure_threshold: int = failure_threshold
+        self.reset_timeout: float = reset_timeout
+        self.state: str = CLOSED
+        self.failures: int = 0
+        self.rejected: int = 0
+        self.opened: int = 0
+        self._retry_at: float = 0.0
+
+    def allow(self, now: float | None = None) -> bool:
+        """Return True if a call may go to the database, admitting it as the probe if one is due."""
+        if self.state == CLOSED:
+            return True
+        if now is None:
+            now = time.monotonic()
+        if now < self._retry_at:
+            self.rejected += 1
+            return False
+        self.state = HALF_OPEN
+        self._retry_at = now + self.reset_timeout
+        return True
+
+    def check(self) -> None:
+        """Raise CircuitOpenError unless a call may go to the database."""
+        if not self.allow():
+            raise CircuitOpenError("Database circuit breaker is open")
+
+    def record_success(self) -> None:
+        """Close the breaker after a call the database answered."""
+        if self.state != CLOSED:
+            logging.info("Database reachable again, closing the circuit breaker")
+        self.state = CLOSED
+        self.failures = 0
+
+    def record_failure(self, now: float | None = None) -> None:
+        """Count a failed call, opening the breaker after failure_threshold in a row or a failed probe."""
+        if now is None:
+            now = time.monotonic()
+        if self.state == HALF_OPEN:
+            self._open(now)
+        elif self.state == CLOSED:
+            self.failures += 1
+            if 0 < self.failure_threshold <= self.failures:
+                logging.error(f"Database failed {self.failures} times in a row, opening the circuit breaker")
+                self._open(now)
+
+    def _open(self, now: float) -> None:
+        self.state = OPEN
+        self.opened += 1
+        self._retry_at = now + self.reset_timeout
+
+    def stats(self) -> dict[str, int | str]:
+        """Return the state, consecutive failures and the number of calls refused and times opened."""
+        return {"state": self.state, "failures": self.failures, "rejected": self.rejected, "opened": self.opened}
@@ -0,0 +1,102 @@
+"""In-process LRU/TTL cache for redirect lookups."""
+
+import time
+from collections import OrderedDict
+
+
+class UrlCache:
+    """Bounded read-through cache mapping url_key to target URL and the link's own redirect status.
+
+    Entries are evicted in least-recently-used order once max_size is reached
+    and are treated as missing once they are older than ttl seconds.
+
+    Keys are remembered for invalidation_window seconds after they are
+    invalidated, so that lookups can bypass read replicas that may not have
+    replayed the change yet instead of caching the old row for a full ttl.
+    """
+
+    def __init__(
+        self, max_size: int = 10000, ttl: float = 60.0, stats_enabled: bool = True, invalidation_window: float = 5.0
+    ):
+        """Initialize cache with size and TTL limits."""
+        self.max_size: int = max_size
+        self.ttl: float = ttl
+        self.stats_enabled: bool = stats_enabled
+        self.invalidation_window: float = invalidation_window
+        self.hits: int = 0
+        self.misses: int = 0
+        self._entries: OrderedDict[str, tuple[str, float, int | None]] = OrderedDict()
+        # url_key -> monotonic time of its last invalidation, oldest first
+        self._invalidated: OrderedDict[str, float] = OrderedDict()
+        self._cleared_at: float = float("-inf")
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> str | None:
+        """Return the cached target for key, or None if missing or expired."""
+        entry = self.get_redirect(key)
+        return entry[0] if entry is not None else None
+
+    def get_redirect(self, key: str) -> tuple[str, int | None] | None:
+        """Return the cached target and redirect status for key, or None if missing or expired."""
+        entry = self._entries.get(key)
+        if entry is None or entry[1] < time.monotonic():
+            if self.stats_enabled:
+                self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        if self.stats_enabled:
+            self.hits += 1
+        return entry[0], entry[2]
+
+    def set(self, key: str, target: str, ttl: float | None = None, redirect_status: int | None = None) -> None:
+        """Store target for key, evicting the least recently used entry if full.
+
+        A ttl shorter than the cache's own, such as the time left until the
+        link expires, limits how long this entry is served.
+        """
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if self.max_size <= 0 or ttl <= 0:
+            return
+
+        self._entries[key] = (target, time.monotonic() + ttl, redirect_status)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def hot_keys(self, limit: int) -> list[str]:
+        """Return up to limit cached keys, most recently used first."""
+        return [key for key, _ in zip(reversed(self._entries), range(limit))]
+
+    def invalidate(self, key: str) -> None:
+        """Remove key from the cache if present and remember when it was invalidated."""
+        self._entries.pop(key, None)
+        now = time.monotonic()
+        self._invalidated[key] = now
+        self._invalidated.move_to_end(key)
+        while self._invalidated and next(iter(self._invalidated.values())) <= now - self.invalidation_window:
+            self._invalidated.popitem(last=False)
+
+    def clear(self) -> None:
+        """Remove all entries, keeping the hit/miss counters, and treat every key as just invalidated."""
+        self._entries.clear()
+        self._invalidated.clear()
+        self._cleared_at = time.monotonic()
+
+    def recently_invalidated(self, key: str) -> bool:
+        """Return True if key was invalidated, or the cache cleared, within the last invalidation_window seconds."""
+        since = time.monotonic() - self.invalidation_window
+        return self._cleared_at > since or self._invalidated.get(key, since) > since
+
+    def stats(self) -> dict[str, int | float]:
+        """Return cache size and hit/miss counters."""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
@@ -1,63 +1,307 @@
 """Database configuration using psycopg3 connection pool."""
 
-from typing import AsyncGenerator
+import asyncio
+import logging
+import time
+import uuid
+from typing import AsyncGenerator, Callable
 from contextlib import asynccontextmanager
 
+import psycopg
 from psycopg import AsyncConnection
 from psycopg_pool import AsyncConnectionPool
 from psycopg.rows import dict_row
 
+from shortener.breaker import CircuitBreaker
 from shortener.settings import PostgresSettings
 
+# Channel used to broadcast short_urls changes between processes
+CHANGE_CHANNEL = "short_urls_changed"
+
+ChangeCallback = Callable[[str, str], None]
+
+REPLICA_SELECTIONS = ("round_robin", "least_busy")
+
 
 class Database:
     """Database connection pool manager using psycopg3."""
 
     def __init__(self, settings: PostgresSettings):
         """Initialize database with settings."""
+        if settings.replica_selection not in REPLICA_SELECTIONS:
+            raise ValueError(f"Unknown replica selection: {settings.replica_selection}")
         self.settings: PostgresSettings = settings
         self.pool: AsyncConnectionPool | None = None
+        self.replica_pools: list[AsyncConnectionPool] = []
+        self._replica_down_until: list[float] = []
+        self._replica_turn: int = 0
+        self.instance_id: str = uuid.uuid4().hex[:12]
+        self._change_callbacks: list[ChangeCallback] = []
+        self._listener_task: asyncio.Task | None = None
+        self._last_success: float = 0.0
+        self.breaker: CircuitBreaker = CircuitBreaker(
+            failure_threshold=settings.breaker_failure_threshold, reset_timeout=settings.breaker_reset_timeout
+        )
 
     async def connect(self) -> None:
-        """Create the connection pool."""
-        self.pool = AsyncConnectionPool(
-            self.settings.postgres_dsn,
+        """Create the connection pool of the primary and one per replica."""
+        self.pool = self._create_pool(self.settings.postgres_dsn)
+        await self.pool.open()
+
+        self.replica_pools = [self._create_pool(dsn) for dsn in self.settings.replica_dsns]
+        self._replica_down_until = [0.0] * len(self.replica_pools)
+        for replica_pool in self.replica_pools:
+            await replica_pool.open()
+
+    def _create_pool(self, dsn: str) -> AsyncConnectionPool:
+        return AsyncConnectionPool(
+            dsn,
             min_size=self.settings.min_size,
             max_size=self.settings.max_size,
             timeout=self.settings.timeout,
+            configure=self._configure_connection,
+            open=False,
         )
-        await self.pool.open()
+
+    async def _configure_connection(self, conn: AsyncConnection) -> None:
+        """Set up prepared statement handling on each new pooled connection.
+
+        With the default threshold of 0 every statement is prepared on its
+        first execution, so the fixed queries in actions.py are parsed and
+        planned once per connection and then run as named prepared statements.
+        """
+        conn.prepare_threshold = self.settings.prepare_threshold
+        conn.prepared_max = self.settings.prepared_max
 
     async def disconnect(self) -> None:
         """Close the connection pool."""
+        await self.stop_listener()
+        for replica_pool in self.replica_pools:
+            await replica_pool.close()
+        self.replica_pools = []
         if self.pool:
             await self.pool.close()  # type: ignore[union-attr]
 
+    def add_change_callback(self, callback: ChangeCallback) -> None:
+        """Register callback(op, url_key) for changes made by other processes.
+
+        op is "create", "update" or "delete". After the listener connection is
+        re-established following a loss, callback is invoked with op "reset"
+        and an empty key, since notifications sent while it was disconnected
+        are lost.
+        """
+        self._change_callbacks.append(callback)
+
+    async def publish_change(self, conn: AsyncConnection, op: str, url_key: str) -> None:
+        """Queue a change notification, delivered when conn's transaction commits."""
+        if not self.settings.notify_enabled:
+            return
+        await conn.execute(
+            "SELECT pg_notify(%s, %s)",
+            (CHANGE_CHANNEL, f"{self.instance_id}:{op}:{url_key}"),
+        )
+
+    async def publish_changes(self, conn: AsyncConnection, op: str, url_keys: list[str]) -> None:
+        """Queue one change notification per key in a single statement."""
+        if not self.settings.notify_enabled or not url_keys:
+            return
+        await conn.execute(
+            "SELECT pg_notify(%s, %s || k) FROM unnest(%s::text[]) AS k",
+            (CHANGE_CHANNEL, f"{self.instance_id}:{op}:", url_keys),
+        )
+
+    async def start_listener(self) -> None:
+        """Start the dedicated LISTEN connection for change notifications."""
+        if not self.settings.notify_enabled or self._listener_task is not None:
+            return
+        self._listener_task = asyncio.create_task(self._listen())
+
+    async def stop_listener(self) -> None:
+        """Stop the LISTEN connection if it is running."""
+        if self._listener_task is None:
+            return
+        self._listener_task.cancel()
+        try:
+            await self._listener_task
+        except asyncio.CancelledError:
+            pass
+        self._listener_task = None
+
+    async def _listen(self) -> None:
+        """Receive notifications forever, reconnecting after connection loss."""
+        # The first LISTEN follows startup, which has just loaded everything itself
+        listened = False
+        while True:
+            try:
+                async with await AsyncConnection.connect(self.settings.postgres_dsn, autocommit=True) as conn:
+                    await conn.execute(f"LISTEN {CHANGE_CHANNEL}")
+                    if listened:
+                        self._dispatch_change("reset", "")
+                    listened = True
+                    async for notify in conn.notifies():
+                        self.handle_notification(notify.payload)
+            except psycopg.OperationalError as e:
+                logging.error(f"Change listener connection lost: {str(e)}")
+                await asyncio.sleep(self.settings.listen_retry_interval)
+
+    def handle_notification(self, payload: str) -> None:
+        """Dispatch a change notification payload, ignoring our own changes."""
+        origin, _, change = payload.partition(":")
+        if origin == self.instance_id:
+            return
+        op, _, url_key = change.partition(":")
+        self._dispatch_change(op, url_key)
+
+    def _dispatch_change(self, op: str, url_key: str) -> None:
+        for callback in self._change_callbacks:
+            try:
+                callback(op, url_key)
+            except Exception as e:
+                logging.error(f"Change callback failed for {op} {url_key}: {str(e)}")
+
+    def _select_replica(self) -> int | None:
+        """Return the index of a healthy replica to read from, or None to use the primary."""
+        now = time.monotonic()
+        healthy = [index for index, down_until in enumerate(self._replica_down_until) if down_until <= now]
+        if not healthy:
+            return None
+
+        if self.settings.replica_selection == "least_busy":
+
+            def busy(index: int) -> int:
+                stats = self.replica_pools[index].get_stats()
+                return stats.get("pool_size", 0) - stats.get("pool_available", 0) + stats.get("requests_waiting", 0)
+
+            return min(healthy, key=busy)
+
+        self._replica_turn = (self._replica_turn + 1) % len(healthy)
+        return healthy[self._replica_turn]
+
+    def _mark_replica_down(self, index: int, error: Exception) -> None:
+        """Stop reading from a replica for replica_retry_interval seconds."""
+        logging.error(f"Replica {index} unavailable, reading from the primary: {str(error)}")
+        self._replica_down_until[index] = time.monotonic() + self.settings.replica_retry_interval
+
+    def pool_stats(self) -> dict[str, dict[str, int]]:
+        """Return AsyncConnectionPool statistics of the primary and each replica, by pool name."""
+        stats = {"primary": self.pool.get_stats()} if self.pool else {}
+        for index, replica_pool in enumerate(self.replica_pools):
+            stats[f"replica{index}"] = replica_pool.get_stats()
+        return stats
+
+    def replica_stats(self) -> list[dict[str, int | bool]]:
+        """Return the health and pool usage of each replica."""
+        now = time.monotonic()
+        return [
+            {"healthy": down_until <= now, **replica_pool.get_stats()}
+            for replica_pool, down_until in zip(self.replica_pools, self._replica_down_until)
+        ]
+
     @asynccontextmanager
-    async def get_connection(self) -> AsyncGenerator[AsyncConnection, None]:
-        """Get a connection from the pool."""
+    async def get_connection(self, replica: bool = False) -> AsyncGenerator[AsyncConnection, None]:
+        """Get a connection from the pool.
+
+        With replica=True the connection comes from a healthy read replica if
+        any are configured, so it must only be used for reads that tolerate
+        replication lag. A replica that fails to hand out a connection is
+        skipped for replica_retry_interval seconds.
+
+        Connections to the primary go through the circuit breaker: while it
+        is open CircuitOpenError is raised at once, and OperationalErrors
+        count towards opening it.
+        """
         if not self.pool:
             raise RuntimeError("Database not connected. Call connect() first.")
 
-        async with self.pool.connection() as conn:  # type: ignore[union-attr]
-            yield conn
+        index = self._select_replica() if replica else None
+        if index is None:
+            self.breaker.check()
+            try:
+                async with self.pool.connection() as conn:  # type: ignore[union-attr]
+                    yield conn
+            except psycopg.OperationalError:
+                self.breaker.record_failure()
+                raise
+            except psycopg.Error:
+                # The database answered, e.g. with a constraint violation
+                self.breaker.record_success()
+                raise
+            self.breaker.record_success()
+            return
+
+        try:
+            async with self.replica_pools[index].connection() as conn:
+                yield conn
+        except psycopg.OperationalError as e:
+            self._mark_replica_down(index, e)
+            raise
+
+    @asynccontextmanager
+    async def pipeline(self) -> AsyncGenerator[AsyncConnection, None]:
+        """Get a connection from the pool in pipeline mode.
+
+        Statements executed on it are sent without waiting for each other's
+        results and are flushed in one round trip when the block exits. Cursor
+        results such as rowcount are only available after the block.
+        """
+        async with self.get_connection() as conn:
+            async with conn.pipeline():
+                yield conn
+
+    async def execute_pipeline(self, statements: list[tuple[str, tuple]]) -> list[list[tuple]]:
+        """Execute several statements in one round trip and return each one's rows."""
+        async with self.pipeline() as conn:
+            cursors = [await conn.execute(query, params or None) for query, params in statements]  # type: ignore[arg-type]
+        self._last_success = time.monotonic()
+        return [await cur.fetchall() if cur.description else [] for cur in cursors]
+
+    def recently_healthy(self) -> bool:
+        """Return True if a query succeeded within the health check interval."""
+        return time.monotonic() - self._last_success < self.settings.health_check_interval
 
     async def execute(self, query: str, *args) -> None:
         """Execute a query without returning results."""
         async with self.get_connection() as conn:
             await conn.execute(query, args if args else None)  # type: ignore[arg-type]
+        self._last_success = time.monotonic()
 
-    async def execute_one(self, query: str, *args) -> tuple | None:
-        """Execute a query and return a single row as a tuple."""
-        async with self.get_connection() as conn:
-            result = await conn.execute(query, args if args else None)  # type: ignore[arg-type]
-            return await result.fetchone()
+    async def execute_one(self, query: str, *args, replica: bool = False) -> tuple | None:
+        """Execute a query and return a single row as a tuple.
+
+        With replica=True the query may run on a read replica, and is retried
+        on the primary if the replica is unreachable.
+        """
+        rows = await self._fetch(query, args, replica, fetch_all=False)
+        return rows[0] if rows else None
+
+    async def execute_all(self, query: str, *args, replica: bool = False) -> list[tuple]:
+        """Execute a query and return all rows as tuples.
+
+        With replica=True the query may run on a read replica, and is retried
+        on the primary if the replica is unreachable.
+        """
+        return await self._fetch(query, args, replica, fetch_all=True)
+
+    async def _fetch(self, query: str, args: tuple, replica: bool, fetch_all: bool) -> list[tuple]:
+        if replica and self.replica_pools:
+            try:
+                async with self.get_connection(replica=True) as conn:
+                    return await self._fetch_on(conn, query, args, fetch_all)
+            except psycopg.OperationalError:
+                pass
 
-    async def execute_all(self, query: str, *args) -> list[tuple]:
-        """Execute a query and return all rows as tuples."""
         async with self.get_connection() as conn:
-            result = await conn.execute(query, args if args else None)  # type: ignore[arg-type]
+            rows = await self._fetch_on(conn, query, args, fetch_all)
+        self._last_success = time.monotonic()
+        return rows
+
+    @staticmethod
+    async def _fetch_on(conn: AsyncConnection, query: str, args: tuple, fetch_all: bool) -> list[tuple]:
+        result = await conn.execute(query, args if args else None)  # type: ignore[arg-type]
+        if fetch_all:
             return await result.fetchall()
+        row = await result.fetchone()
+        return [row] if row is not None else []
 
     async def execute_one_dict(self, query: str, *args) -> dict | None:
         """Execute a query and return a single row as a dictionary."""
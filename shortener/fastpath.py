@@ -0,0 +1,115 @@
+"""Raw ASGI fast path for the redirect route."""
+
+import time
+from functools import lru_cache
+from typing import Any, Awaitable, Callable, Mapping
+from urllib.parse import quote
+
+from starlette.applications import Starlette
+from starlette.exceptions import HTTPException
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.types import Receive, Scope, Send
+
+from shortener.actions import get_redirect
+from shortener.metrics import METRICS
+from shortener.redirects import DEFAULT_REDIRECT_POLICY, RedirectPolicy
+from shortener.ratelimit import REDIRECT_BUDGET, RateLimiter, send_too_many_requests
+from shortener.views import RESERVED_PATHS, STALE_REDIRECT_HEADERS, validate_key
+
+ExceptionHandler = Callable[[Request, Any], Awaitable[Response]]
+
+_EMPTY_BODY: dict[str, Any] = {"type": "http.response.body", "body": b""}
+
+_STALE_HEADERS = [(name.encode("latin-1"), value.encode("latin-1")) for name, value in STALE_REDIRECT_HEADERS.items()]
+
+
+@lru_cache(maxsize=65536)
+def location_header(target_url: str) -> bytes:
+    """Return the Location header value RedirectResponse would send for target_url."""
+    return quote(target_url, safe=":/%#?=@[]!$&'()*+,;").encode("latin-1")
+
+
+@lru_cache(maxsize=64)
+def cache_control_header(policy: RedirectPolicy, status: int) -> bytes:
+    """Return the Cache-Control header value of redirects with status under policy."""
+    return policy.cache_control(status).encode("latin-1")
+
+
+class RedirectFastPath:
+    """ASGI wrapper serving GET /{short_url} redirects without Starlette routing.
+
+    Valid redirect lookups skip routing, Request construction and Response
+    building, and are answered straight from the ASGI scope. Errors raised by
+    the lookup go through the same exception handlers as the wrapped app, and
+    every other request, including invalid keys, is passed to the app
+    unchanged, so responses are identical to those of the redirect_url view.
+    """
+
+    def __init__(self, app: Starlette, exception_handlers: Mapping[type, ExceptionHandler]):
+        """Wrap app, using exception_handlers to render lookup errors."""
+        self.app: Starlette = app
+        self.exception_handlers: Mapping[type, ExceptionHandler] = exception_handlers
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] != "GET" or scope.get("root_path"):
+            await self.app(scope, receive, send)
+            return
+
+        path: str = scope["path"]
+        short_url = path[1:]
+        if "/" in short_url or path in RESERVED_PATHS or not validate_key(short_url):
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        state = self.app.state
+        rate_limiter: RateLimiter | None = getattr(state, "rate_limiter", None)
+        if rate_limiter is not None:
+            retry_after = rate_limiter.check(scope, REDIRECT_BUDGET)
+            if retry_after:
+                await send_too_many_requests(scope, receive, send, retry_after)
+                METRICS.observe_request("redirect_url", 429, time.perf_counter() - start)
+                return
+
+        try:
+            target_url, redirect_status, is_stale = await get_redirect(
+                short_url,
+                state.storage,
+                cache=getattr(state, "url_cache", None),
+                key_filter=getattr(state, "key_filter", None),
+                coalescer=getattr(state, "lookup_coalescer", None),
+                stale=getattr(state, "stale_cache", None),
+            )
+        except HTTPException as exc:
+            status = await self._handle_exception(exc, scope, receive, send)
+            METRICS.observe_request("redirect_url", status, time.perf_counter() - start)
+            return
+
+        hit_counter = getattr(state, "hit_counter", None)
+        if hit_counter is not None:
+            hit_counter.record(short_url)
+
+        policy: RedirectPolicy = getattr(state, "redirect_policy", None) or DEFAULT_REDIRECT_POLICY
+        status = policy.status_of(redirect_status)
+        if is_stale:
+            headers = [*_STALE_HEADERS, (b"content-length", b"0"), (b"location", location_header(target_url))]
+        else:
+            headers = [
+                (b"cache-control", cache_control_header(policy, status)),
+                (b"content-length", b"0"),
+                (b"location", location_header(target_url)),
+            ]
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send(_EMPTY_BODY)
+        METRICS.observe_request("redirect_url", status, time.perf_counter() - start)
+
+    async def _handle_exception(self, exc: HTTPException, scope: Scope, receive: Receive, send: Send) -> int:
+        """Render exc with the handler Starlette would pick for it and return the status code sent."""
+        for cls in type(exc).__mro__:
+            handler = self.exception_handlers.get(cls)
+            if handler is not None:
+                response = await handler(Request(scope, receive), exc)
+                await response(scope, receive, send)
+                return response.status_code
+        raise exc
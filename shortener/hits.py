@@ -0,0 +1,104 @@
+"""Write-behind buffer for per-link click counts."""
+
+import asyncio
+import logging
+from typing import Awaitable, Callable
+
+FlushCallback = Callable[[dict[str, int]], Awaitable[None]]
+
+
+class HitCounter:
+    """Aggregates redirect hits in memory and flushes them in batches.
+
+    record() is a plain dict increment, so the redirect path never waits on
+    the database. run() flushes the aggregated deltas every flush_interval
+    seconds, or sooner once flush_threshold hits are pending. If a flush
+    fails, its deltas are merged back and retried with the next batch; the
+    retries back off exponentially up to max_retry_interval and are not
+    woken early by the threshold. At most max_keys distinct keys are
+    buffered, so during a long outage hits of further keys are dropped and
+    counted instead of growing memory.
+    """
+
+    def __init__(
+        self,
+        flush: FlushCallback,
+        flush_interval: float = 1.0,
+        flush_threshold: int = 10000,
+        max_keys: int = 100000,
+        max_retry_interval: float = 60.0,
+    ):
+        """Initialize the buffer; flush is awaited with each batch of deltas."""
+        self.flush_interval: float = flush_interval
+        self.flush_threshold: int = flush_threshold
+        self.max_keys: int = max_keys
+        self.max_retry_interval: float = max_retry_interval
+        self.flushed: int = 0
+        self.dropped: int = 0
+        self._flush = flush
+        self._counts: dict[str, int] = {}
+        self._pending: int = 0
+        self._failures: int = 0
+        self._wakeup = asyncio.Event()
+
+    @property
+    def pending(self) -> int:
+        """Number of hits recorded but not yet flushed."""
+        return self._pending
+
+    def record(self, url_key: str) -> None:
+        """Count one hit for url_key, or drop it if max_keys other keys are pending."""
+        hits = self._counts.get(url_key)
+        if hits is None and len(self._counts) >= self.max_keys:
+            self.dropped += 1
+            return
+        self._counts[url_key] = (hits or 0) + 1
+        self._pending += 1
+        if self._pending >= self.flush_threshold and not self._failures:
+            self._wakeup.set()
+
+    def retry_delay(self) -> float:
+        """Return the seconds until the next flush: flush_interval, doubled for each failure in a row."""
+        if not self._failures:
+            return self.flush_interval
+        return min(self.max_retry_interval, self.flush_interval * 2 ** min(self._failures, 32))
+
+    def stats(self) -> dict[str, int]:
+        """Return the number of hits pending, flushed and dropped at the key cap."""
+        return {"pending": self._pending, "flushed": self.flushed, "dropped": self.dropped}
+
+    async def flush(self) -> None:
+        """Write all pending deltas now."""
+        if not self._counts:
+            return
+
+        counts, pending = self._counts, self._pending
+        self._counts, self._pending = {}, 0
+        try:
+            await self._flush(counts)
+            self.flushed += pending
+            self._failures = 0
+        except Exception as e:
+            self._failures += 1
+            logging.error(f"Hit counter flush failed, retrying in {self.retry_delay():.0f}s: {str(e)}")
+            for url_key, hits in counts.items():
+                current = self._counts.get(url_key)
+                if current is None and len(self._counts) >= self.max_keys:
+                    self.dropped += hits
+                    continue
+                self._counts[url_key] = (current or 0) + hits
+                self._pending += hits
+
+    async def run(self) -> None:
+        """Flush periodically until cancelled, then flush whatever is left."""
+        try:
+            while True:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.retry_delay())
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+                await self.flush()
+        except asyncio.CancelledError:
+            await self.flush()
+            raise
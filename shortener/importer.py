@@ -0,0 +1,265 @@
+"""Offline bulk import of short URLs from CSV or NDJSON using COPY FROM STDIN."""
+
+import argparse
+import asyncio
+import csv
+import json
+import logging
+import sys
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Iterator
+
+import psycopg
+from psycopg import AsyncConnection
+from psycopg import errors as psycopg_errors
+
+from shortener.database import Database
+from shortener.settings import AppSettings, PostgresSettings
+from shortener.views import RESERVED_KEYS, validate_key, validate_url
+
+POLICIES = ("skip", "overwrite", "fail")
+FORMATS = ("csv", "ndjson")
+
+# Duplicate handling when merging the staging table into short_urls. Files carry no
+# expiry or redirect status, so like PUT /urls/{short_url} without them, overwrite
+# leaves a link that never expires and follows the default redirect policy.
+_MERGE_SQL = {
+    "skip": (
+        "INSERT INTO short_urls (url_key, target, created_at) "
+        "SELECT DISTINCT ON (url_key) url_key, target, COALESCE(created_at, CURRENT_TIMESTAMP) "
+        "FROM import_short_urls ORDER BY url_key, ord "
+        "ON CONFLICT (url_key) DO NOTHING"
+    ),
+    "overwrite": (
+        "INSERT INTO short_urls (url_key, target, created_at) "
+        "SELECT DISTINCT ON (url_key) url_key, target, COALESCE(created_at, CURRENT_TIMESTAMP) "
+        "FROM import_short_urls ORDER BY url_key, ord DESC "
+        "ON CONFLICT (url_key) DO UPDATE SET target = EXCLUDED.target, expires_at = NULL, redirect_status = NULL"
+    ),
+    "fail": (
+        "INSERT INTO short_urls (url_key, target, created_at) "
+        "SELECT url_key, target, COALESCE(created_at, CURRENT_TIMESTAMP) FROM import_short_urls ORDER BY ord"
+    ),
+}
+
+
+class ImportFailed(Exception):
+    """Raised when the fail policy meets a key that already exists."""
+
+
+@dataclass
+class ImportStats:
+    """Counters reported at the end of an import."""
+
+    read: int = 0
+    invalid: int = 0
+    written: int = 0
+    batches: int = 0
+
+    @property
+    def duplicates(self) -> int:
+        """Valid rows that were not written, because the key existed or repeated in the file."""
+        return self.read - self.invalid - self.written
+
+
+def read_rows(path: str, file_format: str) -> Iterator[tuple[int, dict]]:
+    """
+    Read link rows from a CSV or NDJSON file.
+
+    CSV files must have a header row with short_url and target_url columns;
+    NDJSON files hold one object with those keys per line. An optional
+    created_at column/key is passed through, so files written by
+    GET /urls/export can be imported as-is.
+
+    Args:
+        path: Path of the file to read, or "-" for stdin
+        file_format: "csv" or "ndjson"
+
+    Yields:
+        (line number, row) pairs
+    """
+    stream = sys.stdin if path == "-" else open(path, newline="", encoding="utf-8")
+    try:
+        if file_format == "csv":
+            reader = csv.DictReader(stream)
+            for row in reader:
+                yield reader.line_num, row
+        else:
+            for line_number, line in enumerate(stream, start=1):
+                if line.strip():
+                    try:
+                        yield line_number, json.loads(line)
+                    except json.JSONDecodeError:
+                        yield line_number, {}
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+
+def validate_row(row: dict, settings: AppSettings) -> tuple[str, str, datetime | None] | None:
+    """Return (url_key, target, created_at) for a valid row, or None if it is invalid."""
+    if not isinstance(row, dict):
+        return None
+    short_url = row.get("short_url")
+    target_url = row.get("target_url")
+    if not isinstance(short_url, str) or not validate_key(short_url, max_length=settings.max_key_length):
+        return None
+    if short_url in RESERVED_KEYS:
+        return None
+    if not isinstance(target_url, str) or not validate_url(target_url, max_length=settings.max_url_length):
+        return None
+
+    created_at = None
+    if row.get("created_at"):
+        try:
+            created_at = datetime.fromisoformat(str(row["created_at"]))
+        except ValueError:
+            return None
+    return short_url, target_url, created_at
+
+
+async def import_batch(conn: AsyncConnection, rows: list[tuple[str, str, datetime | None]], policy: str) -> int:
+    """
+    Copy one batch into a staging table and merge it into short_urls.
+
+    The batch runs in its own transaction.
+
+    Returns:
+        Number of rows inserted or updated
+
+    Raises:
+        ImportFailed: If policy is "fail" and a key already exists
+    """
+    try:
+        async with conn.transaction():
+            await conn.execute(
+                "CREATE TEMP TABLE import_short_urls "
+                "(ord INTEGER, url_key VARCHAR(255), target VARCHAR(2048), created_at TIMESTAMP) ON COMMIT DROP"
+            )
+            async with conn.cursor() as cur:
+                async with cur.copy("COPY import_short_urls (ord, url_key, target, created_at) FROM STDIN") as copy:
+                    for ord_, (url_key, target, created_at) in enumerate(rows):
+                        await copy.write_row((ord_, url_key, target, created_at))
+            result = await conn.execute(_MERGE_SQL[policy])
+            return result.rowcount
+    except psycopg_errors.UniqueViolation as e:
+        raise ImportFailed(e.diag.message_detail or str(e))
+
+
+async def import_file(
+    db: Database,
+    path: str,
+    file_format: str,
+    policy: str = "skip",
+    batch_size: int = 100000,
+    settings: AppSettings | None = None,
+) -> ImportStats:
+    """
+    Import a CSV or NDJSON file of links into short_urls.
+
+    Rows are validated with the same rules as the HTTP API and imported in
+    batches of batch_size, each committed separately. When the fail policy
+    aborts, earlier batches stay committed. Running workers are told to
+    reset their caches whenever any row was written.
+
+    Args:
+        db: Connected Database instance
+        path: Path of the file to import, or "-" for stdin
+        file_format: "csv" or "ndjson"
+        policy: What to do with keys that already exist: skip, overwrite or fail
+        batch_size: Number of rows per COPY batch
+        settings: Application settings holding the validation limits
+
+    Returns:
+        Import counters
+
+    Raises:
+        ImportFailed: If policy is "fail" and a key already exists
+    """
+    if policy not in POLICIES:
+        raise ValueError(f"Unknown duplicate policy: {policy}")
+    settings = settings or AppSettings()
+    stats = ImportStats()
+    batch: list[tuple[str, str, datetime | None]] = []
+
+    async with db.get_connection() as conn:
+        await conn.set_autocommit(True)
+        try:
+            for line_number, row in read_rows(path, file_format):
+                stats.read += 1
+                valid_row = validate_row(row, settings)
+                if valid_row is None:
+                    stats.invalid += 1
+                    logging.warning(f"Skipping invalid row on line {line_number}: {row}")
+                    continue
+                batch.append(valid_row)
+                if len(batch) >= batch_size:
+                    stats.written += await import_batch(conn, batch, policy)
+                    stats.batches += 1
+                    batch.clear()
+                    logging.info(f"Imported {stats.written} rows so far")
+
+            if batch:
+                stats.written += await import_batch(conn, batch, policy)
+                stats.batches += 1
+        finally:
+            # Running workers drop their caches and rebuild their key filters, also
+            # when the import was aborted after some batches were committed
+            if stats.written:
+                try:
+                    await db.publish_change(conn, "reset", "")
+                except psycopg.Error as e:
+                    logging.error(f"Could not notify running workers of the imported rows: {str(e)}")
+            await conn.set_autocommit(False)
+
+    return stats
+
+
+def _detect_format(path: str) -> str:
+    return "ndjson" if path.endswith((".ndjson", ".jsonl", ".json")) else "csv"
+
+
+async def _run(args: argparse.Namespace) -> int:
+    db = Database(PostgresSettings())
+    await db.connect()
+    try:
+        stats = await import_file(
+            db,
+            args.path,
+            args.format or _detect_format(args.path),
+            policy=args.on_duplicate,
+            batch_size=args.batch_size,
+        )
+    except ImportFailed as e:
+        logging.error(f"Import aborted on duplicate key: {str(e)}")
+        return 1
+    finally:
+        await db.disconnect()
+
+    logging.info(
+        f"Import finished: {stats.read} rows read, {stats.written} written, "
+        f"{stats.duplicates} duplicates skipped, {stats.invalid} invalid"
+    )
+    return 0
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Import short URLs from a CSV or NDJSON file.")
+    parser.add_argument("path", help="File to import, or - for stdin")
+    parser.add_argument("--format", choices=FORMATS, help="File format (default: from file extension)")
+    parser.add_argument(
+        "--on-duplicate",
+        choices=POLICIES,
+        default="skip",
+        help="What to do with keys that already exist (default: skip)",
+    )
+    parser.add_argument("--batch-size", type=int, default=100000, help="Rows per COPY batch (default: 100000)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    return asyncio.run(_run(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
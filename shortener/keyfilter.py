@@ -0,0 +1,98 @@
+"""Probabilistic membership filter over existing url_key values."""
+
+import hashlib
+import math
+
+
+class KeyFilter:
+    """Counting Bloom filter answering "is this url_key possibly stored?".
+
+    A negative answer is definitive, so lookups for unknown keys can be
+    rejected without touching the database. Each slot is a 4-bit counter
+    (two per byte) so keys can also be removed when they are deleted. A
+    counter that reaches 15 saturates and is never decremented again, which
+    can only cause false positives, never false negatives.
+    """
+
+    _COUNTER_MAX = 15
+
+    def __init__(self, capacity: int, error_rate: float = 0.01):
+        """Size the filter for capacity keys at the given false-positive rate."""
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        if not 0 < error_rate < 1:
+            raise ValueError("error_rate must be between 0 and 1")
+
+        self.capacity: int = capacity
+        self.error_rate: float = error_rate
+        self.num_slots: int = max(8, math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.num_hashes: int = max(1, round(self.num_slots / capacity * math.log(2)))
+        self.count: int = 0
+        self.rejected: int = 0
+        self._counters = bytearray((self.num_slots + 1) // 2)
+
+    def _slots(self, key: str) -> list[int]:
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.num_slots for i in range(self.num_hashes)]
+
+    def _get_counter(self, slot: int) -> int:
+        byte = self._counters[slot >> 1]
+        return (byte >> 4) if slot & 1 else (byte & 0x0F)
+
+    def _set_counter(self, slot: int, value: int) -> None:
+        index = slot >> 1
+        byte = self._counters[index]
+        if slot & 1:
+            self._counters[index] = (byte & 0x0F) | (value << 4)
+        else:
+            self._counters[index] = (byte & 0xF0) | value
+
+    def add(self, key: str) -> None:
+        """Record key as present."""
+        for slot in self._slots(key):
+            value = self._get_counter(slot)
+            if value < self._COUNTER_MAX:
+                self._set_counter(slot, value + 1)
+        self.count += 1
+
+    def remove(self, key: str) -> None:
+        """Forget a key previously passed to add()."""
+        slots = self._slots(key)
+        if not all(self._get_counter(slot) for slot in slots):
+            return
+        for slot in slots:
+            value = self._get_counter(slot)
+            if value < self._COUNTER_MAX:
+                self._set_counter(slot, value - 1)
+        self.count = max(0, self.count - 1)
+
+    def __contains__(self, key: object) -> bool:
+        if not isinstance(key, str):
+            return False
+        if all(self._get_counter(slot) for slot in self._slots(key)):
+            return True
+        self.rejected += 1
+        return False
+
+    @property
+    def memory_bytes(self) -> int:
+        """Size of the counter array in bytes."""
+        return len(self._counters)
+
+    @property
+    def false_positive_rate(self) -> float:
+        """Estimated false-positive rate for the current number of keys."""
+        return (1 - math.exp(-self.num_hashes * self.count / self.num_slots)) ** self.num_hashes
+
+    def stats(self) -> dict[str, int | float]:
+        """Return size, memory use and estimated false-positive rate."""
+        return {
+            "keys": self.count,
+            "capacity": self.capacity,
+            "num_hashes": self.num_hashes,
+            "memory_bytes": self.memory_bytes,
+            "false_positive_rate": self.false_positive_rate,
+            "rejected": self.rejected,
+        }
@@ -0,0 +1,78 @@
+"""Server-side short key generation from pre-allocated blocks of a Postgres sequence."""
+
+import asyncio
+
+from shortener.database import Database
+from shortener.storage import StorageError
+
+BASE62_ALPHABET = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
+KEY_SEQUENCE = "short_url_key_seq"
+
+
+def encode_base62(number: int) -> str:
+    """Encode a non-negative integer as a base62 string that matches KEY_PATTERN."""
+    if number < 0:
+        raise ValueError("Cannot encode a negative number")
+    if number == 0:
+        return BASE62_ALPHABET[0]
+
+    digits = []
+    while number:
+        number, remainder = divmod(number, 62)
+        digits.append(BASE62_ALPHABET[remainder])
+    return "".join(reversed(digits))
+
+
+class KeyAllocator:
+    """Hands out unique base62 keys using hi/lo allocation.
+
+    Each call to nextval() on the sequence reserves a whole block of ids (the
+    sequence's INCREMENT BY), which are then handed out from memory. Workers
+    never share a block, so generated keys cannot collide with each other and
+    only one in every block_size keys costs a database round trip. Ids left
+    in a block when the process exits are simply skipped, and so are ids
+    whose key is one of reserved_keys.
+    """
+
+    def __init__(self, db: Database, reserved_keys: frozenset[str] = frozenset()):
+        """Initialize the allocator; the first block is reserved on first use."""
+        self.db: Database = db
+        self.reserved_keys: frozenset[str] = reserved_keys
+        self.blocks_reserved: int = 0
+        self._next: int = 0
+        self._end: int = 0
+        self._lock = asyncio.Lock()
+
+    @property
+    def remaining(self) -> int:
+        """Number of ids left in the current block."""
+        return self._end - self._next
+
+    async def next_id(self) -> int:
+        """Return the next unused id, reserving a new block if needed."""
+        if self._next >= self._end:
+            async with self._lock:
+                # Another task may have reserved a block while this one waited
+                if self._next >= self._end:
+                    await self._reserve_block()
+        next_id = self._next
+        self._next += 1
+        return next_id
+
+    async def next_key(self) -> str:
+        """Return the next unused key that is not reserved."""
+        while True:
+            key = encode_base62(await self.next_id())
+            if key not in self.reserved_keys:
+                return key
+
+    async def _reserve_block(self) -> None:
+        row = await self.db.execute_one(
+            f"SELECT nextval('{KEY_SEQUENCE}'), seqincrement FROM pg_sequence "
+            f"WHERE seqrelid = '{KEY_SEQUENCE}'::regclass"
+        )
+        if row is None:
+            raise StorageError(f"Sequence {KEY_SEQUENCE} does not exist")
+        start, block_size = row
+        self._next, self._end = start, start + block_size
+        self.blocks_reserved += 1
@@ -0,0 +1,307 @@
+"""In-process request and query metrics exposed in the Prometheus text format."""
+
+import contextlib
+import time
+from bisect import bisect_left
+from typing import Any, Mapping
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Upper bounds in seconds of the latency histogram buckets
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Pool counters from AsyncConnectionPool.get_stats() and how they are exposed
+_POOL_GAUGES = {
+    "pool_size": "Connections currently managed by the pool",
+    "pool_available": "Idle connections in the pool",
+    "requests_waiting": "Clients waiting for a connection",
+}
+_POOL_COUNTERS = {
+    "requests_num": "Connection requests made to the pool",
+    "requests_queued": "Connection requests that had to wait",
+    "requests_errors": "Connection requests that failed or timed out",
+    "connections_lost": "Connections found broken",
+}
+
+# LoadShedder.stats() gauges of the admission control
+_LOAD_GAUGES = {
+    "pressure": "Largest ratio of a load signal to its shedding threshold",
+    "loop_lag_seconds": "Event loop lag at the last sample",
+    "pool_waiting": "Clients waiting for a connection at the last sample",
+    "checkout_wait_seconds": "Mean connection checkout time since the previous sample",
+}
+
+# KeyFilter.stats() gauges of the negative-lookup filter
+_KEY_FILTER_GAUGES = {
+    "keys": "Keys recorded in the key filter",
+    "capacity": "Keys the key filter was sized for",
+    "memory_bytes": "Memory used by the key filter's counters",
+    "false_positive_rate": "Estimated false-positive rate of the key filter at its current size",
+}
+
+# HitCounter.stats() counters of the click count buffer
+_HIT_COUNTERS = {
+    "flushed": "Redirect hits written to the database",
+    "dropped": "Redirect hits dropped because too many links had hits buffered",
+}
+
+# CircuitBreaker.stats() counters of the database circuit breaker
+_BREAKER_COUNTERS = {
+    "rejected": "Queries refused without trying while the circuit breaker was open",
+    "opened": "Times the circuit breaker opened",
+}
+
+# SingleFlight.stats() counters of the redirect lookup coalescer
+_LOOKUP_COUNTERS = {
+    "executed": "Redirect lookup queries sent to the storage",
+    "coalesced": "Redirect lookups that shared a query already in flight instead of sending their own",
+}
+
+
+class Histogram:
+    """Fixed-bucket latency histogram.
+
+    observe() is a bisect and two additions, without locks: all recording
+    happens on the event loop thread, so updates cannot interleave.
+    """
+
+    __slots__ = ("bounds", "counts", "sum")
+
+    def __init__(self, bounds: tuple[float, ...] = LATENCY_BUCKETS):
+        """Initialize empty buckets for the given upper bounds plus +Inf."""
+        self.bounds: tuple[float, ...] = bounds
+        self.counts: list[int] = [0] * (len(bounds) + 1)
+        self.sum: float = 0.0
+
+    @property
+    def count(self) -> int:
+        """Number of observations."""
+        return sum(self.counts)
+
+    def observe(self, value: float) -> None:
+        """Record one observation."""
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+    def render(self, name: str, labels: str) -> list[str]:
+        """Return the Prometheus sample lines of this histogram."""
+        lines = []
+        cumulative = 0
+        for bound, count in zip((*self.bounds, "+Inf"), self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f"{name}_sum{{{labels}}} {self.sum}")
+        lines.append(f"{name}_count{{{labels}}} {cumulative}")
+        return lines
+
+
+class QueryTimer:
+    """Context manager recording the duration of one database statement."""
+
+    __slots__ = ("histogram", "start")
+
+    def __init__(self, histogram: Histogram):
+        self.histogram: Histogram = histogram
+        self.start: float = 0.0
+
+    def __enter__(self) -> None:
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.histogram.observe(time.perf_counter() - self.start)
+
+
+class Metrics:
+    """Registry of request and query latency histograms."""
+
+    def __init__(self) -> None:
+        """Initialize an empty, enabled registry."""
+        self.enabled: bool = True
+        self.requests: dict[tuple[str, int], Histogram] = {}
+        self.queries: dict[str, Histogram] = {}
+
+    def observe_request(self, route: str, status: int, duration: float) -> None:
+        """Record a finished HTTP request handled by route."""
+        if not self.enabled:
+            return
+        histogram = self.requests.get((route, status))
+        if histogram is None:
+            histogram = self.requests[(route, status)] = Histogram()
+        histogram.observe(duration)
+
+    def time_query(self, statement: str) -> QueryTimer | contextlib.nullcontext:
+        """Return a context manager timing one execution of statement."""
+        if not self.enabled:
+            return contextlib.nullcontext()
+        histogram = self.queries.get(statement)
+        if histogram is None:
+            histogram = self.queries[statement] = Histogram()
+        return QueryTimer(histogram)
+
+    def reset(self) -> None:
+        """Drop all recorded observations."""
+        self.requests.clear()
+        self.queries.clear()
+
+    def render(
+        self,
+        pool_stats: Mapping[str, Mapping[str, int]] | None = None,
+        lookup_stats: Mapping[str, int] | None = None,
+        rate_limit_stats: Mapping[str, Mapping[str, int]] | None = None,
+        load_stats: Mapping[str, float] | None = None,
+        breaker_stats: Mapping[str, int | str] | None = None,
+        hit_stats: Mapping[str, int] | None = None,
+        stale_served: int | None = None,
+        key_filter_stats: Mapping[str, int | float] | None = None,
+    ) -> str:
+        """
+        Render all metrics in the Prometheus text exposition format.
+
+        Args:
+            pool_stats: AsyncConnectionPool.get_stats() of each pool, by pool name
+            lookup_stats: SingleFlight.stats() of the redirect lookup coalescer
+            rate_limit_stats: RateLimiter.stats() of the per-client rate limiter
+            load_stats: LoadShedder.stats() of the admission control
+            breaker_stats: CircuitBreaker.stats() of the database circuit breaker
+            stale_served: Number of redirects served from the stale cache
+            hit_stats: HitCounter.stats() of the click count buffer
+            key_filter_stats: KeyFilter.stats() of the filter currently in use
+
+        Returns:
+            The metrics page
+        """
+        lines = [
+            "# HELP shortener_http_request_duration_seconds HTTP request latency by route and status code",
+            "# TYPE shortener_http_request_duration_seconds histogram",
+        ]
+        for (route, status), histogram in sorted(self.requests.items()):
+            lines.extend(
+                histogram.render("shortener_http_request_duration_seconds", f'route="{route}",status="{status}"')
+            )
+
+        lines.append("# HELP shortener_db_query_duration_seconds Database statement latency by action")
+        lines.append("# TYPE shortener_db_query_duration_seconds histogram")
+        for statement, histogram in sorted(self.queries.items()):
+            lines.extend(histogram.render("shortener_db_query_duration_seconds", f'statement="{statement}"'))
+
+        pool_stats = pool_stats or {}
+        for key, help_text in _POOL_GAUGES.items():
+            lines.append(f"# HELP shortener_db_{key} {help_text}")
+            lines.append(f"# TYPE shortener_db_{key} gauge")
+            for pool, stats in pool_stats.items():
+                lines.append(f'shortener_db_{key}{{pool="{pool}"}} {stats.get(key, 0)}')
+        for key, help_text in _POOL_COUNTERS.items():
+            lines.append(f"# HELP shortener_db_{key}_total {help_text}")
+            lines.append(f"# TYPE shortener_db_{key}_total counter")
+            for pool, stats in pool_stats.items():
+                lines.append(f'shortener_db_{key}_total{{pool="{pool}"}} {stats.get(key, 0)}')
+        lines.append("# HELP shortener_db_requests_wait_seconds_total Time clients spent waiting for a connection")
+        lines.append("# TYPE shortener_db_requests_wait_seconds_total counter")
+        for pool, stats in pool_stats.items():
+            wait_seconds = stats.get("requests_wait_ms", 0) / 1000
+            lines.append(f'shortener_db_requests_wait_seconds_total{{pool="{pool}"}} {wait_seconds}')
+
+        if key_filter_stats is not None:
+            for key, help_text in _KEY_FILTER_GAUGES.items():
+                lines.append(f"# HELP shortener_key_filter_{key} {help_text}")
+                lines.append(f"# TYPE shortener_key_filter_{key} gauge")
+                lines.append(f"shortener_key_filter_{key} {key_filter_stats.get(key, 0)}")
+            lines.append("# HELP shortener_key_filter_rejected_total Lookups of unknown keys answered without a query")
+            lines.append("# TYPE shortener_key_filter_rejected_total counter")
+            lines.append(f"shortener_key_filter_rejected_total {key_filter_stats.get('rejected', 0)}")
+
+        if lookup_stats is not None:
+            for key, help_text in _LOOKUP_COUNTERS.items():
+                lines.append(f"# HELP shortener_lookups_{key}_total {help_text}")
+                lines.append(f"# TYPE shortener_lookups_{key}_total counter")
+                lines.append(f"shortener_lookups_{key}_total {lookup_stats.get(key, 0)}")
+            lines.append("# HELP shortener_lookups_in_flight Redirect lookup queries currently running")
+            lines.append("# TYPE shortener_lookups_in_flight gauge")
+            lines.append(f"shortener_lookups_in_flight {lookup_stats.get('in_flight', 0)}")
+
+        if rate_limit_stats is not None:
+            lines.append("# HELP shortener_rate_limited_total Requests rejected with 429 by budget")
+            lines.append("# TYPE shortener_rate_limited_total counter")
+            for budget, stats in rate_limit_stats.items():
+                lines.append(f'shortener_rate_limited_total{{budget="{budget}"}} {stats.get("rejected", 0)}')
+            lines.append("# HELP shortener_rate_limit_clients Clients with a partly used budget")
+            lines.append("# TYPE shortener_rate_limit_clients gauge")
+            for budget, stats in rate_limit_stats.items():
+                lines.append(f'shortener_rate_limit_clients{{budget="{budget}"}} {stats.get("clients", 0)}')
+            lines.append("# HELP shortener_rate_limit_evicted_total Buckets dropped because the client cap was reached")
+            lines.append("# TYPE shortener_rate_limit_evicted_total counter")
+            for budget, stats in rate_limit_stats.items():
+                lines.append(f'shortener_rate_limit_evicted_total{{budget="{budget}"}} {stats.get("evicted", 0)}')
+
+        if load_stats is not None:
+            for key, help_text in _LOAD_GAUGES.items():
+                lines.append(f"# HELP shortener_{key} {help_text}")
+                lines.append(f"# TYPE shortener_{key} gauge")
+                lines.append(f"shortener_{key} {load_stats.get(key, 0)}")
+            lines.append("# HELP shortener_shed_requests_total Requests refused with 503 while overloaded, by priority")
+            lines.append("# TYPE shortener_shed_requests_total counter")
+            for key, count in load_stats.items():
+                if key.startswith("shed_"):
+                    lines.append(f'shortener_shed_requests_total{{priority="{key[5:]}"}} {count}')
+
+        if breaker_stats is not None:
+            lines.append("# HELP shortener_db_breaker_open Whether the database circuit breaker refuses queries")
+            lines.append("# TYPE shortener_db_breaker_open gauge")
+            lines.append(f"shortener_db_breaker_open {int(breaker_stats.get('state') == 'open')}")
+            for key, help_text in _BREAKER_COUNTERS.items():
+                lines.append(f"# HELP shortener_db_breaker_{key}_total {help_text}")
+                lines.append(f"# TYPE shortener_db_breaker_{key}_total counter")
+                lines.append(f"shortener_db_breaker_{key}_total {breaker_stats.get(key, 0)}")
+
+        if stale_served is not None:
+            lines.append("# HELP shortener_stale_redirects_total Redirects served from the stale cache")
+            lines.append("# TYPE shortener_stale_redirects_total counter")
+            lines.append(f"shortener_stale_redirects_total {stale_served}")
+
+        if hit_stats is not None:
+            lines.append("# HELP shortener_hits_pending Redirect hits buffered but not yet written")
+            lines.append("# TYPE shortener_hits_pending gauge")
+            lines.append(f"shortener_hits_pending {hit_stats.get('pending', 0)}")
+            for key, help_text in _HIT_COUNTERS.items():
+                lines.append(f"# HELP shortener_hits_{key}_total {help_text}")
+                lines.append(f"# TYPE shortener_hits_{key}_total counter")
+                lines.append(f"shortener_hits_{key}_total {hit_stats.get(key, 0)}")
+
+        return "\n".join(lines) + "\n"
+
+
+# Shared by the middleware, the redirect fast path and actions.py
+METRICS = Metrics()
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency and status code of every HTTP request.
+
+    Requests are labelled with the name of the endpoint function that
+    Starlette routed them to, or "unmatched" if no route matched.
+    """
+
+    def __init__(self, app: ASGIApp, metrics: Metrics = METRICS):
+        """Wrap app, recording into metrics."""
+        self.app: ASGIApp = app
+        self.metrics: Metrics = metrics
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self.metrics.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        start = time.perf_counter()
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = getattr(scope.get("endpoint"), "__name__", None) or "unmatched"
+            self.metrics.observe_request(route, status, time.perf_counter() - start)
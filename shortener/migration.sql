@@ -5,8 +5,45 @@ CREATE TABLE IF NOT EXISTS short_urls (
     id SERIAL PRIMARY KEY,
     url_key VARCHAR(255) UNIQUE NOT NULL,
     target VARCHAR(2048) NOT NULL,
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP NOT NULL
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP NOT NULL,
+    expires_at TIMESTAMPTZ,
+    redirect_status SMALLINT CHECK (redirect_status IN (301, 302, 307, 308))
 );
 
+-- Add link expiry to tables created before it existed
+ALTER TABLE short_urls ADD COLUMN IF NOT EXISTS expires_at TIMESTAMPTZ;
+
+-- Add per-link redirect status to tables created before it existed; NULL follows APP_REDIRECT_STATUS
+ALTER TABLE short_urls ADD COLUMN IF NOT EXISTS redirect_status SMALLINT
+    CHECK (redirect_status IN (301, 302, 307, 308));
+
+-- Partial index walked by the expiry sweeper, holding only links that expire
+CREATE INDEX IF NOT EXISTS idx_short_urls_expires_at ON short_urls(expires_at) WHERE expires_at IS NOT NULL;
+
 -- Create index on url_key for faster lookups
 CREATE INDEX IF NOT EXISTS idx_short_urls_url_key ON short_urls(url_key);
+
+-- Create index backing keyset pagination of the URL listing (newest first)
+CREATE INDEX IF NOT EXISTS idx_short_urls_created_at_id ON short_urls(created_at, id);
+
+-- Per-link click counts, written in batches by the hit counter
+CREATE TABLE IF NOT EXISTS url_hits (
+    url_key VARCHAR(255) PRIMARY KEY REFERENCES short_urls(url_key) ON DELETE CASCADE,
+    hits BIGINT DEFAULT 0 NOT NULL,
+    last_hit_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP NOT NULL
+);
+
+-- Time-bucketed click counts; minute buckets are rolled up into hours, hours into days
+CREATE TABLE IF NOT EXISTS url_hit_buckets (
+    url_key VARCHAR(255) NOT NULL REFERENCES short_urls(url_key) ON DELETE CASCADE,
+    resolution VARCHAR(6) NOT NULL CHECK (resolution IN ('minute', 'hour', 'day')),
+    bucket_start TIMESTAMP NOT NULL,
+    hits BIGINT DEFAULT 0 NOT NULL,
+    PRIMARY KEY (url_key, resolution, bucket_start)
+);
+
+-- Create index used by the rollup job to find expired fine-grained buckets
+CREATE INDEX IF NOT EXISTS idx_url_hit_buckets_rollup ON url_hit_buckets(resolution, bucket_start);
+
+-- Sequence of generated key ids; each nextval() reserves a block of INCREMENT BY ids
+CREATE SEQUENCE IF NOT EXISTS short_url_key_seq START WITH 1000 INCREMENT BY 1000;
@@ -6,13 +6,77 @@ CREATE_TABLE_SQL = """
         id SERIAL PRIMARY KEY,
         url_key VARCHAR(255) UNIQUE NOT NULL,
         target VARCHAR(2048) NOT NULL,
-        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP NOT NULL
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP NOT NULL,
+        expires_at TIMESTAMPTZ,
+        redirect_status SMALLINT CHECK (redirect_status IN (301, 302, 307, 308))
     )
 """
 
+# Adds link expiry to tables created before it existed
+ADD_EXPIRES_AT_COLUMN_SQL = """
+    ALTER TABLE short_urls ADD COLUMN IF NOT EXISTS expires_at TIMESTAMPTZ
+"""
+
+# Adds per-link redirect status to tables created before it existed; NULL follows APP_REDIRECT_STATUS
+ADD_REDIRECT_STATUS_COLUMN_SQL = """
+    ALTER TABLE short_urls ADD COLUMN IF NOT EXISTS redirect_status SMALLINT
+        CHECK (redirect_status IN (301, 302, 307, 308))
+"""
+
+# Partial index the expiry sweeper walks, holding only links that expire
+CREATE_EXPIRES_AT_INDEX_SQL = """
+    CREATE INDEX IF NOT EXISTS idx_short_urls_expires_at ON short_urls(expires_at) WHERE expires_at IS NOT NULL
+"""
+
 # Create index on url_key for faster lookups
 CREATE_INDEX_SQL = """
     CREATE INDEX IF NOT EXISTS idx_short_urls_url_key ON short_urls(url_key)
 """
 
-__all__ = ["CREATE_TABLE_SQL", "CREATE_INDEX_SQL"]
+# Create index backing keyset pagination of the URL listing (newest first)
+CREATE_CREATED_AT_INDEX_SQL = """
+    CREATE INDEX IF NOT EXISTS idx_short_urls_created_at_id ON short_urls(created_at, id)
+"""
+
+# Per-link click counts, written in batches by the hit counter
+CREATE_HITS_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS url_hits (
+        url_key VARCHAR(255) PRIMARY KEY REFERENCES short_urls(url_key) ON DELETE CASCADE,
+        hits BIGINT DEFAULT 0 NOT NULL,
+        last_hit_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP NOT NULL
+    )
+"""
+
+# Time-bucketed click counts; minute buckets are rolled up into hours, hours into days
+CREATE_HIT_BUCKETS_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS url_hit_buckets (
+        url_key VARCHAR(255) NOT NULL REFERENCES short_urls(url_key) ON DELETE CASCADE,
+        resolution VARCHAR(6) NOT NULL CHECK (resolution IN ('minute', 'hour', 'day')),
+        bucket_start TIMESTAMP NOT NULL,
+        hits BIGINT DEFAULT 0 NOT NULL,
+        PRIMARY KEY (url_key, resolution, bucket_start)
+    )
+"""
+
+# Create index used by the rollup job to find expired fine-grained buckets
+CREATE_HIT_BUCKETS_INDEX_SQL = """
+    CREATE INDEX IF NOT EXISTS idx_url_hit_buckets_rollup ON url_hit_buckets(resolution, bucket_start)
+"""
+
+# Sequence of generated key ids; each nextval() reserves a block of INCREMENT BY ids
+CREATE_KEY_SEQUENCE_SQL = """
+    CREATE SEQUENCE IF NOT EXISTS short_url_key_seq START WITH 1000 INCREMENT BY 1000
+"""
+
+__all__ = [
+    "CREATE_TABLE_SQL",
+    "ADD_EXPIRES_AT_COLUMN_SQL",
+    "ADD_REDIRECT_STATUS_COLUMN_SQL",
+    "CREATE_EXPIRES_AT_INDEX_SQL",
+    "CREATE_INDEX_SQL",
+    "CREATE_CREATED_AT_INDEX_SQL",
+    "CREATE_HITS_TABLE_SQL",
+    "CREATE_HIT_BUCKETS_TABLE_SQL",
+    "CREATE_HIT_BUCKETS_INDEX_SQL",
+    "CREATE_KEY_SEQUENCE_SQL",
+]
@@ -0,0 +1,163 @@
+"""Per-client token-bucket rate limiting of redirects and URL writes."""
+
+import math
+import time
+from typing import Iterable
+
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from shortener.views import RESERVED_PATHS
+
+# Budgets a request can be charged to
+REDIRECT_BUDGET = "redirect"
+WRITE_BUDGET = "write"
+
+_WRITE_METHODS = frozenset({"POST", "PUT", "PATCH", "DELETE"})
+
+
+class TokenBuckets:
+    """Token buckets of many clients sharing one refill rate and size.
+
+    Each bucket is a (tokens, updated_at) tuple in a dict, refilled lazily
+    when its client next asks for a token, so an idle client costs only its
+    dict entry. All requests of a worker run on one event loop thread, so
+    the dict needs no lock. A bucket that has refilled completely behaves
+    exactly like a missing one; evict_idle() drops those. The dict is kept
+    in least recently used order, and once it holds max_clients buckets the
+    least recently used one is dropped for each new client, so memory stays
+    bounded however many clients appear between evictions.
+    """
+
+    def __init__(self, per_minute: int, burst: int | None = None, max_clients: int = 100000):
+        """Initialize empty buckets refilling per_minute tokens a minute and holding up to burst tokens."""
+        self.rate: float = max(1, per_minute) / 60.0
+        self.burst: float = float(burst if burst is not None else max(1, per_minute))
+        self.max_clients: int = max(1, max_clients)
+        self.rejected: int = 0
+        self.evicted: int = 0
+        self._buckets: dict[str, tuple[float, float]] = {}
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def take(self, key: str, now: float | None = None) -> float:
+        """Take a token from key's bucket; return 0 if one was taken, else seconds until one is available."""
+        if now is None:
+            now = time.monotonic()
+        # Popped and reinserted, so the dict stays in least recently used order
+        bucket = self._buckets.pop(key, None)
+        if bucket is None and len(self._buckets) >= self.max_clients:
+            del self._buckets[next(iter(self._buckets))]
+            self.evicted += 1
+        tokens = self.burst if bucket is None else min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+        if tokens < 1.0:
+            self._buckets[key] = (tokens, now)
+            self.rejected += 1
+            return (1.0 - tokens) / self.rate
+        self._buckets[key] = (tokens - 1.0, now)
+        return 0.0
+
+    def evict_idle(self, now: float | None = None) -> int:
+        """Drop the buckets that have refilled completely and return how many were dropped."""
+        if now is None:
+            now = time.monotonic()
+        full_after = self.burst / self.rate
+        idle = [key for key, (_, updated_at) in self._buckets.items() if now - updated_at >= full_after]
+        for key in idle:
+            del self._buckets[key]
+        return len(idle)
+
+
+class RateLimiter:
+    """Separate per-client budgets for redirects and for URL writes.
+
+    Clients sending one of the known API keys in the API key header are
+    limited per key, all others per client IP. Unknown header values are
+    ignored, so a client cannot get a fresh budget by inventing keys.
+    Buckets live in the worker process, so with several workers a client
+    spreading requests over many connections may get up to one budget per
+    worker.
+    """
+
+    def __init__(
+        self,
+        redirects_per_minute: int,
+        writes_per_minute: int,
+        api_key_header: str = "x-api-key",
+        api_keys: Iterable[str] = (),
+        max_clients: int = 100000,
+    ):
+        """Initialize empty budgets of up to max_clients clients each; the header name is matched case-insensitively."""
+        self.budgets: dict[str, TokenBuckets] = {
+            REDIRECT_BUDGET: TokenBuckets(redirects_per_minute, max_clients=max_clients),
+            WRITE_BUDGET: TokenBuckets(writes_per_minute, max_clients=max_clients),
+        }
+        self.api_key_header: bytes = api_key_header.lower().encode("latin-1")
+        self.api_keys: frozenset[bytes] = frozenset(key.encode("latin-1") for key in api_keys)
+
+    def client_key(self, scope: Scope) -> str:
+        """Return the API key of the request if it is a known one, or else its client IP."""
+        for name, value in scope.get("headers", ()):
+            if name == self.api_key_header and value in self.api_keys:
+                return "key:" + value.decode("latin-1")
+        client = scope.get("client")
+        return "ip:" + (client[0] if client else "unknown")
+
+    def check(self, scope: Scope, budget: str) -> float:
+        """Charge the request to budget; return 0 if it may proceed, else seconds until it may be retried."""
+        return self.budgets[budget].take(self.client_key(scope))
+
+    def evict_idle(self) -> int:
+        """Drop the buckets of clients idle long enough to have a full budget again."""
+        return sum(buckets.evict_idle() for buckets in self.budgets.values())
+
+    def stats(self) -> dict[str, dict[str, int]]:
+        """Return the number of tracked clients, rejected requests and buckets dropped at the cap, by budget."""
+        return {
+            name: {"clients": len(buckets), "rejected": buckets.rejected, "evicted": buckets.evicted}
+            for name, buckets in self.budgets.items()
+        }
+
+
+def budget_for(method: str, path: str) -> str | None:
+    """Return the budget a request is charged to, or None if it is not limited."""
+    if method in _WRITE_METHODS and (path == "/urls" or path.startswith("/urls/")):
+        return WRITE_BUDGET
+    if method == "GET" and path.count("/") == 1 and path not in RESERVED_PATHS:
+        return REDIRECT_BUDGET
+    return None
+
+
+async def send_too_many_requests(scope: Scope, receive: Receive, send: Send, retry_after: float) -> None:
+    """Send a 429 response in the JSON error format of the app's exception handlers."""
+    response = JSONResponse(
+        {"error": "Too many requests", "detail": "Rate limit exceeded"},
+        status_code=429,
+        headers={"retry-after": str(math.ceil(retry_after))},
+    )
+    await response(scope, receive, send)
+
+
+class RateLimitMiddleware:
+    """ASGI middleware answering 429 to clients over their redirect or write budget.
+
+    The limiter is taken from app.state.rate_limiter, so nothing is limited
+    until the lifespan has set one up. Requests are rejected before routing
+    and before any database query is made.
+    """
+
+    def __init__(self, app: ASGIApp):
+        """Wrap app."""
+        self.app: ASGIApp = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http":
+            limiter: RateLimiter | None = getattr(scope["app"].state, "rate_limiter", None)
+            budget = budget_for(scope["method"], scope["path"]) if limiter is not None else None
+            if budget is not None:
+                retry_after = limiter.check(scope, budget)  # type: ignore[union-attr]
+                if retry_after:
+                    await send_too_many_requests(scope, receive, send, retry_after)
+                    return
+        await self.app(scope, receive, send)
@@ -0,0 +1,62 @@
+"""Status code and caching headers of redirect responses."""
+
+REDIRECT_STATUSES = (301, 302, 307, 308)
+
+# Statuses browsers and CDNs may remember beyond a single response
+PERMANENT_STATUSES = frozenset({301, 308})
+
+
+class RedirectPolicy:
+    """Chooses the status code and Cache-Control header of each redirect.
+
+    A link's own redirect status overrides the default one. Permanent (301,
+    308) and temporary (302, 307) redirects have separate max-ages, and
+    stale-while-revalidate lets caches keep answering while they refetch an
+    expired redirect. A max-age of 0 sends no-cache, so a permanent redirect
+    is not cached heuristically. Headers are built once per status, so the
+    redirect paths only look them up.
+    """
+
+    def __init__(
+        self,
+        status: int = 307,
+        max_age: int = 0,
+        permanent_max_age: int = 86400,
+        stale_while_revalidate: int = 0,
+    ):
+        """Initialize the policy; raises ValueError for an unknown default status."""
+        if status not in REDIRECT_STATUSES:
+            raise ValueError(f"Redirect status must be one of {REDIRECT_STATUSES}, got {status}")
+        self.status: int = status
+        self.max_age: int = max(0, max_age)
+        self.permanent_max_age: int = max(0, permanent_max_age)
+        self.stale_while_revalidate: int = max(0, stale_while_revalidate)
+        self._cache_control: dict[int, str] = {code: self._build_cache_control(code) for code in REDIRECT_STATUSES}
+
+    def _build_cache_control(self, status: int) -> str:
+        max_age = self.max_age_of(status)
+        if max_age == 0:
+            return "no-cache"
+        if self.stale_while_revalidate:
+            return f"public, max-age={max_age}, stale-while-revalidate={self.stale_while_revalidate}"
+        return f"public, max-age={max_age}"
+
+    def status_of(self, redirect_status: int | None) -> int:
+        """Return the status to send for a link with the given own status, if any."""
+        return redirect_status or self.status
+
+    def max_age_of(self, status: int) -> int:
+        """Return the max-age sent with redirects of the given status."""
+        return self.permanent_max_age if status in PERMANENT_STATUSES else self.max_age
+
+    def cache_control(self, status: int) -> str:
+        """Return the Cache-Control header value sent with redirects of the given status."""
+        return self._cache_control[status]
+
+    def cached_for(self, redirect_status: int | None) -> int:
+        """Return how many seconds caches may keep serving a redirect of a link with the given own status."""
+        max_age = self.max_age_of(self.status_of(redirect_status))
+        return max_age + self.stale_while_revalidate if max_age else 0
+
+
+DEFAULT_REDIRECT_POLICY = RedirectPolicy()
@@ -0,0 +1,104 @@
+"""Serve the application with one or more uvicorn worker processes."""
+
+import logging
+import multiprocessing
+import signal
+import socket
+import time
+from typing import Any
+
+import uvicorn
+
+from shortener.settings import AppSettings
+
+
+def uvicorn_options(settings: AppSettings) -> dict[str, Any]:
+    """Build the uvicorn tuning options shared by every serving mode."""
+    return {
+        "loop": "uvloop",
+        "http": settings.http_parser,
+        "backlog": settings.backlog,
+        "timeout_keep_alive": settings.keep_alive_timeout,
+        "limit_concurrency": settings.limit_concurrency or None,
+    }
+
+
+def bind_reuse_port(host: str, port: int, backlog: int) -> socket.socket:
+    """Bind a listening socket with SO_REUSEPORT so the kernel balances connections across workers."""
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _run_reuse_port_worker(app_path: str, host: str, port: int) -> None:
+    """Entry point of a worker process that owns its own SO_REUSEPORT socket."""
+    settings = AppSettings()
+    sock = bind_reuse_port(host, port, settings.backlog)
+    config = uvicorn.Config(app_path, host=host, port=port, **uvicorn_options(settings))
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def _supervise_reuse_port_workers(app_path: str, host: str, port: int, workers: int) -> None:
+    """Run workers processes, restart any that die, and stop them all on SIGINT/SIGTERM."""
+    context = multiprocessing.get_context("spawn")
+    stopping = False
+
+    def stop(signum: int, frame: Any) -> None:
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    def start_worker() -> multiprocessing.process.BaseProcess:
+        process = context.Process(target=_run_reuse_port_worker, args=(app_path, host, port), daemon=False)
+        process.start()
+        return process
+
+    processes = [start_worker() for _ in range(workers)]
+    logging.info(f"Started {workers} workers with SO_REUSEPORT on {host}:{port}")
+
+    while not stopping:
+        for index, process in enumerate(processes):
+            if not process.is_alive() and not stopping:
+                logging.error(f"Worker {process.pid} exited with code {process.exitcode}, restarting")
+                processes[index] = start_worker()
+        time.sleep(0.5)
+
+    for process in processes:
+        process.terminate()
+    for process in processes:
+        process.join()
+
+
+def serve(app_path: str, host: str, port: int, settings: AppSettings) -> None:
+    """
+    Serve app_path ("module:attribute") with the configured number of workers.
+
+    A single worker runs in this process. Several workers either share one
+    listening socket through uvicorn's process manager, or, with reuse_port,
+    each bind their own SO_REUSEPORT socket so the kernel spreads connections
+    evenly between them.
+
+    Args:
+        app_path: Import string of the ASGI application
+        host: Address to bind
+        port: Port to bind
+        settings: Application settings holding the worker and uvicorn options
+    """
+    if settings.workers > 1 and settings.reuse_port:
+        _supervise_reuse_port_workers(app_path, host, port, settings.workers)
+        return
+
+    uvicorn.run(
+        app_path,
+        host=host,
+        port=port,
+        workers=settings.workers if settings.workers > 1 else None,
+        **uvicorn_options(settings),
+    )
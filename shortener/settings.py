@@ -1,7 +1,7 @@
 """Application settings using dataclasses with environment variable support."""
 
 import os
-from dataclasses import dataclass
+from dataclasses import dataclass, field, replace
 
 
 def _load_env_file():
@@ -30,6 +30,14 @@ def _get_env_int(key: str, default: int) -> int:
         return default
 
 
+def _get_env_float(key: str, default: float) -> float:
+    """Get environment variable as float."""
+    try:
+        return float(_get_env(key, str(default)))
+    except ValueError:
+        return default
+
+
 def _get_env_bool(key: str, default: bool) -> bool:
     """Get environment variable as boolean."""
     value = _get_env(key, str(default)).lower()
@@ -56,6 +64,26 @@ class PostgresSettings:
     max_size: int = 25
     timeout: float = 60.0
 
+    # Server-side prepared statements; a negative threshold disables them
+    prepare_threshold: int | None = 0
+    prepared_max: int = 100
+
+    # A query that succeeded this recently counts as a passed health check
+    health_check_interval: float = 1.0
+
+    # Cross-process change notifications (LISTEN/NOTIFY)
+    notify_enabled: bool = True
+    listen_retry_interval: float = 1.0
+
+    # Read replicas; reads that tolerate replication lag are spread over them
+    replica_dsns: list[str] = field(default_factory=list)
+    replica_selection: str = "round_robin"
+    replica_retry_interval: float = 5.0
+
+    # Circuit breaker failing queries fast after this many connection failures in a row
+    breaker_failure_threshold: int = 5
+    breaker_reset_timeout: float = 10.0
+
     def __post_init__(self):
         """Load settings from environment variables with DB_ prefix."""
         self.host = _get_env("DB_HOST", self.host)
@@ -72,6 +100,35 @@ class PostgresSettings:
         except ValueError:
             pass
 
+        prepare_threshold = _get_env_int(
+            "DB_PREPARE_THRESHOLD", -1 if self.prepare_threshold is None else self.prepare_threshold
+        )
+        self.prepare_threshold = None if prepare_threshold < 0 else prepare_threshold
+        self.prepared_max = _get_env_int("DB_PREPARED_MAX", self.prepared_max)
+        self.health_check_interval = _get_env_float("DB_HEALTH_CHECK_INTERVAL", self.health_check_interval)
+        self.notify_enabled = _get_env_bool("DB_NOTIFY_ENABLED", self.notify_enabled)
+        self.listen_retry_interval = _get_env_float("DB_LISTEN_RETRY_INTERVAL", self.listen_retry_interval)
+        replica_dsns = _get_env("DB_REPLICA_DSNS")
+        if replica_dsns:
+            self.replica_dsns = [dsn.strip() for dsn in replica_dsns.split(",") if dsn.strip()]
+        self.replica_selection = _get_env("DB_REPLICA_SELECTION", self.replica_selection)
+        self.replica_retry_interval = _get_env_float("DB_REPLICA_RETRY_INTERVAL", self.replica_retry_interval)
+        self.breaker_failure_threshold = _get_env_int("DB_BREAKER_FAILURE_THRESHOLD", self.breaker_failure_threshold)
+        self.breaker_reset_timeout = _get_env_float("DB_BREAKER_RESET_TIMEOUT", self.breaker_reset_timeout)
+
+    def per_worker(self, workers: int) -> "PostgresSettings":
+        """Return a copy with pool sizes divided evenly between workers processes.
+
+        DB_MIN_SIZE and DB_MAX_SIZE are the budget for the whole server, so
+        adding workers does not multiply the number of Postgres connections.
+        Each worker still opens one extra connection for change notifications.
+        """
+        if workers <= 1:
+            return self
+        max_size = max(1, self.max_size // workers)
+        min_size = min(max_size, max(1, self.min_size // workers))
+        return replace(self, min_size=min_size, max_size=max_size)
+
     @property
     def postgres_dsn(self) -> str:
         """Build PostgreSQL connection string for psycopg."""
@@ -92,9 +149,107 @@ class AppSettings:
     max_url_length: int = 2048
     max_key_length: int = 50
 
-    # Rate limiting (for future implementation)
+    # Server processes and uvicorn tuning
+    workers: int = 1
+    reuse_port: bool = False
+    backlog: int = 2048
+    keep_alive_timeout: int = 5
+    limit_concurrency: int = 0
+    http_parser: str = "auto"
+
+    # Serve redirects from the raw ASGI fast path
+    fast_redirect_enabled: bool = True
+
+    # Request and query latency histograms served at /metrics
+    metrics_enabled: bool = True
+
+    # Serve GET /urls/* from the primary so clients see their own writes
+    read_your_writes: bool = True
+
+    # Store holding the URL mappings: "postgres", "memory", "sqlite" or "snapshot"
+    storage_backend: str = "postgres"
+    sqlite_path: str = "shortener.db"
+    sqlite_synchronous: str = "NORMAL"
+    snapshot_path: str = "shortener.snap"
+    snapshot_reload_interval: float = 1.0
+
+    # Redirect status (301, 302, 307 or 308) of links without their own, and Cache-Control max-ages
+    redirect_status: int = 307
+    redirect_max_age: int = 0
+    redirect_permanent_max_age: int = 86400
+    redirect_stale_while_revalidate: int = 0
+
+    # URL listing pagination
+    list_page_size: int = 100
+    list_max_page_size: int = 1000
+    list_stream_batch_size: int = 1000
+
+    # Bulk create
+    bulk_max_items: int = 10000
+
+    # Redirect lookup cache
+    cache_enabled: bool = True
+    cache_max_size: int = 10000
+    cache_ttl: float = 60.0
+    cache_stats_enabled: bool = True
+    # Seconds after an invalidation during which a key is read from the primary, not a replica
+    cache_invalidation_window: float = 5.0
+
+    # Preload the hottest keys into the cache before reporting ready
+    cache_warmup_enabled: bool = True
+    cache_warmup_keys: int = 1000
+    cache_warmup_window_hours: int = 24
+    cache_warmup_batch_size: int = 500
+    cache_warmup_budget: float = 5.0
+    cache_warmup_file: str = ""
+
+    # Last-known-good targets served as stale redirects while the database is unavailable
+    stale_cache_enabled: bool = True
+    stale_cache_max_size: int = 100000
+    stale_cache_file: str = ""
+    stale_cache_save_interval: float = 300.0
+
+    # Concurrent lookups of the same key share one query
+    lookup_coalescing_enabled: bool = True
+
+    # Click counting with a write-behind buffer
+    hit_counting_enabled: bool = True
+    hit_flush_interval: float = 1.0
+    hit_flush_threshold: int = 10000
+    hit_max_pending_keys: int = 100000
+    hit_max_retry_interval: float = 60.0
+
+    # Time-bucketed click analytics
+    stats_rollup_interval: float = 300.0
+    stats_minute_retention_hours: int = 48
+    stats_hour_retention_days: int = 90
+
+    # Background deletion of expired links
+    expiry_sweep_interval: float = 60.0
+    expiry_sweep_batch_size: int = 1000
+    expiry_sweep_max_batches: int = 100
+
+    # Negative-lookup filter over existing keys
+    key_filter_enabled: bool = False
+    key_filter_capacity: int = 1000000
+    key_filter_error_rate: float = 0.01
+
+    # Admission control: shed bulk, then API requests while loop lag, pool queue or checkout time is too high
+    shed_enabled: bool = False
+    shed_max_loop_lag: float = 0.1
+    shed_max_pool_waiting: int = 10
+    shed_max_checkout_wait: float = 0.1
+    shed_sample_interval: float = 0.1
+    shed_hold: float = 1.0
+
+    # Per-client token buckets: URL writes per minute, redirects per minute
     rate_limit_enabled: bool = False
     rate_limit_per_minute: int = 60
+    rate_limit_redirects_per_minute: int = 600
+    rate_limit_api_key_header: str = "X-API-Key"
+    rate_limit_api_keys: list[str] = field(default_factory=list)
+    rate_limit_max_clients: int = 100000
+    rate_limit_eviction_interval: float = 60.0
 
     def __post_init__(self):
         """Load settings from environment variables with APP_ prefix."""
@@ -104,8 +259,86 @@ class AppSettings:
         self.version = _get_env("APP_VERSION", self.version)
         self.max_url_length = _get_env_int("APP_MAX_URL_LENGTH", self.max_url_length)
         self.max_key_length = _get_env_int("APP_MAX_KEY_LENGTH", self.max_key_length)
+        self.workers = max(1, _get_env_int("APP_WORKERS", self.workers))
+        self.reuse_port = _get_env_bool("APP_REUSE_PORT", self.reuse_port)
+        self.backlog = _get_env_int("APP_BACKLOG", self.backlog)
+        self.keep_alive_timeout = _get_env_int("APP_KEEP_ALIVE_TIMEOUT", self.keep_alive_timeout)
+        self.limit_concurrency = _get_env_int("APP_LIMIT_CONCURRENCY", self.limit_concurrency)
+        self.http_parser = _get_env("APP_HTTP_PARSER", self.http_parser)
+        self.fast_redirect_enabled = _get_env_bool("APP_FAST_REDIRECT_ENABLED", self.fast_redirect_enabled)
+        self.metrics_enabled = _get_env_bool("APP_METRICS_ENABLED", self.metrics_enabled)
+        self.redirect_status = _get_env_int("APP_REDIRECT_STATUS", self.redirect_status)
+        self.redirect_max_age = _get_env_int("APP_REDIRECT_MAX_AGE", self.redirect_max_age)
+        self.redirect_permanent_max_age = _get_env_int(
+            "APP_REDIRECT_PERMANENT_MAX_AGE", self.redirect_permanent_max_age
+        )
+        self.redirect_stale_while_revalidate = _get_env_int(
+            "APP_REDIRECT_STALE_WHILE_REVALIDATE", self.redirect_stale_while_revalidate
+        )
+        self.list_page_size = _get_env_int("APP_LIST_PAGE_SIZE", self.list_page_size)
+        self.list_max_page_size = _get_env_int("APP_LIST_MAX_PAGE_SIZE", self.list_max_page_size)
+        self.list_stream_batch_size = _get_env_int("APP_LIST_STREAM_BATCH_SIZE", self.list_stream_batch_size)
+        self.read_your_writes = _get_env_bool("APP_READ_YOUR_WRITES", self.read_your_writes)
+        self.storage_backend = _get_env("APP_STORAGE_BACKEND", self.storage_backend).lower()
+        self.sqlite_path = _get_env("APP_SQLITE_PATH", self.sqlite_path)
+        self.sqlite_synchronous = _get_env("APP_SQLITE_SYNCHRONOUS", self.sqlite_synchronous).upper()
+        self.snapshot_path = _get_env("APP_SNAPSHOT_PATH", self.snapshot_path)
+        self.snapshot_reload_interval = _get_env_float("APP_SNAPSHOT_RELOAD_INTERVAL", self.snapshot_reload_interval)
+        self.bulk_max_items = _get_env_int("APP_BULK_MAX_ITEMS", self.bulk_max_items)
+        self.cache_enabled = _get_env_bool("APP_CACHE_ENABLED", self.cache_enabled)
+        self.cache_max_size = _get_env_int("APP_CACHE_MAX_SIZE", self.cache_max_size)
+        self.cache_ttl = _get_env_float("APP_CACHE_TTL", self.cache_ttl)
+        self.cache_stats_enabled = _get_env_bool("APP_CACHE_STATS_ENABLED", self.cache_stats_enabled)
+        self.cache_invalidation_window = _get_env_float("APP_CACHE_INVALIDATION_WINDOW", self.cache_invalidation_window)
+        self.cache_warmup_enabled = _get_env_bool("APP_CACHE_WARMUP_ENABLED", self.cache_warmup_enabled)
+        self.cache_warmup_keys = _get_env_int("APP_CACHE_WARMUP_KEYS", self.cache_warmup_keys)
+        self.cache_warmup_window_hours = _get_env_int("APP_CACHE_WARMUP_WINDOW_HOURS", self.cache_warmup_window_hours)
+        self.cache_warmup_batch_size = _get_env_int("APP_CACHE_WARMUP_BATCH_SIZE", self.cache_warmup_batch_size)
+        self.cache_warmup_budget = _get_env_float("APP_CACHE_WARMUP_BUDGET", self.cache_warmup_budget)
+        self.cache_warmup_file = _get_env("APP_CACHE_WARMUP_FILE", self.cache_warmup_file)
+        self.stale_cache_enabled = _get_env_bool("APP_STALE_CACHE_ENABLED", self.stale_cache_enabled)
+        self.stale_cache_max_size = _get_env_int("APP_STALE_CACHE_MAX_SIZE", self.stale_cache_max_size)
+        self.stale_cache_file = _get_env("APP_STALE_CACHE_FILE", self.stale_cache_file)
+        self.stale_cache_save_interval = _get_env_float("APP_STALE_CACHE_SAVE_INTERVAL", self.stale_cache_save_interval)
+        self.lookup_coalescing_enabled = _get_env_bool("APP_LOOKUP_COALESCING_ENABLED", self.lookup_coalescing_enabled)
+        self.hit_counting_enabled = _get_env_bool("APP_HIT_COUNTING_ENABLED", self.hit_counting_enabled)
+        self.hit_flush_interval = _get_env_float("APP_HIT_FLUSH_INTERVAL", self.hit_flush_interval)
+        self.hit_flush_threshold = _get_env_int("APP_HIT_FLUSH_THRESHOLD", self.hit_flush_threshold)
+        self.hit_max_pending_keys = _get_env_int("APP_HIT_MAX_PENDING_KEYS", self.hit_max_pending_keys)
+        self.hit_max_retry_interval = _get_env_float("APP_HIT_MAX_RETRY_INTERVAL", self.hit_max_retry_interval)
+        self.stats_rollup_interval = _get_env_float("APP_STATS_ROLLUP_INTERVAL", self.stats_rollup_interval)
+        self.stats_minute_retention_hours = _get_env_int(
+            "APP_STATS_MINUTE_RETENTION_HOURS", self.stats_minute_retention_hours
+        )
+        self.stats_hour_retention_days = _get_env_int("APP_STATS_HOUR_RETENTION_DAYS", self.stats_hour_retention_days)
+        self.expiry_sweep_interval = _get_env_float("APP_EXPIRY_SWEEP_INTERVAL", self.expiry_sweep_interval)
+        self.expiry_sweep_batch_size = _get_env_int("APP_EXPIRY_SWEEP_BATCH_SIZE", self.expiry_sweep_batch_size)
+        self.expiry_sweep_max_batches = _get_env_int("APP_EXPIRY_SWEEP_MAX_BATCHES", self.expiry_sweep_max_batches)
+        self.key_filter_enabled = _get_env_bool("APP_KEY_FILTER_ENABLED", self.key_filter_enabled)
+        self.key_filter_capacity = _get_env_int("APP_KEY_FILTER_CAPACITY", self.key_filter_capacity)
+        self.key_filter_error_rate = _get_env_float("APP_KEY_FILTER_ERROR_RATE", self.key_filter_error_rate)
+        self.shed_enabled = _get_env_bool("APP_SHED_ENABLED", self.shed_enabled)
+        self.shed_max_loop_lag = _get_env_float("APP_SHED_MAX_LOOP_LAG", self.shed_max_loop_lag)
+        self.shed_max_pool_waiting = _get_env_int("APP_SHED_MAX_POOL_WAITING", self.shed_max_pool_waiting)
+        self.shed_max_checkout_wait = _get_env_float("APP_SHED_MAX_CHECKOUT_WAIT", self.shed_max_checkout_wait)
+        self.shed_sample_interval = _get_env_float("APP_SHED_SAMPLE_INTERVAL", self.shed_sample_interval)
+        self.shed_hold = _get_env_float("APP_SHED_HOLD", self.shed_hold)
+        for name in ("shed_max_loop_lag", "shed_max_pool_waiting", "shed_max_checkout_wait", "shed_sample_interval"):
+            if getattr(self, name) <= 0:
+                raise ValueError(f"APP_{name.upper()} must be greater than 0, got {getattr(self, name)}")
         self.rate_limit_enabled = _get_env_bool("APP_RATE_LIMIT_ENABLED", self.rate_limit_enabled)
         self.rate_limit_per_minute = _get_env_int("APP_RATE_LIMIT_PER_MINUTE", self.rate_limit_per_minute)
+        self.rate_limit_redirects_per_minute = _get_env_int(
+            "APP_RATE_LIMIT_REDIRECTS_PER_MINUTE", self.rate_limit_redirects_per_minute
+        )
+        self.rate_limit_api_key_header = _get_env("APP_RATE_LIMIT_API_KEY_HEADER", self.rate_limit_api_key_header)
+        api_keys = _get_env("APP_RATE_LIMIT_API_KEYS")
+        if api_keys:
+            self.rate_limit_api_keys = [key.strip() for key in api_keys.split(",") if key.strip()]
+        self.rate_limit_max_clients = _get_env_int("APP_RATE_LIMIT_MAX_CLIENTS", self.rate_limit_max_clients)
+        self.rate_limit_eviction_interval = _get_env_float(
+            "APP_RATE_LIMIT_EVICTION_INTERVAL", self.rate_limit_eviction_interval
+        )
 
     @property
     def environment(self) -> str:
@@ -0,0 +1,153 @@
+"""Admission control shedding low-priority requests while the worker is overloaded."""
+
+import logging
+import math
+import time
+from typing import Callable, Mapping
+
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+# Priorities of requests that may be shed, in the order they are shed
+BULK_PRIORITY = "bulk"
+API_PRIORITY = "api"
+
+PoolStatsCallback = Callable[[], Mapping[str, Mapping[str, int]]]
+
+
+def priority_of(method: str, path: str) -> str | None:
+    """Return the shedding priority of a request, or None if it is never shed.
+
+    Listings, exports, click stats and bulk creation are shed first, the
+    rest of the /urls API next; redirects and health checks are never shed.
+    """
+    if path != "/urls" and not path.startswith("/urls/"):
+        return None
+    if method == "GET" and (path in ("/urls", "/urls/", "/urls/export") or path.endswith("/stats")):
+        return BULK_PRIORITY
+    if method == "POST" and path == "/urls/bulk":
+        return BULK_PRIORITY
+    return API_PRIORITY
+
+
+class LoadShedder:
+    """Tracks how overloaded the worker is and decides which requests to refuse.
+
+    sample() measures event-loop lag, the number of clients waiting for a pool
+    connection and the mean connection checkout time every interval. Each
+    is divided by its threshold and the largest ratio is the pressure. Bulk
+    requests are shed while the pressure is at least 1, all /urls requests
+    while it is at least api_pressure. A pressure is held for hold seconds
+    unless a higher one is seen, so shedding does not flap between samples.
+    """
+
+    def __init__(
+        self,
+        max_loop_lag: float = 0.1,
+        max_pool_waiting: int = 10,
+        max_checkout_wait: float = 0.1,
+        api_pressure: float = 2.0,
+        hold: float = 1.0,
+        pool_stats: PoolStatsCallback | None = None,
+    ):
+        """Initialize with thresholds; pool_stats returns Database.pool_stats() if there is a database.
+
+        Raises ValueError unless every threshold is positive.
+        """
+        if min(max_loop_lag, max_pool_waiting, max_checkout_wait, api_pressure) <= 0:
+            raise ValueError("Load shedding thresholds must be positive")
+        self.max_loop_lag: float = max_loop_lag
+        self.max_pool_waiting: int = max_pool_waiting
+        self.max_checkout_wait: float = max_checkout_wait
+        self.api_pressure: float = api_pressure
+        self.hold: float = hold
+        self.pressure: float = 0.0
+        self.loop_lag: float = 0.0
+        self.pool_waiting: int = 0
+        self.checkout_wait: float = 0.0
+        self.shed_counts: dict[str, int] = {BULK_PRIORITY: 0, API_PRIORITY: 0}
+        self._pool_stats = pool_stats
+        self._hold_until: float = 0.0
+        self._requests_num: int = 0
+        self._requests_wait_ms: int = 0
+        self._last_sample: float = 0.0
+
+    def observe(self, loop_lag: float, pool_stats: Mapping[str, Mapping[str, int]], now: float | None = None) -> None:
+        """Update the pressure from one sample of loop lag and pool statistics."""
+        if now is None:
+            now = time.monotonic()
+        requests_num = sum(stats.get("requests_num", 0) for stats in pool_stats.values())
+        requests_wait_ms = sum(stats.get("requests_wait_ms", 0) for stats in pool_stats.values())
+        new_requests = requests_num - self._requests_num
+        self.checkout_wait = (requests_wait_ms - self._requests_wait_ms) / 1000 / new_requests if new_requests else 0.0
+        self._requests_num, self._requests_wait_ms = requests_num, requests_wait_ms
+        self.pool_waiting = sum(stats.get("requests_waiting", 0) for stats in pool_stats.values())
+        self.loop_lag = loop_lag
+
+        pressure = max(
+            loop_lag / self.max_loop_lag,
+            self.pool_waiting / self.max_pool_waiting,
+            self.checkout_wait / self.max_checkout_wait,
+        )
+        if pressure >= self.pressure or now >= self._hold_until:
+            if pressure >= 1.0 > self.pressure:
+                logging.warning(
+                    f"Shedding load: loop lag {loop_lag * 1000:.0f} ms, {self.pool_waiting} waiting for a "
+                    f"connection, checkout {self.checkout_wait * 1000:.0f} ms"
+                )
+            self.pressure = pressure
+            self._hold_until = now + self.hold
+
+    async def sample(self, interval: float) -> None:
+        """Take one sample; meant to be awaited every interval seconds, e.g. by run_periodically()."""
+        now = time.monotonic()
+        # The time the loop took to get back to this task beyond the interval
+        loop_lag = max(0.0, now - self._last_sample - interval) if self._last_sample else 0.0
+        self._last_sample = now
+        self.observe(loop_lag, self._pool_stats() if self._pool_stats is not None else {}, now)
+
+    def shed(self, priority: str) -> float:
+        """Return 0 if a request of priority may proceed, else seconds after which to retry it."""
+        limit = 1.0 if priority == BULK_PRIORITY else self.api_pressure
+        if self.pressure < limit:
+            return 0.0
+        self.shed_counts[priority] += 1
+        return self.hold
+
+    def stats(self) -> dict[str, float]:
+        """Return the current pressure, its inputs and the number of requests shed by priority."""
+        return {
+            "pressure": self.pressure,
+            "loop_lag_seconds": self.loop_lag,
+            "pool_waiting": self.pool_waiting,
+            "checkout_wait_seconds": self.checkout_wait,
+            **{f"shed_{priority}": count for priority, count in self.shed_counts.items()},
+        }
+
+
+class LoadSheddingMiddleware:
+    """ASGI middleware answering 503 with Retry-After to requests shed by app.state.load_shedder.
+
+    Requests are refused before routing, so they never queue for a database
+    connection. Nothing is shed until the lifespan has set up a shedder.
+    """
+
+    def __init__(self, app: ASGIApp):
+        """Wrap app."""
+        self.app: ASGIApp = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http":
+            shedder: LoadShedder | None = getattr(scope["app"].state, "load_shedder", None)
+            priority = priority_of(scope["method"], scope["path"]) if shedder is not None else None
+            if priority is not None:
+                retry_after = shedder.shed(priority)  # type: ignore[union-attr]
+                if retry_after:
+                    response = JSONResponse(
+                        {"error": "Service unavailable", "detail": "Server overloaded, retry later"},
+                        status_code=503,
+                        headers={"retry-after": str(math.ceil(retry_after))},
+                    )
+                    await response(scope, receive, send)
+                    return
+        await self.app(scope, receive, send)
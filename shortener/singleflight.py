@@ -0,0 +1,51 @@
+"""Coalescing of concurrent identical lookups into one in-flight call."""
+
+import asyncio
+from functools import partial
+from typing import Awaitable, Callable, Hashable, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """Shares one in-flight call among all concurrent callers asking for the same key.
+
+    The first caller for a key starts the call as a task; callers arriving
+    before it finishes await the same task and get its result or exception.
+    The task is shielded, so a caller that is cancelled, including the first
+    one, does not cancel the call for the others. Once the call finishes the
+    key is forgotten, so results are never served after the fact; caching
+    them is left to UrlCache.
+    """
+
+    def __init__(self) -> None:
+        """Initialize with no calls in flight."""
+        self.executed: int = 0
+        self.coalesced: int = 0
+        self._calls: dict[Hashable, asyncio.Future] = {}
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        """Return the result of fn(), sharing a call already in flight for key."""
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(partial(self._forget, key))
+            self.executed += 1
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Hashable, task: asyncio.Future) -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        # Callers may all have been cancelled; the exception counts as retrieved
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> dict[str, int]:
+        """Return the number of calls made, callers that joined one, and calls in flight."""
+        return {"executed": self.executed, "coalesced": self.coalesced, "in_flight": len(self._calls)}
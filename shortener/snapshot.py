@@ -0,0 +1,316 @@
+"""Immutable, memory-mapped snapshots of short_urls for serving redirects without a database.
+
+A snapshot file holds every live link in a read-only layout
+that is looked up in place through mmap, so all worker processes of a node
+share one copy in the page cache and opening a snapshot costs nothing:
+
+    header   magic, byte order mark, number of links, creation time
+    hashes   sorted 64-bit BLAKE2b hashes of the keys
+    offsets  file offset of the record of each hash, in the same order
+    heap     records of key length, target length, expiry time, redirect
+             status, key and target
+
+A lookup binary-searches the hashes and compares the key bytes of the
+matching records, so hash collisions only cost an extra comparison. Links
+that have expired by the time of a lookup are not found, and a link's own
+redirect status is kept, so redirects match those of the exported database.
+
+    uv run async-url-shortener-snapshot links.snap
+"""
+
+import argparse
+import asyncio
+import hashlib
+import logging
+import mmap
+import os
+import shutil
+import struct
+import sys
+import tempfile
+import time
+from array import array
+from bisect import bisect_left
+from datetime import datetime, timezone
+from typing import AsyncIterator
+
+from shortener.database import Database
+from shortener.settings import PostgresSettings
+from shortener.storage import ExportRow, PageRow, PostgresStorage, Storage, StorageError, TargetRow
+
+SNAPSHOT_MAGIC = b"SHRTSNP2"
+
+# Written in native byte order; a reader on another architecture sees it reversed
+_BYTE_ORDER_MARK = 0x0102030405060708
+
+# magic, byte order mark, number of links, creation time in microseconds since the epoch
+_HEADER = struct.Struct("=8sQQQ")
+
+# Lengths in bytes of the key and target that follow, expiry time in microseconds
+# since the epoch (0 if the link does not expire), redirect status (0 for the default)
+_RECORD = struct.Struct("=HHqH")
+
+
+def key_hash(url_key: bytes) -> int:
+    """Return the 64-bit hash under which url_key is indexed."""
+    return int.from_bytes(hashlib.blake2b(url_key, digest_size=8).digest(), sys.byteorder)
+
+
+class SnapshotError(StorageError):
+    """Raised when a snapshot file is missing, truncated or not a snapshot."""
+
+
+class SnapshotWriter:
+    """Builds a snapshot file from links added one at a time.
+
+    Records are streamed to a temporary heap file, so memory use is 16 bytes
+    per link. finish() writes the snapshot next to path and renames it into
+    place, so readers never see a partially written file.
+    """
+
+    def __init__(self, path: str):
+        """Start a snapshot to be written to path."""
+        self.path: str = path
+        self.hashes: array = array("Q")
+        self.offsets: array = array("Q")
+        self._heap = tempfile.NamedTemporaryFile(dir=os.path.dirname(os.path.abspath(path)), delete=False)
+        self._heap_size: int = 0
+
+    def add(
+        self, url_key: str, target: str, expires_at: datetime | None = None, redirect_status: int | None = None
+    ) -> None:
+        """Add one link; keys must be unique and expires_at timezone-aware."""
+        key = url_key.encode()
+        target_bytes = target.encode()
+        self.hashes.append(key_hash(key))
+        self.offsets.append(self._heap_size)
+        expires_us = int(expires_at.timestamp() * 1_000_000) if expires_at is not None else 0
+        record = _RECORD.pack(len(key), len(target_bytes), expires_us, redirect_status or 0) + key + target_bytes
+        self._heap.write(record)
+        self._heap_size += len(record)
+
+    def finish(self) -> int:
+        """Write the snapshot file and return the number of links in it."""
+        count = len(self.hashes)
+        order = sorted(range(count), key=self.hashes.__getitem__)
+        heap_start = _HEADER.size + 16 * count
+        hashes = array("Q", (self.hashes[i] for i in order))
+        offsets = array("Q", (heap_start + self.offsets[i] for i in order))
+
+        self._heap.flush()
+        self._heap.seek(0)
+        directory = os.path.dirname(os.path.abspath(self.path))
+        with tempfile.NamedTemporaryFile(dir=directory, delete=False) as out:
+            try:
+                out.write(_HEADER.pack(SNAPSHOT_MAGIC, _BYTE_ORDER_MARK, count, time.time_ns() // 1000))
+                hashes.tofile(out)
+                offsets.tofile(out)
+                shutil.copyfileobj(self._heap, out, 1 << 20)
+                out.flush()
+                os.fsync(out.fileno())
+            except BaseException:
+                os.unlink(out.name)
+                raise
+        os.chmod(out.name, 0o644)
+        os.replace(out.name, self.path)
+        self.close()
+        return count
+
+    def close(self) -> None:
+        """Discard the temporary heap file."""
+        if not self._heap.closed:
+            self._heap.close()
+            os.unlink(self._heap.name)
+
+    def __enter__(self) -> "SnapshotWriter":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+
+class Snapshot:
+    """One opened snapshot file, mapped read-only."""
+
+    def __init__(self, path: str):
+        """Map the snapshot at path and check its header."""
+        with open(path, "rb") as f:
+            stat = os.fstat(f.fileno())
+            if stat.st_size < _HEADER.size:
+                raise SnapshotError(f"{path} is not a snapshot file")
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.identity: tuple[int, int, int, int] = (stat.st_dev, stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+        magic, byte_order_mark, count, created_us = _HEADER.unpack_from(self._mm)
+        if magic != SNAPSHOT_MAGIC or byte_order_mark != _BYTE_ORDER_MARK:
+            self._mm.close()
+            raise SnapshotError(f"{path} is not a snapshot file of this version and platform")
+        if stat.st_size < _HEADER.size + 16 * count:
+            self._mm.close()
+            raise SnapshotError(f"{path} is truncated")
+
+        self.count: int = count
+        self.created_at: datetime = datetime.fromtimestamp(created_us / 1e6)
+        index_end = _HEADER.size + 8 * count
+        self._hashes = memoryview(self._mm)[_HEADER.size : index_end].cast("Q")
+        self._offsets = memoryview(self._mm)[index_end : index_end + 8 * count].cast("Q")
+
+    def get(self, url_key: str) -> str | None:
+        """Return the target of url_key, or None if it is not in the snapshot or has expired."""
+        row = self.get_row(url_key)
+        return row[0] if row is not None else None
+
+    def get_row(self, url_key: str) -> TargetRow | None:
+        """Return (target, expires_at, redirect_status) of url_key, or None if it is missing or expired."""
+        key = url_key.encode()
+        hash_value = key_hash(key)
+        mm = self._mm
+        i = bisect_left(self._hashes, hash_value)
+        while i < self.count and self._hashes[i] == hash_value:
+            offset = self._offsets[i]
+            key_len, target_len, expires_us, redirect_status = _RECORD.unpack_from(mm, offset)
+            start = offset + _RECORD.size
+            if mm[start : start + key_len] == key:
+                if expires_us and expires_us <= time.time_ns() // 1000:
+                    return None
+                target = mm[start + key_len : start + key_len + target_len].decode()
+                expires_at = datetime.fromtimestamp(expires_us / 1e6, timezone.utc) if expires_us else None
+                return target, expires_at, redirect_status or None
+            i += 1
+        return None
+
+    def close(self) -> None:
+        """Unmap the file."""
+        self._hashes.release()
+        self._offsets.release()
+        self._mm.close()
+
+
+class SnapshotStorage(Storage):
+    """Read-only storage serving redirects from a snapshot file.
+
+    Only redirects and health checks are served; every management operation
+    raises StorageError. reload() maps the file again when it was replaced,
+    e.g. by a new export renamed over it.
+    """
+
+    name = "snapshot"
+
+    def __init__(self, path: str):
+        """Initialize storage for the snapshot at path; the file is mapped by connect()."""
+        self.path: str = path
+        self.snapshot: Snapshot | None = None
+
+    async def connect(self) -> None:
+        try:
+            self.snapshot = Snapshot(self.path)
+        except OSError as e:
+            raise SnapshotError(str(e)) from e
+        logging.info(f"Snapshot {self.path} mapped: {self.snapshot.count} links from {self.snapshot.created_at}")
+
+    async def disconnect(self) -> None:
+        if self.snapshot is not None:
+            self.snapshot.close()
+            self.snapshot = None
+
+    async def reload(self) -> bool:
+        """Map the snapshot file again if it changed, returning True if it did."""
+        try:
+            stat = os.stat(self.path)
+            current = self.snapshot.identity if self.snapshot is not None else None
+            if current == (stat.st_dev, stat.st_ino, stat.st_size, stat.st_mtime_ns):
+                return False
+            snapshot = Snapshot(self.path)
+        except OSError as e:
+            raise SnapshotError(str(e)) from e
+
+        old, self.snapshot = self.snapshot, snapshot
+        if old is not None:
+            old.close()
+        logging.info(f"Snapshot {self.path} reloaded: {snapshot.count} links from {snapshot.created_at}")
+        return True
+
+    def _current(self) -> Snapshot:
+        if self.snapshot is None:
+            raise SnapshotError("Snapshot not loaded. Call connect() first.")
+        return self.snapshot
+
+    async def ping(self) -> bool:
+        self._current()
+        return True
+
+    async def get_target(self, url_key: str, consistent: bool = False) -> TargetRow | None:
+        return self._current().get_row(url_key)
+
+    def _read_only(self) -> StorageError:
+        return StorageError("Snapshot storage is read-only and serves redirects only")
+
+    async def create(
+        self, url_key: str, target: str, expires_at: datetime | None = None, redirect_status: int | None = None
+    ) -> bool:
+        raise self._read_only()
+
+    async def bulk_create(self, items: list[tuple[str, str]]) -> set[str]:
+        raise self._read_only()
+
+    async def update(
+        self, url_key: str, target: str, expires_at: datetime | None = None, redirect_status: int | None = None
+    ) -> TargetRow | None:
+        raise self._read_only()
+
+    async def delete(self, url_key: str) -> bool:
+        raise self._read_only()
+
+    async def list_page(
+        self, limit: int, after: tuple[datetime, int] | None = None, consistent: bool = False
+    ) -> list[PageRow]:
+        raise self._read_only()
+
+    def iter_rows(self, batch_size: int = 1000, newest_first: bool = False) -> AsyncIterator[ExportRow]:
+        raise self._read_only()
+
+
+async def export_snapshot(storage: Storage, path: str, batch_size: int = 10000) -> int:
+    """
+    Write every short URL of storage to a snapshot file.
+
+    Args:
+        storage: Storage backend to read from
+        path: Snapshot file to create or replace
+        batch_size: Number of rows fetched per round trip
+
+    Returns:
+        Number of links written
+    """
+    with SnapshotWriter(path) as writer:
+        async for url_key, target, _, expires_at, redirect_status in storage.iter_rows(batch_size=batch_size):
+            writer.add(url_key, target, expires_at=expires_at, redirect_status=redirect_status)
+            if len(writer.hashes) % 1000000 == 0:
+                logging.info(f"Read {len(writer.hashes)} links so far")
+        return writer.finish()
+
+
+async def _run(args: argparse.Namespace) -> int:
+    db = Database(PostgresSettings())
+    await db.connect()
+    try:
+        count = await export_snapshot(PostgresStorage(db), args.path, batch_size=args.batch_size)
+    finally:
+        await db.disconnect()
+
+    logging.info(f"Snapshot written to {args.path}: {count} links")
+    return 0
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Export short URLs to a snapshot file for DB-free redirects.")
+    parser.add_argument("path", help="Snapshot file to create or atomically replace")
+    parser.add_argument("--batch-size", type=int, default=10000, help="Rows per round trip (default: 10000)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    return asyncio.run(_run(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,241 @@
+"""SQLite storage backend for single-node deployments."""
+
+import asyncio
+import contextlib
+import sqlite3
+import time
+from datetime import datetime, timezone
+from typing import AsyncGenerator, AsyncIterator
+
+from shortener.storage import ExportRow, PageRow, Storage, StorageError, TargetRow
+
+# Timestamps are stored as text in one fixed format so they compare correctly as strings;
+# created_at is local time like in Postgres, expires_at is UTC
+_TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S.%f"
+
+_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS short_urls (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        url_key TEXT UNIQUE NOT NULL,
+        target TEXT NOT NULL,
+        created_at TEXT NOT NULL,
+        expires_at TEXT,
+        redirect_status INTEGER
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_short_urls_created_at_id ON short_urls(created_at, id)",
+)
+
+# Created after adding expires_at to files from before link expiry
+_EXPIRES_AT_INDEX = (
+    "CREATE INDEX IF NOT EXISTS idx_short_urls_expires_at ON short_urls(expires_at) WHERE expires_at IS NOT NULL"
+)
+
+_LIVE_SQL = "(expires_at IS NULL OR expires_at > ?)"
+
+# Seconds between attempts to take a write lock held by another process, doubling up to the maximum
+_BUSY_RETRY_MIN = 0.001
+_BUSY_RETRY_MAX = 0.05
+
+
+def _to_text(value: datetime) -> str:
+    return value.strftime(_TIMESTAMP_FORMAT)
+
+
+def _from_text(value: str) -> datetime:
+    return datetime.strptime(value, _TIMESTAMP_FORMAT)
+
+
+def _created_to_text(value: datetime) -> str:
+    # Page cursors with an offset are converted to the local time created_at is stored in
+    return _to_text(value.astimezone().replace(tzinfo=None) if value.tzinfo is not None else value)
+
+
+def _expiry_to_text(value: datetime | None) -> str | None:
+    return _to_text(value.astimezone(timezone.utc)) if value is not None else None
+
+
+def _expiry_from_text(value: str | None) -> datetime | None:
+    return _from_text(value).replace(tzinfo=timezone.utc) if value is not None else None
+
+
+def _now_text() -> str:
+    return _to_text(datetime.now(timezone.utc))
+
+
+class SqliteStorage(Storage):
+    """Storage in a local SQLite database file in WAL mode.
+
+    Every statement is a primary-key or index lookup on a local file, which
+    takes microseconds, so statements run directly on the event loop instead
+    of paying for a thread hop. WAL mode lets the workers of one node read
+    concurrently while one of them writes. SQLite itself never waits for the
+    write lock: a statement that finds it taken by another worker is retried
+    after an asyncio.sleep, for up to busy_timeout, so a contended write
+    does not stall the other requests of this worker. Workers do not notify
+    each other of changes, so a worker may serve a cached target for up to
+    the cache TTL after another worker changed it.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path: str, synchronous: str = "NORMAL", busy_timeout: float = 5.0):
+        """Initialize storage for the database file at path; the file is opened by connect()."""
+        self.path: str = path
+        self.synchronous: str = synchronous
+        self.busy_timeout: float = busy_timeout
+        self.conn: sqlite3.Connection | None = None
+        # Writes of this worker share the connection, so they take turns while one waits for the lock
+        self._write_lock: asyncio.Lock = asyncio.Lock()
+
+    async def connect(self) -> None:
+        try:
+            # Startup may block while another worker writes; requests never do, see _execute()
+            self.conn = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute(f"PRAGMA synchronous={self.synchronous}")
+            for statement in _SCHEMA:
+                self.conn.execute(statement)
+            columns = {row[1] for row in self.conn.execute("PRAGMA table_info(short_urls)")}
+            if "expires_at" not in columns:
+                self.conn.execute("ALTER TABLE short_urls ADD COLUMN expires_at TEXT")
+            if "redirect_status" not in columns:
+                self.conn.execute("ALTER TABLE short_urls ADD COLUMN redirect_status INTEGER")
+            self.conn.execute(_EXPIRES_AT_INDEX)
+            self.conn.execute("PRAGMA busy_timeout=0")
+        except sqlite3.Error as e:
+            raise StorageError(str(e)) from e
+
+    async def disconnect(self) -> None:
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+    async def _execute(self, query: str, params: tuple = ()) -> sqlite3.Cursor:
+        if self.conn is None:
+            raise StorageError("SQLite storage not connected. Call connect() first.")
+        deadline = time.monotonic() + self.busy_timeout
+        delay = _BUSY_RETRY_MIN
+        while True:
+            try:
+                return self.conn.execute(query, params)
+            except sqlite3.IntegrityError:
+                raise
+            except sqlite3.OperationalError as e:
+                if e.sqlite_errorcode & 0xFF != sqlite3.SQLITE_BUSY or time.monotonic() + delay > deadline:
+                    raise StorageError(str(e)) from e
+            except sqlite3.Error as e:
+                raise StorageError(str(e)) from e
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, _BUSY_RETRY_MAX)
+
+    @contextlib.asynccontextmanager
+    async def _transaction(self) -> AsyncGenerator[None, None]:
+        """Run the statements of the block in one write transaction."""
+        async with self._write_lock:
+            await self._execute("BEGIN IMMEDIATE")
+            try:
+                yield
+                await self._execute("COMMIT")
+            except BaseException:
+                await self._execute("ROLLBACK")
+                raise
+
+    async def ping(self) -> bool:
+        await self._execute("SELECT 1")
+        return True
+
+    async def get_target(self, url_key: str, consistent: bool = False) -> TargetRow | None:
+        cursor = await self._execute(
+            f"SELECT target, expires_at, redirect_status FROM short_urls WHERE url_key = ? AND {_LIVE_SQL}",
+            (url_key, _now_text()),
+        )
+        row = cursor.fetchone()
+        return (row[0], _expiry_from_text(row[1]), row[2]) if row else None
+
+    async def create(
+        self, url_key: str, target: str, expires_at: datetime | None = None, redirect_status: int | None = None
+    ) -> bool:
+        try:
+            async with self._write_lock:
+                await self._execute(
+                    "INSERT INTO short_urls (url_key, target, created_at, expires_at, redirect_status) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (url_key, target, _to_text(datetime.now()), _expiry_to_text(expires_at), redirect_status),
+                )
+        except sqlite3.IntegrityError:
+            return False
+        return True
+
+    async def bulk_create(self, items: list[tuple[str, str]]) -> set[str]:
+        created = set()
+        created_at = _to_text(datetime.now())
+        async with self._transaction():
+            for url_key, target in items:
+                cursor = await self._execute(
+                    "INSERT OR IGNORE INTO short_urls (url_key, target, created_at) VALUES (?, ?, ?)",
+                    (url_key, target, created_at),
+                )
+                if cursor.rowcount > 0:
+                    created.add(url_key)
+        return created
+
+    async def update(
+        self, url_key: str, target: str, expires_at: datetime | None = None, redirect_status: int | None = None
+    ) -> TargetRow | None:
+        # RETURNING sees only new values, so the old ones are read in the same write transaction
+        async with self._transaction():
+            cursor = await self._execute(
+                f"SELECT id, target, expires_at, redirect_status FROM short_urls WHERE url_key = ? AND {_LIVE_SQL}",
+                (url_key, _now_text()),
+            )
+            previous = cursor.fetchone()
+            if previous is not None:
+                await self._execute(
+                    "UPDATE short_urls SET target = ?, expires_at = ?, redirect_status = ? WHERE id = ?",
+                    (target, _expiry_to_text(expires_at), redirect_status, previous[0]),
+                )
+        return (previous[1], _expiry_from_text(previous[2]), previous[3]) if previous is not None else None
+
+    async def delete(self, url_key: str) -> bool:
+        async with self._write_lock:
+            cursor = await self._execute("DELETE FROM short_urls WHERE url_key = ?", (url_key,))
+        return cursor.rowcount > 0
+
+    async def list_page(
+        self, limit: int, after: tuple[datetime, int] | None = None, consistent: bool = False
+    ) -> list[PageRow]:
+        if after is None:
+            cursor = await self._execute(
+                f"SELECT id, url_key, target, created_at FROM short_urls WHERE {_LIVE_SQL} "
+                "ORDER BY created_at DESC, id DESC LIMIT ?",
+                (_now_text(), limit),
+            )
+        else:
+            cursor = await self._execute(
+                "SELECT id, url_key, target, created_at FROM short_urls WHERE (created_at, id) < (?, ?) "
+                f"AND {_LIVE_SQL} ORDER BY created_at DESC, id DESC LIMIT ?",
+                (_created_to_text(after[0]), after[1], _now_text(), limit),
+            )
+        return [(row_id, url_key, target, _from_text(created_at)) for row_id, url_key, target, created_at in cursor]
+
+    async def iter_rows(self, batch_size: int = 1000, newest_first: bool = False) -> AsyncIterator[ExportRow]:
+        order = "created_at DESC, id DESC" if newest_first else "id"
+        cursor = await self._execute(
+            "SELECT url_key, target, created_at, expires_at, redirect_status "
+            f"FROM short_urls WHERE {_LIVE_SQL} ORDER BY {order}",
+            (_now_text(),),
+        )
+        while rows := cursor.fetchmany(batch_size):
+            for url_key, target, created_at, expires_at, redirect_status in rows:
+                yield url_key, target, _from_text(created_at), _expiry_from_text(expires_at), redirect_status
+
+    async def delete_expired(self, limit: int) -> list[str]:
+        async with self._write_lock:
+            cursor = await self._execute(
+                "DELETE FROM short_urls WHERE id IN ("
+                "SELECT id FROM short_urls WHERE expires_at <= ? ORDER BY expires_at LIMIT ?) RETURNING url_key",
+                (_now_text(), limit),
+            )
+            return [row[0] for row in cursor.fetchall()]
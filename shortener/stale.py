@@ -0,0 +1,102 @@
+"""Last-known-good redirect targets, served while the database is unavailable."""
+
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+
+class StaleCache:
+    """Bounded LRU map of url_key to the target and redirect status last read from the database.
+
+    Unlike UrlCache its entries do not expire with a TTL, only with their
+    link, so a link read once can still be redirected hours into an outage.
+    Entries are dropped when the link is changed or deleted, since the
+    stale target would then be wrong rather than merely old. The entries
+    can be saved to a file and loaded again, so a worker restarted while
+    the database is down still has them.
+    """
+
+    def __init__(self, max_size: int = 100000):
+        """Initialize an empty cache holding up to max_size links."""
+        self.max_size: int = max_size
+        self.served: int = 0
+        # url_key -> (target, redirect_status, expires_at as a Unix timestamp)
+        self._entries: OrderedDict[str, tuple[str, int | None, float | None]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def remember(
+        self, key: str, target: str, redirect_status: int | None = None, expires_at: datetime | None = None
+    ) -> None:
+        """Record the target last read for key, evicting the least recently used link if full."""
+        if self.max_size <= 0:
+            return
+        self._entries[key] = (target, redirect_status, expires_at.timestamp() if expires_at is not None else None)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def get_redirect(self, key: str) -> tuple[str, int | None] | None:
+        """Return the last known target and redirect status of key, or None if unknown or expired since.
+
+        A served entry becomes the most recently used, so links redirected through
+        an outage are not evicted by links only read before it.
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[2] is not None and entry[2] <= time.time():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        self.served += 1
+        return entry[0], entry[1]
+
+    def forget(self, key: str) -> None:
+        """Remove key if present."""
+        self._entries.pop(key, None)
+
+    def items(self) -> list[tuple[str, str, int | None, float | None]]:
+        """Return a copy of the entries as (key, target, redirect_status, expires_at), least recently used first."""
+        return [(key, *entry) for key, entry in self._entries.items()]
+
+    def save(self, path: str) -> int:
+        """Write the entries to path with write_stale_file() and return how many were written."""
+        entries = self.items()
+        write_stale_file(path, entries)
+        return len(entries)
+
+    def load(self, path: str) -> int:
+        """Add the entries of a file written by save() and return how many were read; a missing file has none."""
+        loaded = 0
+        try:
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        key, target, redirect_status, expires_at = json.loads(line)
+                    except ValueError:
+                        logging.warning(f"Skipping malformed line in stale cache file {path}")
+                        continue
+                    self._entries[key] = (target, redirect_status, expires_at)
+                    self._entries.move_to_end(key)
+                    loaded += 1
+        except FileNotFoundError:
+            return 0
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+        return loaded
+
+
+def write_stale_file(path: str, entries: list[tuple[str, str, int | None, float | None]]) -> None:
+    """Atomically replace path with entries from StaleCache.items(), one JSON array per line.
+
+    It touches no cache, so it can run in a thread on a copy of the entries.
+    """
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.writelines(json.dumps(entry) + "\n" for entry in entries)
+    os.replace(tmp_path, path)
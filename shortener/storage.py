@@ -0,0 +1,395 @@
+"""Storage backends holding the short_urls mappings."""
+
+import abc
+import heapq
+import itertools
+from datetime import datetime, timezone
+from typing import AsyncIterator
+
+from psycopg import errors as psycopg_errors
+
+from shortener.breaker import CLOSED
+from shortener.database import Database
+from shortener.settings import AppSettings
+
+STORAGE_BACKENDS = ("postgres", "memory", "sqlite", "snapshot")
+
+# (id, url_key, target, created_at) as returned by list_page
+PageRow = tuple[int, str, str, datetime]
+
+# (target, expires_at, redirect_status) as returned by get_target; a None status follows the global policy
+TargetRow = tuple[str, datetime | None, int | None]
+
+# (url_key, target, created_at, expires_at, redirect_status) as returned by iter_rows
+ExportRow = tuple[str, str, datetime, datetime | None, int | None]
+
+# Expired links are left out of every read until the sweeper deletes them
+_LIVE_SQL = "(expires_at IS NULL OR expires_at > now())"
+
+
+class StorageError(Exception):
+    """Raised by non-Postgres backends when the store cannot be reached or written."""
+
+
+class Storage(abc.ABC):
+    """Interface of the store behind the redirect and CRUD actions.
+
+    Implementations only move data; key validation, caching, the key filter
+    and translating errors into HTTP responses stay in shortener.actions.
+    Reads take a consistent flag: when it is False a backend may answer from
+    a copy that lags behind the latest writes, such as a read replica.
+    Links whose expires_at has passed are treated as missing by every read.
+    """
+
+    name: str = ""
+
+    async def connect(self) -> None:
+        """Open the store and create its schema if needed."""
+
+    async def disconnect(self) -> None:
+        """Close the store."""
+
+    @abc.abstractmethod
+    async def ping(self) -> bool:
+        """Return True if the store is reachable, raising if it is not."""
+
+    @abc.abstractmethod
+    async def get_target(self, url_key: str, consistent: bool = False) -> TargetRow | None:
+        """Return (target, expires_at, redirect_status) of url_key, or None if it does not exist or has expired."""
+
+    async def get_targets(self, url_keys: list[str]) -> dict[str, TargetRow]:
+        """Return (target, expires_at, redirect_status) of those url_keys that exist."""
+        targets = {}
+        for url_key in url_keys:
+            row = await self.get_target(url_key)
+            if row is not None:
+                targets[url_key] = row
+        return targets
+
+    @abc.abstractmethod
+    async def create(
+        self, url_key: str, target: str, expires_at: datetime | None = None, redirect_status: int | None = None
+    ) -> bool:
+        """Insert a mapping; return False if url_key already exists."""
+
+    @abc.abstractmethod
+    async def bulk_create(self, items: list[tuple[str, str]]) -> set[str]:
+        """Insert many mappings, skipping existing keys; return the keys that were created.
+
+        If a key appears more than once in items, its first occurrence wins.
+        """
+
+    @abc.abstractmethod
+    async def update(
+        self, url_key: str, target: str, expires_at: datetime | None = None, redirect_status: int | None = None
+    ) -> TargetRow | None:
+        """Change the target, expiry and redirect status of url_key.
+
+        Returns the (target, expires_at, redirect_status) it had before, or
+        None if it is missing or expired, read atomically with the change.
+        """
+
+    @abc.abstractmethod
+    async def delete(self, url_key: str) -> bool:
+        """Remove url_key; return False if it does not exist."""
+
+    @abc.abstractmethod
+    async def list_page(
+        self, limit: int, after: tuple[datetime, int] | None = None, consistent: bool = False
+    ) -> list[PageRow]:
+        """Return up to limit rows ordered by (created_at, id) descending, starting after the given position."""
+
+    @abc.abstractmethod
+    def iter_rows(self, batch_size: int = 1000, newest_first: bool = False) -> AsyncIterator[ExportRow]:
+        """Iterate over every (url_key, target, created_at, expires_at, redirect_status), batch_size rows at a time."""
+
+    async def delete_expired(self, limit: int) -> list[str]:
+        """Delete up to limit expired links, soonest expired first, and return their keys."""
+        return []
+
+
+class PostgresStorage(Storage):
+    """Storage in the short_urls table of the Postgres Database.
+
+    Writes publish change notifications in the same round trip, so other
+    workers evict their cached copies when the transaction commits.
+    """
+
+    name = "postgres"
+
+    def __init__(self, db: Database):
+        """Initialize storage on a Database; connecting it is left to the caller."""
+        self.db: Database = db
+
+    async def ping(self) -> bool:
+        # A query answered just before the breaker opened must not report it up
+        breaker = getattr(self.db, "breaker", None)
+        if (breaker is None or breaker.state == CLOSED) and self.db.recently_healthy():
+            return True
+        await self.db.execute_one("SELECT 1")
+        return True
+
+    async def get_target(self, url_key: str, consistent: bool = False) -> TargetRow | None:
+        row = await self.db.execute_one(
+            f"SELECT target, expires_at, redirect_status FROM short_urls WHERE url_key = %s AND {_LIVE_SQL}",
+            url_key,
+            replica=not consistent,
+        )
+        return (row[0], row[1], row[2]) if row else None
+
+    async def get_targets(self, url_keys: list[str]) -> dict[str, TargetRow]:
+        rows = await self.db.execute_all(
+            "SELECT url_key, target, expires_at, redirect_status FROM short_urls "
+            f"WHERE url_key = ANY(%s) AND {_LIVE_SQL}",
+            url_keys,
+            replica=True,
+        )
+        return {row[0]: (row[1], row[2], row[3]) for row in rows}
+
+    async def create(
+        self, url_key: str, target: str, expires_at: datetime | None = None, redirect_status: int | None = None
+    ) -> bool:
+        try:
+            async with self.db.pipeline() as conn:
+                await conn.execute(
+                    "INSERT INTO short_urls (url_key, target, expires_at, redirect_status) VALUES (%s, %s, %s, %s)",
+                    (url_key, target, expires_at, redirect_status),  # type: ignore[arg-type]
+                )
+                await self.db.publish_change(conn, "create", url_key)
+        except psycopg_errors.UniqueViolation:
+            return False
+        return True
+
+    async def bulk_create(self, items: list[tuple[str, str]]) -> set[str]:
+        # Items are copied into a staging table and merged with one INSERT ... ON CONFLICT DO NOTHING
+        async with self.db.get_connection() as conn:
+            await conn.execute(
+                "CREATE TEMP TABLE bulk_short_urls (ord INTEGER, url_key VARCHAR(255), target VARCHAR(2048)) "
+                "ON COMMIT DROP"
+            )
+            async with conn.cursor() as cur:
+                async with cur.copy("COPY bulk_short_urls (ord, url_key, target) FROM STDIN") as copy:
+                    for ord_, (url_key, target) in enumerate(items):
+                        await copy.write_row((ord_, url_key, target))
+
+            result = await conn.execute(
+                "INSERT INTO short_urls (url_key, target) "
+                "SELECT DISTINCT ON (url_key) url_key, target FROM bulk_short_urls ORDER BY url_key, ord "
+                "ON CONFLICT (url_key) DO NOTHING RETURNING url_key"
+            )
+            created = [row[0] for row in await result.fetchall()]
+            await self.db.publish_changes(conn, "create", created)
+        return set(created)
+
+    async def update(
+        self, url_key: str, target: str, expires_at: datetime | None = None, redirect_status: int | None = None
+    ) -> TargetRow | None:
+        # An update notification for a missing key only evicts nothing elsewhere,
+        # so it is sent unconditionally in the same round trip as the UPDATE.
+        # RETURNING sees only new values, so the old ones come from a locking CTE.
+        async with self.db.pipeline() as conn:
+            result = await conn.execute(
+                "WITH old AS (SELECT id, target, expires_at, redirect_status FROM short_urls "
+                f"WHERE url_key = %s AND {_LIVE_SQL} FOR UPDATE) "
+                "UPDATE short_urls SET target = %s, expires_at = %s, redirect_status = %s "
+                "FROM old WHERE short_urls.id = old.id RETURNING old.target, old.expires_at, old.redirect_status",
+                (url_key, target, expires_at, redirect_status),  # type: ignore[arg-type]
+            )
+            await self.db.publish_change(conn, "update", url_key)
+        row = await result.fetchone()
+        return (row[0], row[1], row[2]) if row else None
+
+    async def delete(self, url_key: str) -> bool:
+        async with self.db.get_connection() as conn:
+            result = await conn.execute(
+                "DELETE FROM short_urls WHERE url_key = %s",
+                (url_key,),  # type: ignore[arg-type]
+            )
+            # Only keys that existed may be removed from other workers' key filters,
+            # so this waits for the DELETE result instead of pipelining the notification
+            if result.rowcount > 0:
+                await self.db.publish_change(conn, "delete", url_key)
+        return result.rowcount > 0
+
+    async def list_page(
+        self, limit: int, after: tuple[datetime, int] | None = None, consistent: bool = False
+    ) -> list[PageRow]:
+        if after is None:
+            rows = await self.db.execute_all(
+                f"SELECT id, url_key, target, created_at FROM short_urls WHERE {_LIVE_SQL} "
+                "ORDER BY created_at DESC, id DESC LIMIT %s",
+                limit,
+                replica=not consistent,
+            )
+        else:
+            rows = await self.db.execute_all(
+                "SELECT id, url_key, target, created_at FROM short_urls WHERE (created_at, id) < (%s, %s) "
+                f"AND {_LIVE_SQL} ORDER BY created_at DESC, id DESC LIMIT %s",
+                after[0],
+                after[1],
+                limit,
+                replica=not consistent,
+            )
+        return rows  # type: ignore[return-value]
+
+    async def iter_rows(self, batch_size: int = 1000, newest_first: bool = False) -> AsyncIterator[ExportRow]:
+        # Read through a server-side cursor on a replica if any are configured
+        order = "created_at DESC, id DESC" if newest_first else "id"
+        async with self.db.get_connection(replica=True) as conn:
+            async with conn.cursor(name="iter_short_urls") as cur:
+                cur.itersize = batch_size
+                await cur.execute(
+                    "SELECT url_key, target, created_at, expires_at, redirect_status "
+                    f"FROM short_urls WHERE {_LIVE_SQL} ORDER BY {order}"
+                )
+                async for row in cur:
+                    yield row
+
+    async def delete_expired(self, limit: int) -> list[str]:
+        async with self.db.get_connection() as conn:
+            # Claim the batch first, found through the partial expires_at index; rows
+            # locked by another worker's sweep or a write are skipped, not waited for,
+            # and the claimed rows stay locked until they are deleted
+            result = await conn.execute(
+                "SELECT url_key FROM short_urls WHERE expires_at <= now() "
+                "ORDER BY expires_at LIMIT %s FOR UPDATE SKIP LOCKED",
+                (limit,),
+            )
+            url_keys = [row[0] for row in await result.fetchall()]
+            if not url_keys:
+                return []
+
+            # Deleting a link cascades to all of its click buckets, which are unbounded
+            # in number, so those of the claimed links go first, limit rows per statement
+            while True:
+                result = await conn.execute(
+                    "DELETE FROM url_hit_buckets WHERE ctid IN ("
+                    "SELECT ctid FROM url_hit_buckets WHERE url_key = ANY(%s) LIMIT %s)",
+                    (url_keys, limit),  # type: ignore[arg-type]
+                )
+                if result.rowcount < limit:
+                    break
+
+            await conn.execute("DELETE FROM short_urls WHERE url_key = ANY(%s)", (url_keys,))  # type: ignore[arg-type]
+            await self.db.publish_changes(conn, "delete", url_keys)
+        return url_keys
+
+
+def _as_utc(value: datetime) -> datetime:
+    """Return value as an aware UTC datetime, taking naive values to be UTC already."""
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+
+class MemoryStorage(Storage):
+    """Storage in a dict of this process, for benchmarks and tests.
+
+    Nothing is persisted or shared between worker processes. created_at is
+    kept in UTC, so page cursors given with any offset compare correctly.
+    """
+
+    name = "memory"
+
+    def __init__(self) -> None:
+        """Initialize an empty store."""
+        self.rows: dict[str, tuple[int, str, datetime, datetime | None, int | None]] = {}
+        self._ids = itertools.count(1)
+
+    def _live_rows(self) -> list[tuple[str, tuple[int, str, datetime, datetime | None, int | None]]]:
+        now = datetime.now(timezone.utc)
+        return [(url_key, row) for url_key, row in self.rows.items() if row[3] is None or row[3] > now]
+
+    def _get_live(self, url_key: str) -> tuple[int, str, datetime, datetime | None, int | None] | None:
+        row = self.rows.get(url_key)
+        if row is None or (row[3] is not None and row[3] <= datetime.now(timezone.utc)):
+            return None
+        return row
+
+    async def ping(self) -> bool:
+        return True
+
+    async def get_target(self, url_key: str, consistent: bool = False) -> TargetRow | None:
+        row = self._get_live(url_key)
+        return (row[1], row[3], row[4]) if row else None
+
+    async def create(
+        self, url_key: str, target: str, expires_at: datetime | None = None, redirect_status: int | None = None
+    ) -> bool:
+        if url_key in self.rows:
+            return False
+        self.rows[url_key] = (next(self._ids), target, datetime.now(timezone.utc), expires_at, redirect_status)
+        return True
+
+    async def bulk_create(self, items: list[tuple[str, str]]) -> set[str]:
+        created = set()
+        for url_key, target in items:
+            if await self.create(url_key, target):
+                created.add(url_key)
+        return created
+
+    async def update(
+        self, url_key: str, target: str, expires_at: datetime | None = None, redirect_status: int | None = None
+    ) -> TargetRow | None:
+        row = self._get_live(url_key)
+        if row is None:
+            return None
+        self.rows[url_key] = (row[0], target, row[2], expires_at, redirect_status)
+        return row[1], row[3], row[4]
+
+    async def delete(self, url_key: str) -> bool:
+        return self.rows.pop(url_key, None) is not None
+
+    async def list_page(
+        self, limit: int, after: tuple[datetime, int] | None = None, consistent: bool = False
+    ) -> list[PageRow]:
+        rows = ((row[0], url_key, row[1], row[2]) for url_key, row in self._live_rows())
+        if after is not None:
+            position = (_as_utc(after[0]), after[1])
+            rows = (row for row in rows if (row[3], row[0]) < position)
+        return heapq.nlargest(limit, rows, key=lambda row: (row[3], row[0]))
+
+    async def iter_rows(self, batch_size: int = 1000, newest_first: bool = False) -> AsyncIterator[ExportRow]:
+        rows = sorted(self._live_rows(), key=lambda item: (item[1][2], item[1][0]) if newest_first else item[1][0])
+        if newest_first:
+            rows.reverse()
+        for url_key, (_, target, created_at, expires_at, redirect_status) in rows:
+            yield url_key, target, created_at, expires_at, redirect_status
+
+    async def delete_expired(self, limit: int) -> list[str]:
+        now = datetime.now(timezone.utc)
+        expired = heapq.nsmallest(
+            limit, ((row[3], url_key) for url_key, row in self.rows.items() if row[3] is not None and row[3] <= now)
+        )
+        for _, url_key in expired:
+            del self.rows[url_key]
+        return [url_key for _, url_key in expired]
+
+
+def create_storage(settings: AppSettings, db: Database | None = None) -> Storage:
+    """
+    Create the storage backend selected by settings.storage_backend.
+
+    Args:
+        settings: Application settings
+        db: Database to store into, required for the postgres backend
+
+    Returns:
+        An unconnected storage backend
+
+    Raises:
+        ValueError: If the backend is unknown or db is missing for postgres
+    """
+    if settings.storage_backend == "postgres":
+        if db is None:
+            raise ValueError("The postgres storage backend requires a Database")
+        return PostgresStorage(db)
+    if settings.storage_backend == "memory":
+        return MemoryStorage()
+    if settings.storage_backend == "sqlite":
+        from shortener.sqlite_storage import SqliteStorage
+
+        return SqliteStorage(settings.sqlite_path, synchronous=settings.sqlite_synchronous)
+    if settings.storage_backend == "snapshot":
+        from shortener.snapshot import SnapshotStorage
+
+        return SnapshotStorage(settings.snapshot_path)
+    raise ValueError(f"Unknown storage backend: {settings.storage_backend}")
@@ -1,23 +1,44 @@
 """All HTTP endpoint handlers for the URL shortener."""
 
+import base64
+import csv
+import io
+import json
 import logging
 import re
+from datetime import datetime, timezone
+from typing import AsyncIterator, Dict
 from urllib.parse import urlparse
 
 from starlette.exceptions import HTTPException
 from starlette.requests import Request
-from starlette.responses import JSONResponse, RedirectResponse
+from starlette.responses import JSONResponse, PlainTextResponse, RedirectResponse, StreamingResponse
 from starlette.routing import Route
 
 from shortener.actions import (
+    HIT_RESOLUTIONS,
     UrlValidationError,
+    bulk_create_url_targets,
     check_db_up,
+    create_generated_url_target,
     create_url_target,
     delete_url_target,
-    get_all_short_urls,
+    get_short_urls_page,
+    get_redirect,
+    get_url_stats,
     get_url_target,
+    iter_export_csv,
+    iter_export_rows,
+    iter_short_urls,
     update_url_target,
 )
+from shortener.cache import UrlCache
+from shortener.keyfilter import KeyFilter
+from shortener.keygen import KeyAllocator
+from shortener.metrics import METRICS
+from shortener.redirects import DEFAULT_REDIRECT_POLICY, REDIRECT_STATUSES, RedirectPolicy
+from shortener.singleflight import SingleFlight
+from shortener.stale import StaleCache
 
 
 # =============================================================================
@@ -27,6 +48,10 @@ from shortener.actions import (
 # Pre-compile regex for key validation
 KEY_PATTERN = re.compile(r"^[a-zA-Z0-9_-]+$")
 
+# Keys matched by another route first: a link under one could not be redirected to
+# (/ping, /status, /metrics) or read (/urls/export, /urls/bulk), so none can be created
+RESERVED_KEYS = frozenset({"ping", "status", "metrics", "export", "bulk"})
+
 
 def validate_url(url: str, max_length: int = 2048) -> bool:
     """
@@ -74,6 +99,138 @@ def get_and_validate_short_url(request: Request) -> str:
     return short_url
 
 
+def encode_cursor(after: tuple[datetime, int]) -> str:
+    """Encode a (created_at, id) keyset position as an opaque cursor string."""
+    raw = f"{after[0].isoformat()}|{after[1]}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    """Decode a cursor produced by encode_cursor."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, _, row_id = raw.partition("|")
+        return datetime.fromisoformat(created_at), int(row_id)
+    except ValueError:
+        raise UrlValidationError(detail=f"Invalid cursor: {cursor}")
+
+
+def get_page_limit(request: Request) -> int:
+    """Extract and validate the limit query parameter for listings."""
+    settings = request.app.state.settings
+    default_limit = getattr(settings, "list_page_size", 100)
+    max_limit = getattr(settings, "list_max_page_size", 1000)
+    raw_limit = request.query_params.get("limit")
+    if raw_limit is None:
+        return default_limit
+    if not raw_limit.isdigit() or not 0 < int(raw_limit) <= max_limit:
+        raise UrlValidationError(detail=f"limit must be an integer between 1 and {max_limit}")
+    return int(raw_limit)
+
+
+def get_stats_range(request: Request) -> tuple[str, datetime | None, datetime | None]:
+    """Extract and validate the resolution, since and until query parameters for stats."""
+    resolution = request.query_params.get("resolution", "hour")
+    if resolution not in HIT_RESOLUTIONS:
+        raise UrlValidationError(detail=f"resolution must be one of: {', '.join(HIT_RESOLUTIONS)}")
+
+    bounds: list[datetime | None] = []
+    for name in ("since", "until"):
+        raw = request.query_params.get(name)
+        try:
+            bounds.append(datetime.fromisoformat(raw) if raw else None)
+        except ValueError:
+            raise UrlValidationError(detail=f"{name} must be an ISO 8601 timestamp")
+    return resolution, bounds[0], bounds[1]
+
+
+def get_expires_at(body: dict) -> datetime | None:
+    """
+    Extract and validate the optional expires_at of a create or update body.
+
+    Timestamps without a UTC offset are taken as UTC.
+
+    Raises:
+        UrlValidationError: If expires_at is not an ISO 8601 timestamp in the future
+    """
+    raw = body.get("expires_at")
+    if raw is None:
+        return None
+    try:
+        expires_at = datetime.fromisoformat(raw) if isinstance(raw, str) else None
+    except ValueError:
+        expires_at = None
+    if expires_at is None:
+        raise UrlValidationError(detail="expires_at must be an ISO 8601 timestamp")
+    if expires_at.tzinfo is None:
+        expires_at = expires_at.replace(tzinfo=timezone.utc)
+    if expires_at <= datetime.now(timezone.utc):
+        raise UrlValidationError(detail="expires_at must be in the future")
+    return expires_at
+
+
+def get_redirect_status(body: dict) -> int | None:
+    """
+    Extract and validate the optional redirect_status of a create or update body.
+
+    Raises:
+        UrlValidationError: If redirect_status is not one of the redirect status codes
+    """
+    redirect_status = body.get("redirect_status")
+    if redirect_status is None:
+        return None
+    if type(redirect_status) is not int or redirect_status not in REDIRECT_STATUSES:
+        raise UrlValidationError(detail=f"redirect_status must be one of: {', '.join(map(str, REDIRECT_STATUSES))}")
+    return redirect_status
+
+
+def _url_response(
+    short_url: str, target_url: str, expires_at: datetime | None, redirect_status: int | None
+) -> Dict[str, str | int]:
+    """Return the JSON body describing one short URL."""
+    content: Dict[str, str | int] = {"short_url": short_url, "target_url": target_url}
+    if expires_at is not None:
+        content["expires_at"] = expires_at.isoformat()
+    if redirect_status is not None:
+        content["redirect_status"] = redirect_status
+    return content
+
+
+def _get_url_cache(request: Request) -> UrlCache | None:
+    """Return the redirect cache from app state, if one is configured."""
+    return getattr(request.app.state, "url_cache", None)
+
+
+def _get_key_filter(request: Request) -> KeyFilter | None:
+    """Return the negative-lookup key filter from app state, if one is loaded."""
+    return getattr(request.app.state, "key_filter", None)
+
+
+def _get_coalescer(request: Request) -> SingleFlight | None:
+    """Return the lookup coalescer from app state, if one is configured."""
+    return getattr(request.app.state, "lookup_coalescer", None)
+
+
+def _get_stale_cache(request: Request) -> StaleCache | None:
+    """Return the last-known-good redirect cache from app state, if one is configured."""
+    return getattr(request.app.state, "stale_cache", None)
+
+
+def _get_redirect_policy(request: Request) -> RedirectPolicy:
+    """Return the redirect policy from app state, or the default one."""
+    return getattr(request.app.state, "redirect_policy", None) or DEFAULT_REDIRECT_POLICY
+
+
+def _read_your_writes(request: Request) -> bool:
+    """Return True if management reads must go to the primary instead of a replica."""
+    return getattr(request.app.state.settings, "read_your_writes", True)
+
+
+def _get_key_allocator(request: Request) -> KeyAllocator | None:
+    """Return the generated key allocator from app state, if one is configured."""
+    return getattr(request.app.state, "key_allocator", None)
+
+
 # =============================================================================
 # Basic Endpoints
 # =============================================================================
@@ -92,21 +249,74 @@ async def ping(request: Request) -> JSONResponse:
 
 async def status(request: Request) -> JSONResponse:
     """
-    summary: Status request to check service has a connection to the database.
+    summary: Status request to check service has a connection to the database and is ready for traffic.
     responses:
       200:
+        description: >-
+          With Postgres, breaker is the state of the database circuit breaker:
+          closed, open or half_open.
+        examples:
+            {"db_up": "true", "ready": "true", "breaker": "closed"}
+      503:
+        description: The worker is still warming up its redirect cache
         examples:
-            {"db_up": "true"}
+            {"db_up": "true", "ready": "false"}
     """
-    db_up_result = await check_db_up(request.app.state.db)
+    db_up_result = await check_db_up(request.app.state.storage)
     db_up = "true" if db_up_result else "false"
-    return JSONResponse({"db_up": db_up})
+    ready = getattr(request.app.state, "ready", True)
+    content = {"db_up": db_up, "ready": "true" if ready else "false"}
+    breaker = getattr(getattr(request.app.state, "db", None), "breaker", None)
+    if breaker is not None:
+        content["breaker"] = breaker.state
+    return JSONResponse(content, status_code=200 if ready else 503)
+
+
+async def metrics(request: Request) -> PlainTextResponse:
+    """
+    summary: Request, query and connection pool metrics of this worker process.
+    responses:
+      200:
+        description: Metrics in the Prometheus text exposition format
+        content:
+          text/plain:
+            schema:
+              type: string
+    """
+    db = request.app.state.db
+    coalescer = _get_coalescer(request)
+    rate_limiter = getattr(request.app.state, "rate_limiter", None)
+    load_shedder = getattr(request.app.state, "load_shedder", None)
+    breaker = getattr(db, "breaker", None)
+    stale_cache = _get_stale_cache(request)
+    hit_counter = getattr(request.app.state, "hit_counter", None)
+    # Read on every scrape, so a filter rebuilt after a reset is reported as soon as it is swapped in
+    key_filter = _get_key_filter(request)
+    return PlainTextResponse(
+        METRICS.render(
+            pool_stats=db.pool_stats() if db is not None else None,
+            lookup_stats=coalescer.stats() if coalescer is not None else None,
+            rate_limit_stats=rate_limiter.stats() if rate_limiter is not None else None,
+            load_stats=load_shedder.stats() if load_shedder is not None else None,
+            breaker_stats=breaker.stats() if breaker is not None else None,
+            stale_served=stale_cache.served if stale_cache is not None else None,
+            hit_stats=hit_counter.stats() if hit_counter is not None else None,
+            key_filter_stats=key_filter.stats() if key_filter is not None else None,
+        ),
+        media_type="text/plain; version=0.0.4",
+    )
 
 
 # =============================================================================
 # Redirect Endpoint
 # =============================================================================
 
+# Single-segment paths that are routed to other endpoints
+RESERVED_PATHS = frozenset({"/ping", "/status", "/metrics"})
+
+# Sent instead of the policy's Cache-Control with targets served from the stale cache
+STALE_REDIRECT_HEADERS = {"cache-control": "no-store", "x-served-stale": "true"}
+
 
 async def redirect_url(request: Request) -> RedirectResponse:
     """
@@ -119,7 +329,11 @@ async def redirect_url(request: Request) -> RedirectResponse:
             type : string
     responses:
       307:
-        description: Redirected to target url.
+        description: >-
+          Redirected to target url; the status is the link's own redirect_status or
+          APP_REDIRECT_STATUS, with a Cache-Control header for CDNs and browsers.
+          While the database is unavailable, the last known target is sent with
+          X-Served-Stale: true and Cache-Control: no-store.
       404:
         description: Short URL not found.
       400:
@@ -131,8 +345,26 @@ async def redirect_url(request: Request) -> RedirectResponse:
     if not validate_key(short_url):
         raise UrlValidationError(detail=f"Invalid URL key format: {short_url}")
 
-    target_url = await get_url_target(short_url, request.app.state.db)
-    return RedirectResponse(url=target_url)
+    target_url, redirect_status, is_stale = await get_redirect(
+        short_url,
+        request.app.state.storage,
+        cache=_get_url_cache(request),
+        key_filter=_get_key_filter(request),
+        coalescer=_get_coalescer(request),
+        stale=_get_stale_cache(request),
+    )
+
+    hit_counter = getattr(request.app.state, "hit_counter", None)
+    if hit_counter is not None:
+        hit_counter.record(short_url)
+    policy = _get_redirect_policy(request)
+    status_code = policy.status_of(redirect_status)
+    if is_stale:
+        # Not to be kept by caches beyond the outage
+        return RedirectResponse(url=target_url, status_code=status_code, headers=STALE_REDIRECT_HEADERS)
+    return RedirectResponse(
+        url=target_url, status_code=status_code, headers={"cache-control": policy.cache_control(status_code)}
+    )
 
 
 # =============================================================================
@@ -176,17 +408,118 @@ async def get_url(request: Request) -> JSONResponse:
                   type: string
     """
     short_url = get_and_validate_short_url(request)
-    target_url = await get_url_target(short_url, request.app.state.db)
+    target_url = await get_url_target(
+        short_url,
+        request.app.state.storage,
+        cache=_get_url_cache(request),
+        key_filter=_get_key_filter(request),
+        coalescer=_get_coalescer(request),
+        consistent=_read_your_writes(request),
+    )
 
     return JSONResponse(content={"short_url": short_url, "target_url": target_url}, status_code=200)
 
 
+async def url_stats(request: Request) -> JSONResponse:
+    """
+    summary: Get click statistics of a short URL
+    parameters:
+        - name: short_url
+          in: path
+          required: true
+          schema:
+            type: string
+        - name: resolution
+          in: query
+          required: false
+          description: Bucket size, one of minute, hour (default) or day
+          schema:
+            type: string
+        - name: since
+          in: query
+          required: false
+          description: ISO 8601 start of the range (default 1 hour, 1 day or 30 days ago)
+          schema:
+            type: string
+        - name: until
+          in: query
+          required: false
+          description: ISO 8601 end of the range, exclusive
+          schema:
+            type: string
+    responses:
+      200:
+        description: All-time click total and clicks per bucket
+        content:
+          application/json:
+            schema:
+              type: object
+              properties:
+                short_url:
+                  type: string
+                resolution:
+                  type: string
+                total:
+                  type: integer
+                buckets:
+                  type: array
+                  items:
+                    type: object
+                    properties:
+                      start:
+                        type: string
+                      hits:
+                        type: integer
+            example:
+              {"short_url": "testurl", "resolution": "hour", "total": 42,
+               "buckets": [{"start": "2024-01-01T10:00:00", "hits": 42}]}
+      404:
+        description: URL not found
+    """
+    short_url = get_and_validate_short_url(request)
+    resolution, since, until = get_stats_range(request)
+    db = request.app.state.db
+    if db is None:
+        raise HTTPException(status_code=501, detail="Click statistics require the postgres storage backend")
+    total, buckets = await get_url_stats(short_url, db, resolution=resolution, since=since, until=until)
+
+    return JSONResponse(
+        content={
+            "short_url": short_url,
+            "resolution": resolution,
+            "total": total,
+            "buckets": [{"start": start.isoformat(), "hits": hits} for start, hits in buckets],
+        },
+        status_code=200,
+    )
+
+
 async def list_urls(request: Request) -> JSONResponse:
     """
-    summary: List all short URLs
+    summary: List short URLs, newest first
+    parameters:
+        - name: limit
+          in: query
+          required: false
+          schema:
+            type: integer
+        - name: cursor
+          in: query
+          required: false
+          description: Opaque cursor taken from the Link header of the previous page
+          schema:
+            type: string
+        - name: stream
+          in: query
+          required: false
+          description: Stream every URL as one JSON array instead of paginating
+          schema:
+            type: boolean
     responses:
       200:
-        description: List of all short URLs and their targets
+        description: >
+          One page of short URLs and their targets. If more pages follow, the
+          Link header holds the URL of the next page with rel="next".
         content:
           application/json:
             schema:
@@ -199,22 +532,143 @@ async def list_urls(request: Request) -> JSONResponse:
                   target_url:
                     type: string
     """
-    urls = await get_all_short_urls(request.app.state.db)
-    return JSONResponse(content=urls, status_code=200)
+    if request.query_params.get("stream", "").lower() in ("true", "1", "yes"):
+        batch_size = getattr(request.app.state.settings, "list_stream_batch_size", 1000)
+        return StreamingResponse(
+            _stream_json_array(iter_short_urls(request.app.state.storage, batch_size=batch_size)),
+            media_type="application/json",
+        )
+
+    limit = get_page_limit(request)
+    cursor = request.query_params.get("cursor")
+    after = decode_cursor(cursor) if cursor else None
+
+    urls, next_after = await get_short_urls_page(
+        request.app.state.storage, limit=limit, after=after, consistent=_read_your_writes(request)
+    )
+
+    headers = {}
+    if next_after is not None:
+        next_url = request.url.include_query_params(cursor=encode_cursor(next_after), limit=limit)
+        headers["Link"] = f'<{next_url}>; rel="next"'
+    return JSONResponse(content=urls, status_code=200, headers=headers)
+
+
+async def _stream_json_array(rows: AsyncIterator[Dict[str, str]], chunk_size: int = 65536) -> AsyncIterator[bytes]:
+    """Serialize rows as a JSON array, yielding chunks of roughly chunk_size bytes."""
+    buffer = ["["]
+    buffered = 1
+    first = True
+    try:
+        async for row in rows:
+            item = json.dumps(row, ensure_ascii=False, separators=(",", ":"))
+            buffer.append(item if first else "," + item)
+            buffered += len(item) + 1
+            first = False
+            if buffered >= chunk_size:
+                yield "".join(buffer).encode()
+                buffer.clear()
+                buffered = 0
+    except Exception as e:
+        # Headers are already sent, so the client sees a truncated body
+        logging.error(f"Error while streaming URLs: {str(e)}")
+        raise
+    buffer.append("]")
+    yield "".join(buffer).encode()
+
+
+async def export_urls(request: Request) -> StreamingResponse:
+    """
+    summary: Export every short URL as NDJSON or CSV.
+    parameters:
+        - name: format
+          in: query
+          required: false
+          schema:
+            type: string
+            enum: [ndjson, csv]
+            default: ndjson
+    responses:
+      200:
+        description: >
+          Streamed dump of all short URLs with short_url, target_url and
+          created_at, one line per URL.
+      400:
+        description: Unsupported export format
+    """
+    export_format = request.query_params.get("format", "ndjson").lower()
+    db = request.app.state.db
+    storage = request.app.state.storage
+    batch_size = getattr(request.app.state.settings, "list_stream_batch_size", 1000)
+
+    if export_format == "csv":
+        # Postgres formats the CSV itself; other backends are formatted here
+        body = iter_export_csv(db) if db is not None else _stream_csv(iter_export_rows(storage, batch_size=batch_size))
+        media_type = "text/csv"
+    elif export_format == "ndjson":
+        body = _stream_ndjson(iter_export_rows(storage, batch_size=batch_size))
+        media_type = "application/x-ndjson"
+    else:
+        raise UrlValidationError(detail=f"Unsupported export format: {export_format}")
+
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="short_urls.{export_format}"'},
+    )
+
+
+async def _stream_ndjson(rows: AsyncIterator[Dict[str, str]], chunk_size: int = 65536) -> AsyncIterator[bytes]:
+    """Serialize rows as newline-delimited JSON, yielding chunks of roughly chunk_size bytes."""
+    buffer: list[str] = []
+    buffered = 0
+    try:
+        async for row in rows:
+            line = json.dumps(row, ensure_ascii=False, separators=(",", ":")) + "\n"
+            buffer.append(line)
+            buffered += len(line)
+            if buffered >= chunk_size:
+                yield "".join(buffer).encode()
+                buffer.clear()
+                buffered = 0
+    except Exception as e:
+        # Headers are already sent, so the client sees a truncated body
+        logging.error(f"Error while exporting URLs: {str(e)}")
+        raise
+    if buffer:
+        yield "".join(buffer).encode()
+
+
+async def _stream_csv(rows: AsyncIterator[Dict[str, str]], chunk_size: int = 65536) -> AsyncIterator[bytes]:
+    """Serialize export rows as CSV with a header row, yielding chunks of roughly chunk_size bytes."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(("short_url", "target_url", "created_at"))
+    try:
+        async for row in rows:
+            writer.writerow((row["short_url"], row["target_url"], row["created_at"]))
+            if buffer.tell() >= chunk_size:
+                yield buffer.getvalue().encode()
+                buffer.seek(0)
+                buffer.truncate()
+    except Exception as e:
+        # Headers are already sent, so the client sees a truncated body
+        logging.error(f"Error while exporting URLs: {str(e)}")
+        raise
+    yield buffer.getvalue().encode()
 
 
 async def create_url(request: Request) -> JSONResponse:
     """
     summary: Create a short_url in the database.
     requestBody:
-      description: Short URL data
+      description: Short URL data; if short_url is omitted, a key is generated
       required: true
       content:
         application/json:
           schema:
             type: object
             required:
-              - short_url
               - target_url
             properties:
               short_url:
@@ -223,6 +677,14 @@ async def create_url(request: Request) -> JSONResponse:
               target_url:
                 type: string
                 example: https://www.wikipedia.org
+              expires_at:
+                type: string
+                description: ISO 8601 time after which the link is gone (UTC if no offset is given)
+                example: "2030-01-01T00:00:00Z"
+              redirect_status:
+                type: integer
+                enum: [301, 302, 307, 308]
+                description: Status of redirects to this link, overriding APP_REDIRECT_STATUS
     responses:
       201:
         description: Short URL created successfully
@@ -235,6 +697,10 @@ async def create_url(request: Request) -> JSONResponse:
                   type: string
                 target_url:
                   type: string
+                expires_at:
+                  type: string
+                redirect_status:
+                  type: integer
             example:
               {"short_url": "wkp", "target_url": "https://www.wikipedia.org"}
       400:
@@ -266,16 +732,41 @@ async def create_url(request: Request) -> JSONResponse:
         logging.error(f"Invalid JSON in request: {str(e)}")
         raise UrlValidationError(detail="Invalid JSON in request body")
 
-    short_url = body.get("short_url", "")
+    short_url = body.get("short_url")
     target_url = body.get("target_url", "")
 
     # Validate URL format and length (validators check for empty values too)
-    if not validate_key(short_url):
+    if short_url is not None and not validate_key(short_url):
         raise UrlValidationError(detail=f"Invalid URL key format: {short_url}")
+    if short_url in RESERVED_KEYS:
+        raise UrlValidationError(detail=f"URL key is reserved: {short_url}")
     if not validate_url(target_url):
         raise UrlValidationError(detail=f"Invalid target URL format: {target_url}")
+    expires_at = get_expires_at(body)
+    redirect_status = get_redirect_status(body)
 
-    success = await create_url_target(short_url=short_url, target_url=target_url, db=request.app.state.db)
+    if short_url is None:
+        key_allocator = _get_key_allocator(request)
+        if key_allocator is None:
+            raise UrlValidationError(detail="short_url is required")
+        short_url = await create_generated_url_target(
+            target_url=target_url,
+            storage=request.app.state.storage,
+            key_allocator=key_allocator,
+            key_filter=_get_key_filter(request),
+            expires_at=expires_at,
+            redirect_status=redirect_status,
+        )
+        return JSONResponse(content=_url_response(short_url, target_url, expires_at, redirect_status), status_code=201)
+
+    success = await create_url_target(
+        short_url=short_url,
+        target_url=target_url,
+        storage=request.app.state.storage,
+        key_filter=_get_key_filter(request),
+        expires_at=expires_at,
+        redirect_status=redirect_status,
+    )
 
     if not success:
         return JSONResponse(
@@ -286,7 +777,114 @@ async def create_url(request: Request) -> JSONResponse:
             status_code=409,
         )
 
-    return JSONResponse(content={"short_url": short_url, "target_url": target_url}, status_code=201)
+    return JSONResponse(content=_url_response(short_url, target_url, expires_at, redirect_status), status_code=201)
+
+
+async def bulk_create_urls(request: Request) -> JSONResponse:
+    """
+    summary: Create many short_urls in the database in one request.
+    requestBody:
+      description: List of short URLs to create
+      required: true
+      content:
+        application/json:
+          schema:
+            type: array
+            items:
+              type: object
+              required:
+                - short_url
+                - target_url
+              properties:
+                short_url:
+                  type: string
+                  example: wkp
+                target_url:
+                  type: string
+                  example: https://www.wikipedia.org
+    responses:
+      200:
+        description: Per-item results, in request order
+        content:
+          application/json:
+            schema:
+              type: object
+              properties:
+                created:
+                  type: integer
+                conflict:
+                  type: integer
+                invalid:
+                  type: integer
+                results:
+                  type: array
+                  items:
+                    type: object
+                    properties:
+                      short_url:
+                        type: string
+                      status:
+                        type: string
+                        enum: [created, conflict, invalid]
+                      detail:
+                        type: string
+            example:
+              {"created": 1, "conflict": 0, "invalid": 0, "results": [{"short_url": "wkp", "status": "created"}]}
+      400:
+        description: Body is not a JSON array or has too many items
+        content:
+          application/json:
+            schema:
+              type: object
+              properties:
+                error:
+                  type: string
+                detail:
+                  type: string
+    """
+    try:
+        body = await request.json()
+    except Exception as e:
+        logging.error(f"Invalid JSON in request: {str(e)}")
+        raise UrlValidationError(detail="Invalid JSON in request body")
+
+    if not isinstance(body, list):
+        raise UrlValidationError(detail="Request body must be a JSON array")
+
+    max_items = getattr(request.app.state.settings, "bulk_max_items", 10000)
+    if len(body) > max_items:
+        raise UrlValidationError(detail=f"Too many items, at most {max_items} are allowed per request")
+
+    results: list[dict[str, str]] = []
+    valid_items: list[tuple[str, str]] = []
+    for item in body:
+        short_url = item.get("short_url", "") if isinstance(item, dict) else ""
+        target_url = item.get("target_url", "") if isinstance(item, dict) else ""
+        if not isinstance(short_url, str) or not validate_key(short_url):
+            results.append({"short_url": str(short_url), "status": "invalid", "detail": "Invalid URL key format"})
+        elif short_url in RESERVED_KEYS:
+            results.append({"short_url": short_url, "status": "invalid", "detail": "Reserved URL key"})
+        elif not isinstance(target_url, str) or not validate_url(target_url):
+            results.append({"short_url": short_url, "status": "invalid", "detail": "Invalid target URL format"})
+        else:
+            results.append({"short_url": short_url, "status": "conflict"})
+            valid_items.append((short_url, target_url))
+
+    created = await bulk_create_url_targets(
+        valid_items, storage=request.app.state.storage, key_filter=_get_key_filter(request)
+    )
+
+    # Only the first occurrence of a created key counts as created
+    for result in results:
+        if result["status"] == "conflict" and result["short_url"] in created:
+            result["status"] = "created"
+            created.discard(result["short_url"])
+
+    counts = {status: 0 for status in ("created", "conflict", "invalid")}
+    for result in results:
+        counts[result["status"]] += 1
+
+    return JSONResponse(content={**counts, "results": results}, status_code=200)
 
 
 async def update_url(request: Request) -> JSONResponse:
@@ -299,7 +897,9 @@ async def update_url(request: Request) -> JSONResponse:
           schema:
             type: string
     requestBody:
-      description: New target URL
+      description: >-
+        New target URL, expiry and redirect status; a link updated without expires_at no longer
+        expires, and one updated without redirect_status follows APP_REDIRECT_STATUS
       required: true
       content:
         application/json:
@@ -311,6 +911,12 @@ async def update_url(request: Request) -> JSONResponse:
               target_url:
                 type: string
                 example: https://www.wikipedia.org/wiki/Python
+              expires_at:
+                type: string
+                description: ISO 8601 time after which the link is gone (UTC if no offset is given)
+              redirect_status:
+                type: integer
+                enum: [301, 302, 307, 308]
     responses:
       200:
         description: Short URL updated successfully
@@ -323,8 +929,11 @@ async def update_url(request: Request) -> JSONResponse:
                   type: string
                 target_url:
                   type: string
+                previous_max_age:
+                  type: integer
+                  description: Seconds CDNs and browsers may keep serving the previous redirect
             example:
-              {"short_url": "wkp", "target_url": "https://www.wikipedia.org/wiki/Python"}
+              {"short_url": "wkp", "target_url": "https://www.wikipedia.org/wiki/Python", "previous_max_age": 0}
       400:
         description: Validation error
         content:
@@ -370,13 +979,25 @@ async def update_url(request: Request) -> JSONResponse:
     max_url_length = getattr(request.app.state.settings, "max_url_length", 2048)
     if len(target_url) > max_url_length:
         raise UrlValidationError(detail=f"Target URL exceeds maximum length of {max_url_length}")
+    expires_at = get_expires_at(body)
+    redirect_status = get_redirect_status(body)
 
-    success = await update_url_target(short_url=short_url, new_target_url=target_url, db=request.app.state.db)
+    previous_max_age = await update_url_target(
+        short_url=short_url,
+        new_target_url=target_url,
+        storage=request.app.state.storage,
+        cache=_get_url_cache(request),
+        expires_at=expires_at,
+        redirect_status=redirect_status,
+        policy=_get_redirect_policy(request),
+        stale=_get_stale_cache(request),
+    )
 
-    if not success:
+    if previous_max_age is None:
         raise HTTPException(status_code=404, detail=f"URL with key '{short_url}' not found")
 
-    return JSONResponse(content={"short_url": short_url, "target_url": target_url}, status_code=200)
+    content = _url_response(short_url, target_url, expires_at, redirect_status)
+    return JSONResponse(content={**content, "previous_max_age": previous_max_age}, status_code=200)
 
 
 async def delete_url(request: Request) -> JSONResponse:
@@ -415,7 +1036,13 @@ async def delete_url(request: Request) -> JSONResponse:
                   type: string
     """
     short_url = get_and_validate_short_url(request)
-    success = await delete_url_target(short_url, request.app.state.db)
+    success = await delete_url_target(
+        short_url,
+        request.app.state.storage,
+        cache=_get_url_cache(request),
+        key_filter=_get_key_filter(request),
+        stale=_get_stale_cache(request),
+    )
 
     if not success:
         raise HTTPException(status_code=404, detail=f"URL with key '{short_url}' not found")
@@ -429,7 +1056,10 @@ async def delete_url(request: Request) -> JSONResponse:
 
 # URL management routes
 url_routes = [
+    Route("/bulk", bulk_create_urls, methods=["POST"]),
+    Route("/export", export_urls, methods=["GET"]),
     Route("/{short_url}", get_url, methods=["GET"]),
+    Route("/{short_url}/stats", url_stats, methods=["GET"]),
     Route("/", list_urls, methods=["GET"]),
     Route("/", create_url, methods=["POST"]),
     Route("/{short_url}", update_url, methods=["PUT"]),
@@ -1,17 +1,22 @@
 import os
 import time
 import asyncio
+from pathlib import Path
 from typing import AsyncGenerator
 from unittest.mock import AsyncMock, MagicMock
 
 import psycopg
 import pytest
+from docker.errors import DockerException
 from starlette.testclient import TestClient
 from testcontainers.postgres import PostgresContainer
 
 from shortener.app import app
 from shortener.database import Database
-from shortener.settings import AppSettings
+from shortener.settings import AppSettings, PostgresSettings
+from shortener.storage import PostgresStorage
+
+MIGRATION_PATH = Path(__file__).parent.parent / "shortener" / "migration.sql"
 
 
 @pytest.fixture(scope="function")
@@ -24,14 +29,14 @@ def test_client() -> TestClient:
     mock_db = AsyncMock(spec=Database)
 
     # Configure mock behaviors for different queries
-    async def mock_execute_one(query, *args):
+    async def mock_execute_one(query, *args, replica=False):
         if "SELECT 1" in query:
             return (1,)
-        elif "SELECT target FROM short_urls" in query:
-            return ("https://example.com/mocked",)
+        elif "SELECT target, expires_at, redirect_status FROM short_urls" in query:
+            return ("https://example.com/mocked", None, None)
         return None
 
-    async def mock_execute_all(query, *args):
+    async def mock_execute_all(query, *args, replica=False):
         if "SELECT url_key, target FROM short_urls" in query:
             return [("test1", "https://example.com")]
         return []
@@ -54,6 +59,7 @@ def test_client() -> TestClient:
             async def mock_conn_execute(query, *args):
                 result = MagicMock()
                 result.rowcount = 1
+                result.fetchone = AsyncMock(return_value=("https://example.com/mocked", None, None))
                 return result
 
             mock_conn.execute.side_effect = mock_conn_execute
@@ -63,9 +69,15 @@ def test_client() -> TestClient:
             pass
 
     mock_db.get_connection.return_value = MockConnectionContext()
+    mock_db.pipeline.return_value = MockConnectionContext()
+
+    # Always run the health check query instead of trusting earlier queries
+    mock_db.recently_healthy.return_value = False
+    mock_db.pool_stats.return_value = {}
 
     # Set up the app state
     app.state.db = mock_db
+    app.state.storage = PostgresStorage(mock_db)
     app.state.settings = app_settings
 
     # Create the test client
@@ -77,15 +89,17 @@ def test_client() -> TestClient:
 @pytest.fixture(scope="session")
 def postgres_container():
     """Create and manage a PostgreSQL container for the test session."""
-    postgres = PostgresContainer(
-        image="postgres:15",
-        username="localuser",
-        password="password123",
-        dbname="urldatabase",
-        port=5432,
-    )
-
-    postgres.start()
+    try:
+        postgres = PostgresContainer(
+            image="postgres:15",
+            username="localuser",
+            password="password123",
+            dbname="urldatabase",
+            port=5432,
+        )
+        postgres.start()
+    except DockerException as e:
+        pytest.skip(f"Docker is not available: {str(e)}")
 
     # Wait for the container to be ready
     time.sleep(2)
@@ -103,6 +117,20 @@ def postgres_container():
     postgres.stop()
 
 
+@pytest.fixture(scope="function")
+async def postgres_db(postgres_container: PostgresContainer) -> AsyncGenerator[Database, None]:
+    """Connect a Database to the test container, with the schema migrated and every table empty."""
+    db = Database(PostgresSettings(min_size=1, max_size=4, notify_enabled=False))
+    await db.connect()
+    async with db.get_connection() as conn:
+        await conn.execute(MIGRATION_PATH.read_text(), prepare=False)
+        await conn.execute("TRUNCATE short_urls, url_hits, url_hit_buckets")
+
+    yield db
+
+    await db.disconnect()
+
+
 @pytest.fixture(scope="session")
 async def db_connection(postgres_container: PostgresContainer) -> AsyncGenerator[psycopg.AsyncConnection, None]:
     """Create a PostgreSQL async connection for tests."""
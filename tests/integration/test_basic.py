@@ -13,4 +13,15 @@ def test_status(test_client: TestClient) -> None:
     # The mock connection is configured to return 1 for "SELECT 1" queries
     response = test_client.get("/status")
     assert response.status_code == 200
-    assert response.json() == {"db_up": "true"}
+    assert response.json() == {"db_up": "true", "ready": "true"}
+
+
+def test_status_not_ready_during_warm_up(test_client: TestClient) -> None:
+    """Test that the status endpoint fails until the cache warm-up has finished."""
+    test_client.app.state.ready = False  # type: ignore[attr-defined]
+    try:
+        response = test_client.get("/status")
+    finally:
+        test_client.app.state.ready = True  # type: ignore[attr-defined]
+    assert response.status_code == 503
+    assert response.json() == {"db_up": "true", "ready": "false"}
@@ -0,0 +1,39 @@
+import pytest
+from starlette.testclient import TestClient
+
+from shortener import views
+
+
+def test_bulk_create_reports_each_item(test_client: TestClient, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that every item gets a created, conflict or invalid result."""
+
+    async def fake_bulk_create(items, storage, key_filter=None):
+        assert [short_url for short_url, _ in items] == ["new1", "taken", "new1"]
+        return {"new1"}
+
+    monkeypatch.setattr(views, "bulk_create_url_targets", fake_bulk_create)
+    items = [
+        {"short_url": "new1", "target_url": "https://example.com/1"},
+        {"short_url": "taken", "target_url": "https://example.com/2"},
+        {"short_url": "bad key!", "target_url": "https://example.com/3"},
+        {"short_url": "new2", "target_url": "not-a-url"},
+        {"short_url": "new1", "target_url": "https://example.com/5"},
+    ]
+    response = test_client.post("/urls/bulk", json=items)
+
+    assert response.status_code == 200
+    body = response.json()
+    assert [result["status"] for result in body["results"]] == [
+        "created",
+        "conflict",
+        "invalid",
+        "invalid",
+        "conflict",
+    ]
+    assert (body["created"], body["conflict"], body["invalid"]) == (1, 2, 2)
+
+
+def test_bulk_create_requires_array(test_client: TestClient) -> None:
+    """Test that a non-array body is rejected."""
+    response = test_client.post("/urls/bulk", json={"short_url": "abc", "target_url": "https://example.com"})
+    assert response.status_code == 400
@@ -0,0 +1,45 @@
+from unittest.mock import MagicMock
+
+import pytest
+from starlette.testclient import TestClient
+
+from shortener.app import app, exception_handlers
+from shortener.fastpath import RedirectFastPath
+
+
+@pytest.fixture
+def fast_client(test_client: TestClient) -> TestClient:
+    """Test client for the fast path wrapping the mocked app."""
+    return TestClient(RedirectFastPath(app, exception_handlers))
+
+
+@pytest.mark.parametrize("path", ["/testredirect", "/bad%20key", "/ping", "/status", "/urls/abc"])
+def test_fast_path_matches_app(test_client: TestClient, fast_client: TestClient, path: str) -> None:
+    """Test that the fast path answers exactly like the Starlette app."""
+    expected = test_client.get(path, follow_redirects=False)
+    actual = fast_client.get(path, follow_redirects=False)
+    assert actual.status_code == expected.status_code
+    assert actual.headers.get("location") == expected.headers.get("location")
+    assert actual.headers.get("cache-control") == expected.headers.get("cache-control")
+    assert actual.content == expected.content
+
+
+def test_fast_path_not_found_matches_app(test_client: TestClient, fast_client: TestClient) -> None:
+    """Test that 404 bodies are rendered by the app's exception handlers."""
+    test_client.app.state.db.execute_one.side_effect = None  # type: ignore[attr-defined]
+    test_client.app.state.db.execute_one.return_value = None  # type: ignore[attr-defined]
+    expected = test_client.get("/missing", follow_redirects=False)
+    actual = fast_client.get("/missing", follow_redirects=False)
+    assert actual.status_code == expected.status_code == 404
+    assert actual.json() == expected.json()
+
+
+def test_fast_path_skips_routing(test_client: TestClient) -> None:
+    """Test that valid redirects never reach the wrapped app."""
+    wrapped = MagicMock(side_effect=AssertionError("request was routed through Starlette"))
+    wrapped.state = app.state
+    fast_client = TestClient(RedirectFastPath(wrapped, exception_handlers))
+
+    response = fast_client.get("/testredirect", follow_redirects=False)
+    assert response.status_code == 307
+    assert response.headers["location"] == "https://example.com/mocked"
@@ -0,0 +1,99 @@
+import json
+from datetime import datetime
+from typing import AsyncIterator, Dict
+
+import pytest
+from starlette.testclient import TestClient
+
+from shortener import views
+from shortener.views import decode_cursor, encode_cursor
+
+
+def test_cursor_roundtrip() -> None:
+    """Test that a keyset position survives encoding to a cursor."""
+    after = (datetime(2024, 5, 1, 12, 30, 15, 123456), 42)
+    assert decode_cursor(encode_cursor(after)) == after
+
+
+def test_invalid_cursor(test_client: TestClient) -> None:
+    """Test that a malformed cursor is rejected."""
+    response = test_client.get("/urls/?cursor=not-a-cursor")
+    assert response.status_code == 400
+
+
+def test_invalid_limit(test_client: TestClient) -> None:
+    """Test that an out-of-range limit is rejected."""
+    response = test_client.get("/urls/?limit=0")
+    assert response.status_code == 400
+
+
+def test_list_urls_next_page_link(test_client: TestClient) -> None:
+    """Test that a full page advertises the next page in the Link header."""
+    created_at = datetime(2024, 5, 1)
+    rows = [(i, f"key{i}", f"https://example.com/{i}", created_at) for i in range(3, 0, -1)]
+    test_client.app.state.db.execute_all.side_effect = None  # type: ignore[attr-defined]
+    test_client.app.state.db.execute_all.return_value = rows  # type: ignore[attr-defined]
+
+    response = test_client.get("/urls/?limit=2")
+    assert response.status_code == 200
+    assert [url["short_url"] for url in response.json()] == ["key3", "key2"]
+    assert f"cursor={encode_cursor((created_at, 2))}" in response.headers["link"]
+
+
+def test_list_urls_last_page(test_client: TestClient) -> None:
+    """Test that the last page has no Link header."""
+    response = test_client.get("/urls/")
+    assert response.status_code == 200
+    assert "link" not in response.headers
+
+
+def test_list_urls_stream(test_client: TestClient, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that streaming mode returns every row as one JSON array."""
+
+    async def fake_iter(storage, batch_size: int = 1000) -> AsyncIterator[Dict[str, str]]:
+        for i in range(5):
+            yield {"short_url": f"key{i}", "target_url": f"https://example.com/{i}"}
+
+    monkeypatch.setattr(views, "iter_short_urls", fake_iter)
+    response = test_client.get("/urls/?stream=true")
+    assert response.status_code == 200
+    assert [url["short_url"] for url in response.json()] == [f"key{i}" for i in range(5)]
+
+
+def test_export_ndjson(test_client: TestClient, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that the export streams one JSON object per line."""
+
+    async def fake_iter(storage, batch_size: int = 1000) -> AsyncIterator[Dict[str, str]]:
+        for i in range(3):
+            yield {
+                "short_url": f"key{i}",
+                "target_url": f"https://example.com/{i}",
+                "created_at": "2024-05-01T00:00:00",
+            }
+
+    monkeypatch.setattr(views, "iter_export_rows", fake_iter)
+    response = test_client.get("/urls/export")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = response.text.splitlines()
+    assert len(lines) == 3
+    assert json.loads(lines[0])["created_at"] == "2024-05-01T00:00:00"
+
+
+def test_export_csv(test_client: TestClient, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that the CSV export passes COPY output through unchanged."""
+
+    async def fake_copy(db) -> AsyncIterator[bytes]:
+        yield b"short_url,target_url,created_at\n"
+        yield b"key0,https://example.com/0,2024-05-01 00:00:00\n"
+
+    monkeypatch.setattr(views, "iter_export_csv", fake_copy)
+    response = test_client.get("/urls/export?format=csv")
+    assert response.status_code == 200
+    assert response.text.splitlines()[1].startswith("key0,")
+
+
+def test_export_unknown_format(test_client: TestClient) -> None:
+    """Test that unsupported export formats are rejected."""
+    response = test_client.get("/urls/export?format=xml")
+    assert response.status_code == 400
@@ -0,0 +1,135 @@
+"""Tests of the SQL in shortener against a real Postgres started with testcontainers."""
+
+import csv
+import io
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import psycopg
+import pytest
+
+from shortener.actions import get_url_stats, iter_export_csv, iter_export_rows, record_hits, rollup_hit_buckets
+from shortener.database import CHANGE_CHANNEL, Database
+from shortener.importer import ImportFailed, import_file
+from shortener.storage import PostgresStorage
+
+
+async def test_export_formats_leave_out_expired_links(postgres_db: Database) -> None:
+    """Test that the CSV and NDJSON exports return the same live links."""
+    storage = PostgresStorage(postgres_db)
+    now = datetime.now(timezone.utc)
+    await storage.create("forever", "https://example.com/forever")
+    await storage.create("later", "https://example.com/later", expires_at=now + timedelta(hours=1))
+    await storage.create("gone", "https://example.com/gone", expires_at=now - timedelta(seconds=1))
+
+    data = b"".join([chunk async for chunk in iter_export_csv(postgres_db)])
+    csv_keys = {row["short_url"] for row in csv.DictReader(io.StringIO(data.decode()))}
+    row_keys = {row["short_url"] async for row in iter_export_rows(storage)}
+
+    assert csv_keys == row_keys == {"forever", "later"}
+
+
+async def test_sweep_deletes_expired_links_with_their_click_buckets(postgres_db: Database) -> None:
+    """Test that the sweep deletes expired links and their buckets, skipping links locked by a write."""
+    storage = PostgresStorage(postgres_db)
+    now = datetime.now(timezone.utc)
+    for url_key in ("gone", "locked"):
+        await storage.create(url_key, f"https://example.com/{url_key}", expires_at=now - timedelta(seconds=1))
+    await storage.create("live", "https://example.com/live")
+    await postgres_db.execute(
+        "INSERT INTO url_hit_buckets (url_key, resolution, bucket_start, hits) "
+        "SELECT url_key, 'minute', LOCALTIMESTAMP - n * interval '1 minute', 1 "
+        "FROM unnest(ARRAY['gone', 'locked', 'live']) AS url_key, generate_series(1, 5) AS n"
+    )
+
+    async with postgres_db.get_connection() as conn:
+        await conn.execute("SELECT 1 FROM short_urls WHERE url_key = 'locked' FOR UPDATE")
+        assert await storage.delete_expired(2) == ["gone"]
+
+    rows = await postgres_db.execute_all("SELECT url_key, count(*) FROM url_hit_buckets GROUP BY url_key")
+    assert dict(rows) == {"locked": 5, "live": 5}
+    assert await storage.delete_expired(2) == ["locked"]
+    assert await storage.delete_expired(2) == []
+
+
+def _write_links(path: Path, links: list[tuple[str, str]]) -> str:
+    path.write_text("short_url,target_url\n" + "".join(f"{key},{target}\n" for key, target in links))
+    return str(path)
+
+
+async def test_import_skip_and_overwrite(postgres_db: Database, tmp_path: Path) -> None:
+    """Test that skip keeps existing links and overwrite replaces them with the file's last occurrence."""
+    storage = PostgresStorage(postgres_db)
+    await storage.create("old", "https://example.com/old", expires_at=datetime.now(timezone.utc) + timedelta(hours=1))
+    path = _write_links(
+        tmp_path / "links.csv",
+        [("old", "https://example.com/1"), ("new", "https://example.com/2"), ("old", "https://example.com/3")],
+    )
+
+    stats = await import_file(postgres_db, path, "csv", policy="skip")
+    assert (stats.written, stats.duplicates) == (1, 2)
+    assert (await storage.get_target("old", consistent=True))[0] == "https://example.com/old"  # type: ignore[index]
+
+    stats = await import_file(postgres_db, path, "csv", policy="overwrite")
+    assert (stats.written, stats.duplicates) == (2, 1)
+    assert await storage.get_target("old", consistent=True) == ("https://example.com/3", None, None)
+
+
+async def test_import_fail_keeps_earlier_batches_and_notifies(postgres_db: Database, tmp_path: Path) -> None:
+    """Test that an import aborted on a duplicate keeps committed batches and still tells workers to reset."""
+    storage = PostgresStorage(postgres_db)
+    await storage.create("taken", "https://example.com/taken")
+    path = _write_links(
+        tmp_path / "links.csv",
+        [("a", "https://example.com/a"), ("b", "https://example.com/b"), ("taken", "https://example.com/c")],
+    )
+    postgres_db.settings.notify_enabled = True
+
+    async with await psycopg.AsyncConnection.connect(postgres_db.settings.postgres_dsn, autocommit=True) as listener:
+        await listener.execute(f"LISTEN {CHANGE_CHANNEL}")
+        with pytest.raises(ImportFailed):
+            await import_file(postgres_db, path, "csv", policy="fail", batch_size=2)
+        payloads = [notify.payload async for notify in listener.notifies(timeout=5.0, stop_after=1)]
+
+    assert payloads == [f"{postgres_db.instance_id}:reset:"]
+    rows = await postgres_db.execute_all("SELECT url_key FROM short_urls ORDER BY url_key")
+    assert [row[0] for row in rows] == ["a", "b", "taken"]
+
+
+async def test_record_hits_upserts_totals_and_minute_buckets(postgres_db: Database) -> None:
+    """Test that flushed hits are added to the totals and the current minute bucket, skipping deleted keys."""
+    storage = PostgresStorage(postgres_db)
+    await storage.create("abc", "https://example.com/abc")
+
+    await record_hits({"abc": 2, "deleted": 5}, postgres_db)
+    await record_hits({"abc": 3}, postgres_db)
+
+    total, buckets = await get_url_stats("abc", postgres_db, resolution="minute")
+    assert total == 5
+    assert [hits for _, hits in buckets] in ([5], [2, 3])
+    rows = await postgres_db.execute_all("SELECT url_key FROM url_hit_buckets UNION SELECT url_key FROM url_hits")
+    assert rows == [("abc",)]
+
+
+async def test_rollup_moves_old_buckets_to_coarser_resolutions(postgres_db: Database) -> None:
+    """Test that old minute buckets become hour buckets and old hour buckets day buckets, keeping the totals."""
+    storage = PostgresStorage(postgres_db)
+    await storage.create("abc", "https://example.com/abc")
+    await postgres_db.execute(
+        "INSERT INTO url_hit_buckets (url_key, resolution, bucket_start, hits) VALUES "
+        "('abc', 'minute', date_trunc('hour', LOCALTIMESTAMP) - interval '3 hours' + interval '5 minutes', 1), "
+        "('abc', 'minute', date_trunc('hour', LOCALTIMESTAMP) - interval '3 hours' + interval '10 minutes', 2), "
+        "('abc', 'minute', date_trunc('minute', LOCALTIMESTAMP), 4), "
+        "('abc', 'hour', date_trunc('day', LOCALTIMESTAMP) - interval '100 days' + interval '1 hour', 8), "
+        "('abc', 'hour', date_trunc('day', LOCALTIMESTAMP) - interval '100 days' + interval '2 hours', 16)"
+    )
+
+    assert await rollup_hit_buckets(postgres_db, timedelta(hours=1), timedelta(days=90)) == 4
+    assert await rollup_hit_buckets(postgres_db, timedelta(hours=1), timedelta(days=90)) == 0
+
+    rows = await postgres_db.execute_all(
+        "SELECT resolution, sum(hits)::bigint FROM url_hit_buckets GROUP BY resolution ORDER BY resolution"
+    )
+    assert rows == [("day", 24), ("hour", 3), ("minute", 4)]
+    _, buckets = await get_url_stats("abc", postgres_db, resolution="day", since=datetime(2000, 1, 1))
+    assert sum(hits for _, hits in buckets) == 31
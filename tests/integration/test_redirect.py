@@ -1,5 +1,13 @@
+import pytest
 from starlette.testclient import TestClient
 
+from shortener.app import app, exception_handlers
+from shortener.cache import UrlCache
+from shortener.fastpath import RedirectFastPath
+from shortener.redirects import RedirectPolicy
+from shortener.stale import StaleCache
+from shortener.storage import MemoryStorage, StorageError
+
 
 def test_redirect_url(test_client: TestClient) -> None:
     """Test that the redirect endpoint redirects to the correct URL."""
@@ -16,3 +24,78 @@ def test_redirect_not_found(test_client: TestClient) -> None:
     # This is the expected behavior with the current implementation
     response = test_client.get("/nonexistent", follow_redirects=False)
     assert response.status_code == 307
+
+
+@pytest.mark.parametrize("fast_path", [False, True])
+def test_redirect_policy(test_client: TestClient, monkeypatch, fast_path: bool) -> None:
+    """Test the redirect status and Cache-Control header of links with and without their own status."""
+    storage = MemoryStorage()
+    monkeypatch.setattr(app.state, "storage", storage)
+    monkeypatch.setattr(app.state, "url_cache", UrlCache(), raising=False)
+    monkeypatch.setattr(
+        app.state, "redirect_policy", RedirectPolicy(status=302, max_age=60, stale_while_revalidate=30), raising=False
+    )
+    client = TestClient(RedirectFastPath(app, exception_handlers)) if fast_path else test_client
+    test_client.post("/urls/", json={"short_url": "temp", "target_url": "https://example.com/temp"})
+    test_client.post(
+        "/urls/", json={"short_url": "perm", "target_url": "https://example.com/perm", "redirect_status": 308}
+    )
+
+    for _ in range(2):
+        response = client.get("/temp", follow_redirects=False)
+        assert response.status_code == 302
+        assert response.headers["cache-control"] == "public, max-age=60, stale-while-revalidate=30"
+        response = client.get("/perm", follow_redirects=False)
+        assert response.status_code == 308
+        assert response.headers["cache-control"] == "public, max-age=86400, stale-while-revalidate=30"
+
+    response = test_client.put("/urls/perm", json={"target_url": "https://example.com/moved"})
+    assert response.json()["previous_max_age"] == 86430
+    response = client.get("/perm", follow_redirects=False)
+    assert response.status_code == 302
+    assert response.headers["location"] == "https://example.com/moved"
+
+
+def test_redirect_status_validation(test_client: TestClient) -> None:
+    """Test that only redirect status codes are accepted per link."""
+    for redirect_status in (200, 303, "301"):
+        response = test_client.post(
+            "/urls/",
+            json={"short_url": "bad", "target_url": "https://example.com", "redirect_status": redirect_status},
+        )
+        assert response.status_code == 400
+
+
+class FlakyStorage(MemoryStorage):
+    """Memory storage whose lookups fail while down is set."""
+
+    down = False
+
+    async def get_target(self, url_key: str, consistent: bool = False):
+        if self.down:
+            raise StorageError("storage is down")
+        return await super().get_target(url_key, consistent)
+
+
+@pytest.mark.parametrize("fast_path", [False, True])
+def test_stale_redirect_while_storage_down(test_client: TestClient, monkeypatch, fast_path: bool) -> None:
+    """Test that links read before an outage keep redirecting, marked stale and uncacheable."""
+    storage = FlakyStorage()
+    monkeypatch.setattr(app.state, "storage", storage)
+    monkeypatch.setattr(app.state, "url_cache", None, raising=False)
+    monkeypatch.setattr(app.state, "stale_cache", StaleCache(), raising=False)
+    client = TestClient(RedirectFastPath(app, exception_handlers)) if fast_path else test_client
+    for key in ("kept", "moved", "unread"):
+        test_client.post("/urls/", json={"short_url": key, "target_url": f"https://example.com/{key}"})
+    assert client.get("/kept", follow_redirects=False).headers.get("x-served-stale") is None
+    client.get("/moved", follow_redirects=False)
+    test_client.put("/urls/moved", json={"target_url": "https://example.com/elsewhere"})
+
+    storage.down = True
+    response = client.get("/kept", follow_redirects=False)
+    assert response.status_code == 307
+    assert response.headers["location"] == "https://example.com/kept"
+    assert response.headers["x-served-stale"] == "true"
+    assert response.headers["cache-control"] == "no-store"
+    assert client.get("/moved", follow_redirects=False).json()["detail"] == "Database unavailable"
+    assert client.get("/unread", follow_redirects=False).json()["detail"] == "Database unavailable"
@@ -0,0 +1,46 @@
+from datetime import datetime
+
+import pytest
+from starlette.testclient import TestClient
+
+from shortener import views
+from shortener.actions import UrlNotFoundException
+
+
+def test_stats_returns_buckets(test_client: TestClient, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that stats are returned with ISO bucket starts."""
+
+    async def fake_get_url_stats(short_url, db, resolution="hour", since=None, until=None):
+        assert (short_url, resolution) == ("abc", "minute")
+        assert since == datetime(2024, 1, 1, 10, 0)
+        assert until is None
+        return 7, [(datetime(2024, 1, 1, 10, 0), 3), (datetime(2024, 1, 1, 10, 1), 4)]
+
+    monkeypatch.setattr(views, "get_url_stats", fake_get_url_stats)
+    response = test_client.get("/urls/abc/stats?resolution=minute&since=2024-01-01T10:00:00")
+
+    assert response.status_code == 200
+    assert response.json() == {
+        "short_url": "abc",
+        "resolution": "minute",
+        "total": 7,
+        "buckets": [{"start": "2024-01-01T10:00:00", "hits": 3}, {"start": "2024-01-01T10:01:00", "hits": 4}],
+    }
+
+
+@pytest.mark.parametrize("query", ["resolution=week", "since=yesterday", "until=2024-13-01"])
+def test_stats_rejects_invalid_range(test_client: TestClient, query: str) -> None:
+    """Test that unknown resolutions and malformed timestamps are rejected."""
+    response = test_client.get(f"/urls/abc/stats?{query}")
+    assert response.status_code == 400
+
+
+def test_stats_unknown_url(test_client: TestClient, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that stats of a missing URL return 404."""
+
+    async def fake_get_url_stats(short_url, db, resolution="hour", since=None, until=None):
+        raise UrlNotFoundException(detail=f"URL with key '{short_url}' not found")
+
+    monkeypatch.setattr(views, "get_url_stats", fake_get_url_stats)
+    response = test_client.get("/urls/missing/stats")
+    assert response.status_code == 404
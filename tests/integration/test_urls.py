@@ -45,3 +45,29 @@ def test_delete_url(test_client: TestClient, short_url: str, target: str) -> Non
     # The mock is configured to return a successful response
     response = test_client.delete(f"/urls/{short_url}")
     assert response.status_code == 204
+
+
+def test_create_url_with_expiry(test_client: TestClient) -> None:
+    """Test creating a URL that expires, with a timestamp taken as UTC."""
+    request_body = {"short_url": "test11", "target_url": "https://example.com/target", "expires_at": "2100-01-01T00:00"}
+
+    response = test_client.post("/urls/", json=request_body)
+    assert response.status_code == 201
+    assert response.json()["expires_at"] == "2100-01-01T00:00:00+00:00"
+
+
+@pytest.mark.parametrize("expires_at", ["2000-01-01T00:00:00Z", "tomorrow", 1234])
+def test_create_url_rejects_bad_expiry(test_client: TestClient, expires_at: object) -> None:
+    """Test that past or malformed expiry times are rejected."""
+    request_body = {"short_url": "test12", "target_url": "https://example.com/target", "expires_at": expires_at}
+
+    response = test_client.post("/urls/", json=request_body)
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize("short_url", ["export", "bulk", "status"])
+def test_create_url_rejects_reserved_key(test_client: TestClient, short_url: str) -> None:
+    """Test that keys shadowed by other routes cannot be created."""
+    response = test_client.post("/urls/", json={"short_url": short_url, "target_url": "https://example.com/target"})
+    assert response.status_code == 400
+    assert response.json()["detail"] == f"URL key is reserved: {short_url}"
@@ -0,0 +1,101 @@
+import time
+
+import pytest
+from starlette.testclient import TestClient
+
+from shortener.app import app
+from shortener.breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+from shortener.database import Database
+from shortener.settings import PostgresSettings
+from shortener.storage import MemoryStorage, PostgresStorage
+
+
+def test_opens_after_consecutive_failures() -> None:
+    """Test that only failure_threshold failures in a row open the breaker."""
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=10.0)
+
+    breaker.record_failure(now=0.0)
+    breaker.record_failure(now=0.0)
+    breaker.record_success()
+    breaker.record_failure(now=0.0)
+    breaker.record_failure(now=0.0)
+    assert breaker.state == CLOSED
+    assert breaker.allow(now=0.0)
+
+    breaker.record_failure(now=1.0)
+    assert breaker.state == OPEN
+    assert not breaker.allow(now=5.0)
+    assert breaker.stats() == {"state": OPEN, "failures": 3, "rejected": 1, "opened": 1}
+
+
+def test_half_open_probe() -> None:
+    """Test that one probe is let through after reset_timeout and decides the next state."""
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10.0)
+    breaker.record_failure(now=0.0)
+
+    assert breaker.allow(now=10.0)
+    assert breaker.state == HALF_OPEN
+    assert not breaker.allow(now=10.5)
+
+    breaker.record_failure(now=11.0)
+    assert breaker.state == OPEN
+    assert not breaker.allow(now=20.0)
+
+    # A probe that never reports back is replaced after another reset_timeout
+    assert breaker.allow(now=21.0)
+    assert not breaker.allow(now=30.0)
+    assert breaker.allow(now=31.0)
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    assert breaker.allow(now=31.0)
+
+
+def test_zero_threshold_never_opens() -> None:
+    """Test that a failure_threshold of 0 disables the breaker."""
+    breaker = CircuitBreaker(failure_threshold=0)
+    for _ in range(100):
+        breaker.record_failure()
+    assert breaker.state == CLOSED
+
+
+def test_status_reports_breaker_state(test_client: TestClient, monkeypatch) -> None:
+    """Test that /status includes the state of the database circuit breaker."""
+    db = Database(PostgresSettings(breaker_failure_threshold=1))
+    monkeypatch.setattr(app.state, "db", db)
+    monkeypatch.setattr(app.state, "storage", MemoryStorage())
+
+    assert test_client.get("/status").json() == {"db_up": "true", "ready": "true", "breaker": CLOSED}
+    db.breaker.record_failure()
+    assert test_client.get("/status").json()["breaker"] == OPEN
+
+
+async def test_open_breaker_fails_without_checkout() -> None:
+    """Test that queries fail fast with an OperationalError while the breaker is open."""
+    db = Database(PostgresSettings(breaker_failure_threshold=2))
+
+    class DownPool:
+        checkouts = 0
+
+        def connection(self):
+            DownPool.checkouts += 1
+            raise AssertionError("unreachable")
+
+    db.pool = DownPool()  # type: ignore[assignment]
+    db.breaker.record_failure()
+    db.breaker.record_failure()
+
+    with pytest.raises(CircuitOpenError):
+        await db.execute_one("SELECT 1")
+    assert DownPool.checkouts == 0
+
+
+async def test_ping_fails_while_breaker_open() -> None:
+    """Test that a recent successful query does not report the database up once the breaker opened."""
+    db = Database(PostgresSettings(breaker_failure_threshold=1))
+    db.pool = object()  # type: ignore[assignment]
+    db._last_success = time.monotonic()
+    assert await PostgresStorage(db).ping()
+
+    db.breaker.record_failure()
+    with pytest.raises(CircuitOpenError):
+        await PostgresStorage(db).ping()
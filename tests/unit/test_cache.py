@@ -0,0 +1,148 @@
+import asyncio
+import time
+from types import SimpleNamespace
+from typing import Generator
+
+import pytest
+from starlette.testclient import TestClient
+
+from shortener import app as app_module
+from shortener.actions import get_redirect, warm_url_cache
+from shortener.cache import UrlCache
+from shortener.settings import AppSettings
+from shortener.storage import MemoryStorage
+
+
+@pytest.fixture
+def cached_client(test_client: TestClient) -> Generator[TestClient, None, None]:
+    """Test client with a redirect cache installed in app state."""
+    test_client.app.state.url_cache = UrlCache(max_size=10, ttl=60)  # type: ignore[attr-defined]
+    yield test_client
+    del test_client.app.state.url_cache  # type: ignore[attr-defined]
+
+
+def test_cache_hit_and_miss() -> None:
+    """Test that hits and misses are counted."""
+    cache = UrlCache(max_size=10, ttl=60)
+    assert cache.get("abc") is None
+    cache.set("abc", "https://example.com")
+    assert cache.get("abc") == "https://example.com"
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_cache_evicts_least_recently_used() -> None:
+    """Test that the oldest untouched entry is evicted when full."""
+    cache = UrlCache(max_size=2, ttl=60)
+    cache.set("a", "https://example.com/a")
+    cache.set("b", "https://example.com/b")
+    cache.get("a")
+    cache.set("c", "https://example.com/c")
+    assert cache.get("b") is None
+    assert cache.get("a") == "https://example.com/a"
+    assert len(cache) == 2
+
+
+def test_cache_expires_entries() -> None:
+    """Test that entries older than the TTL are treated as missing."""
+    cache = UrlCache(max_size=10, ttl=0.01)
+    cache.set("abc", "https://example.com")
+    time.sleep(0.02)
+    assert cache.get("abc") is None
+
+
+async def test_recently_invalidated_keys_read_from_primary() -> None:
+    """Test that a key is read from the primary, not a replica, for a while after it is invalidated."""
+    storage = MemoryStorage()
+    await storage.create("abc", "https://example.com/new")
+    reads: list[bool] = []
+    get_target = storage.get_target
+
+    async def record_get_target(url_key: str, consistent: bool = False):
+        reads.append(consistent)
+        return await get_target(url_key, consistent=consistent)
+
+    storage.get_target = record_get_target  # type: ignore[method-assign]
+    cache = UrlCache(max_size=10, ttl=60, invalidation_window=0.05)
+
+    await get_redirect("abc", storage, cache=cache)
+    cache.invalidate("abc")
+    assert cache.recently_invalidated("abc")
+    await get_redirect("abc", storage, cache=cache)
+    time.sleep(0.06)
+    cache.invalidate("other")
+    assert not cache.recently_invalidated("abc")
+    cache.clear()
+    assert cache.recently_invalidated("abc")
+
+    assert reads == [False, True]
+    assert cache.get("abc") is None
+
+
+def test_redirect_served_from_cache(cached_client: TestClient) -> None:
+    """Test that repeated redirects only query the database once."""
+    db = cached_client.app.state.db  # type: ignore[attr-defined]
+    for _ in range(3):
+        response = cached_client.get("/hotkey", follow_redirects=False)
+        assert response.status_code == 307
+    assert db.execute_one.await_count == 1
+
+
+def test_update_invalidates_cache(cached_client: TestClient) -> None:
+    """Test that updating a URL drops its cached target."""
+    cache = cached_client.app.state.url_cache  # type: ignore[attr-defined]
+    cache.set("hotkey", "https://example.com/old")
+    response = cached_client.put("/urls/hotkey", json={"target_url": "https://example.com/new"})
+    assert response.status_code == 200
+    assert cache.get("hotkey") is None
+
+
+async def test_warm_up_loads_existing_keys() -> None:
+    """Test that warm-up caches the targets of the hot keys that exist."""
+    storage = MemoryStorage()
+    await storage.bulk_create([(f"k{i}", f"https://example.com/{i}") for i in range(5)])
+    cache = UrlCache(max_size=10, ttl=60)
+
+    loaded = await warm_url_cache(["k0", "k1", "gone", "k3"], storage, cache, batch_size=2)
+
+    assert loaded == 3
+    assert cache.hot_keys(3) == ["k0", "k1", "k3"]
+    assert cache.get("k3") == "https://example.com/3"
+    assert cache.get("gone") is None
+    assert await warm_url_cache(["k4"], storage, cache, budget=0) == 0
+
+
+def test_hot_keys_most_recent_first() -> None:
+    """Test that the keys saved for the next warm-up start with the most recently used."""
+    cache = UrlCache(max_size=10, ttl=60)
+    for key in ("a", "b", "c"):
+        cache.set(key, f"https://example.com/{key}")
+    cache.get("a")
+
+    assert cache.hot_keys(2) == ["a", "c"]
+
+
+async def test_warm_up_budget_covers_hot_key_query(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that a hot-key query outlasting the warm-up budget does not delay readiness."""
+
+    async def slow_get_hot_keys(db, limit, window):
+        await asyncio.sleep(60)
+        return ["never"]
+
+    monkeypatch.setattr(app_module, "get_hot_keys", slow_get_hot_keys)
+    app = SimpleNamespace(
+        state=SimpleNamespace(
+            settings=AppSettings(cache_warmup_budget=0.05),
+            url_cache=UrlCache(max_size=10, ttl=60),
+            db=object(),
+            storage=MemoryStorage(),
+            ready=False,
+        )
+    )
+
+    start = time.monotonic()
+    await app_module.warm_up(app)  # type: ignore[arg-type]
+
+    assert app.state.ready
+    assert time.monotonic() - start < 1
+    assert len(app.state.url_cache) == 0
@@ -0,0 +1,133 @@
+import contextlib
+import time
+
+import psycopg
+import pytest
+
+from shortener.actions import check_db_up
+from shortener.database import Database
+from shortener.settings import PostgresSettings
+from shortener.storage import PostgresStorage
+
+
+def test_prepare_threshold_from_env(monkeypatch) -> None:
+    """Test that a negative threshold disables prepared statements."""
+    monkeypatch.setenv("DB_PREPARE_THRESHOLD", "-1")
+    assert PostgresSettings().prepare_threshold is None
+    monkeypatch.setenv("DB_PREPARE_THRESHOLD", "3")
+    assert PostgresSettings().prepare_threshold == 3
+
+
+async def test_configure_sets_prepare_threshold() -> None:
+    """Test that new pooled connections prepare statements on first use."""
+
+    class FakeConnection:
+        prepare_threshold: int | None = 5
+        prepared_max: int = 100
+
+    db = Database(PostgresSettings())
+    conn = FakeConnection()
+    await db._configure_connection(conn)  # type: ignore[arg-type]
+    assert conn.prepare_threshold == 0
+
+
+async def test_health_check_skipped_after_recent_query() -> None:
+    """Test that /status does not query the database right after a successful query."""
+    db = Database(PostgresSettings())
+    assert not db.recently_healthy()
+    db._last_success = time.monotonic()
+    assert await check_db_up(PostgresStorage(db))
+
+
+class FakePool:
+    """Connection pool stand-in that records which pool served a query."""
+
+    def __init__(self, name: str, log: list[str], fail: bool = False, busy: int = 0) -> None:
+        self.name = name
+        self.log = log
+        self.fail = fail
+        self.busy = busy
+
+    @contextlib.asynccontextmanager
+    async def connection(self):
+        if self.fail:
+            raise psycopg.OperationalError(f"{self.name} is down")
+        self.log.append(self.name)
+        yield FakeConnection()
+
+    def get_stats(self) -> dict[str, int]:
+        return {"pool_size": self.busy, "pool_available": 0, "requests_waiting": 0}
+
+
+class FakeConnection:
+    async def execute(self, query, params=None):
+        class Result:
+            async def fetchone(self):
+                return ("row",)
+
+        return Result()
+
+
+def _replicated_database(log: list[str], selection: str = "round_robin", **replicas: dict) -> Database:
+    db = Database(PostgresSettings(replica_dsns=list(replicas), replica_selection=selection))
+    db.pool = FakePool("primary", log)  # type: ignore[assignment]
+    db.replica_pools = [FakePool(name, log, **options) for name, options in replicas.items()]  # type: ignore[misc]
+    db._replica_down_until = [0.0] * len(replicas)
+    return db
+
+
+async def test_replica_reads_round_robin(monkeypatch) -> None:
+    """Test that replica reads alternate between replicas and writes stay on the primary."""
+    monkeypatch.delenv("DB_REPLICA_DSNS", raising=False)
+    log: list[str] = []
+    db = _replicated_database(log, r1={}, r2={})
+
+    for _ in range(4):
+        await db.execute_one("SELECT 1", replica=True)
+    await db.execute_one("SELECT 1")
+
+    assert log == ["r2", "r1", "r2", "r1", "primary"]
+
+
+async def test_replica_reads_least_busy(monkeypatch) -> None:
+    """Test that least_busy picks the replica with the fewest connections in use."""
+    monkeypatch.delenv("DB_REPLICA_SELECTION", raising=False)
+    log: list[str] = []
+    db = _replicated_database(log, "least_busy", r1={"busy": 3}, r2={"busy": 1})
+
+    await db.execute_one("SELECT 1", replica=True)
+
+    assert log == ["r2"]
+
+
+async def test_unreachable_replica_falls_back_to_primary() -> None:
+    """Test that a failing replica is skipped and the read retried on the primary."""
+    log: list[str] = []
+    db = _replicated_database(log, r1={"fail": True})
+
+    assert await db.execute_one("SELECT 1", replica=True) == ("row",)
+    await db.execute_one("SELECT 1", replica=True)
+
+    assert log == ["primary", "primary"]
+    assert db.replica_stats()[0]["healthy"] is False
+
+
+async def test_connection_failures_open_breaker() -> None:
+    """Test that failed checkouts from the primary open the breaker and errors the database raises do not."""
+    log: list[str] = []
+    db = Database(PostgresSettings(breaker_failure_threshold=2))
+    db.pool = FakePool("primary", log, fail=True)  # type: ignore[assignment]
+
+    for _ in range(2):
+        with pytest.raises(psycopg.OperationalError):
+            await db.execute_one("SELECT 1")
+    assert db.breaker.state == "open"
+
+    db.breaker.record_success()
+    db.pool.fail = False  # type: ignore[union-attr]
+    for _ in range(3):
+        with pytest.raises(psycopg.errors.UniqueViolation):
+            async with db.get_connection():
+                raise psycopg.errors.UniqueViolation("duplicate key")
+    assert db.breaker.state == "closed"
+    assert log == ["primary"] * 3
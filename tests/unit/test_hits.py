@@ -0,0 +1,107 @@
+import asyncio
+from typing import Generator
+
+import pytest
+from starlette.testclient import TestClient
+
+from shortener.hits import HitCounter
+
+
+@pytest.fixture
+def counted_client(test_client: TestClient) -> Generator[TestClient, None, None]:
+    """Test client with a hit counter that is never flushed."""
+
+    async def no_flush(counts: dict[str, int]) -> None:
+        pass
+
+    test_client.app.state.hit_counter = HitCounter(no_flush)  # type: ignore[attr-defined]
+    yield test_client
+    del test_client.app.state.hit_counter  # type: ignore[attr-defined]
+
+
+async def test_flush_aggregates_hits() -> None:
+    """Test that repeated hits are flushed as one delta per key."""
+    batches: list[dict[str, int]] = []
+
+    async def flush(counts: dict[str, int]) -> None:
+        batches.append(counts)
+
+    counter = HitCounter(flush)
+    for key in ["a", "b", "a", "a"]:
+        counter.record(key)
+    await counter.flush()
+
+    assert batches == [{"a": 3, "b": 1}]
+    assert counter.pending == 0
+    assert counter.flushed == 4
+
+
+async def test_failed_flush_keeps_hits() -> None:
+    """Test that hits from a failed flush are retried with the next batch."""
+    batches: list[dict[str, int]] = []
+
+    async def flaky_flush(counts: dict[str, int]) -> None:
+        if not batches:
+            batches.append({})
+            raise ConnectionError("database down")
+        batches.append(counts)
+
+    counter = HitCounter(flaky_flush)
+    counter.record("a")
+    await counter.flush()
+    counter.record("a")
+    await counter.flush()
+
+    assert batches[-1] == {"a": 2}
+
+
+async def test_run_flushes_on_threshold_and_cancel() -> None:
+    """Test that the background task flushes early at the threshold and on shutdown."""
+    batches: list[dict[str, int]] = []
+
+    async def flush(counts: dict[str, int]) -> None:
+        batches.append(counts)
+
+    counter = HitCounter(flush, flush_interval=60, flush_threshold=2)
+    task = asyncio.create_task(counter.run())
+    counter.record("a")
+    counter.record("b")
+    await asyncio.sleep(0.01)
+    assert batches == [{"a": 1, "b": 1}]
+
+    counter.record("c")
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    assert batches[-1] == {"c": 1}
+
+
+def test_redirect_records_hit(counted_client: TestClient) -> None:
+    """Test that a redirect counts a hit without writing to the database."""
+    db = counted_client.app.state.db  # type: ignore[attr-defined]
+    counted_client.get("/popular", follow_redirects=False)
+    counted_client.get("/popular", follow_redirects=False)
+    assert counted_client.app.state.hit_counter.pending == 2  # type: ignore[attr-defined]
+    assert db.execute.await_count == 0
+
+
+async def test_outage_backs_off_and_caps_keys() -> None:
+    """Test that failed flushes back off, stop early wake-ups and keep at most max_keys keys."""
+
+    async def failing_flush(counts: dict[str, int]) -> None:
+        raise ConnectionError("database down")
+
+    counter = HitCounter(failing_flush, flush_interval=1.0, flush_threshold=1, max_keys=2, max_retry_interval=5.0)
+    counter.record("a")
+    await counter.flush()
+    await counter.flush()
+    assert counter.retry_delay() == 4.0
+    await counter.flush()
+    assert counter.retry_delay() == 5.0
+
+    counter._wakeup.clear()
+    counter.record("b")
+    counter.record("c")
+    counter.record("a")
+    assert not counter._wakeup.is_set()
+    assert counter.stats() == {"pending": 3, "flushed": 0, "dropped": 1}
@@ -0,0 +1,75 @@
+import contextlib
+from pathlib import Path
+from unittest.mock import AsyncMock
+
+import pytest
+
+from shortener import importer
+from shortener.database import Database
+from shortener.importer import ImportFailed, import_file, read_rows, validate_row
+from shortener.settings import AppSettings
+
+
+def test_read_rows_csv(tmp_path: Path) -> None:
+    """Test that CSV rows are read with their line numbers."""
+    path = tmp_path / "links.csv"
+    path.write_text("short_url,target_url\nabc,https://example.com/a\ndef,https://example.com/d\n")
+    rows = list(read_rows(str(path), "csv"))
+    assert rows[0] == (2, {"short_url": "abc", "target_url": "https://example.com/a"})
+    assert len(rows) == 2
+
+
+def test_read_rows_ndjson(tmp_path: Path) -> None:
+    """Test that NDJSON rows are read and malformed lines become empty rows."""
+    path = tmp_path / "links.ndjson"
+    path.write_text('{"short_url": "abc", "target_url": "https://example.com"}\n\nnot json\n')
+    rows = list(read_rows(str(path), "ndjson"))
+    assert rows == [(1, {"short_url": "abc", "target_url": "https://example.com"}), (3, {})]
+
+
+def test_validate_row_uses_api_rules() -> None:
+    """Test that rows are validated like POST /urls/ bodies."""
+    settings = AppSettings()
+    assert validate_row({"short_url": "abc", "target_url": "https://example.com"}, settings) == (
+        "abc",
+        "https://example.com",
+        None,
+    )
+    assert validate_row({"short_url": "bad key", "target_url": "https://example.com"}, settings) is None
+    assert validate_row({"short_url": "abc", "target_url": "example.com"}, settings) is None
+    assert validate_row({}, settings) is None
+
+
+def test_validate_row_keeps_created_at() -> None:
+    """Test that created_at from an export file is preserved."""
+    row = {"short_url": "abc", "target_url": "https://example.com", "created_at": "2024-05-01T12:00:00"}
+    assert validate_row(row, AppSettings())[2].year == 2024  # type: ignore[index]
+
+
+async def test_aborted_import_still_resets_workers(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that workers are told to reset when the fail policy aborts after a committed batch."""
+    path = tmp_path / "links.csv"
+    path.write_text("short_url,target_url\n" + "".join(f"k{i},https://example.com/{i}\n" for i in range(3)))
+    batches: list[list] = []
+
+    async def fake_import_batch(conn, rows, policy):
+        if batches:
+            raise ImportFailed("Key (url_key)=(k2) already exists.")
+        batches.append(list(rows))
+        return len(rows)
+
+    monkeypatch.setattr(importer, "import_batch", fake_import_batch)
+    db = AsyncMock(spec=Database)
+    conn = AsyncMock()
+
+    @contextlib.asynccontextmanager
+    async def get_connection(replica: bool = False):
+        yield conn
+
+    db.get_connection.side_effect = get_connection
+
+    with pytest.raises(ImportFailed):
+        await import_file(db, str(path), "csv", policy="fail", batch_size=2)
+    assert len(batches[0]) == 2
+    db.publish_change.assert_awaited_once_with(conn, "reset", "")
+    conn.set_autocommit.assert_awaited_with(False)
@@ -0,0 +1,62 @@
+from typing import Generator
+
+import pytest
+from starlette.testclient import TestClient
+
+from shortener.keyfilter import KeyFilter
+
+
+@pytest.fixture
+def filtered_client(test_client: TestClient) -> Generator[TestClient, None, None]:
+    """Test client with a key filter that only knows about 'known'."""
+    key_filter = KeyFilter(capacity=100)
+    key_filter.add("known")
+    test_client.app.state.key_filter = key_filter  # type: ignore[attr-defined]
+    yield test_client
+    del test_client.app.state.key_filter  # type: ignore[attr-defined]
+
+
+def test_filter_has_no_false_negatives() -> None:
+    """Test that every added key is reported as present."""
+    key_filter = KeyFilter(capacity=1000, error_rate=0.01)
+    keys = [f"key{i}" for i in range(1000)]
+    for key in keys:
+        key_filter.add(key)
+    assert all(key in key_filter for key in keys)
+
+
+def test_filter_false_positive_rate_near_target() -> None:
+    """Test that the observed false-positive rate stays close to the target."""
+    key_filter = KeyFilter(capacity=1000, error_rate=0.01)
+    for i in range(1000):
+        key_filter.add(f"key{i}")
+    false_positives = sum(f"missing{i}" in key_filter for i in range(10000))
+    assert false_positives / 10000 < 0.03
+    assert key_filter.stats()["false_positive_rate"] < 0.02
+
+
+def test_filter_remove() -> None:
+    """Test that a removed key is no longer reported as present."""
+    key_filter = KeyFilter(capacity=100)
+    key_filter.add("abc")
+    key_filter.remove("abc")
+    assert "abc" not in key_filter
+    assert key_filter.count == 0
+
+
+def test_unknown_key_skips_database(filtered_client: TestClient) -> None:
+    """Test that keys rejected by the filter return 404 without a query."""
+    db = filtered_client.app.state.db  # type: ignore[attr-defined]
+    response = filtered_client.get("/unknown", follow_redirects=False)
+    assert response.status_code == 404
+    assert db.execute_one.await_count == 0
+
+    response = filtered_client.get("/known", follow_redirects=False)
+    assert response.status_code == 307
+
+
+def test_create_adds_key_to_filter(filtered_client: TestClient) -> None:
+    """Test that newly created keys are immediately resolvable."""
+    response = filtered_client.post("/urls/", json={"short_url": "fresh", "target_url": "https://example.com"})
+    assert response.status_code == 201
+    assert "fresh" in filtered_client.app.state.key_filter  # type: ignore[attr-defined]
@@ -0,0 +1,81 @@
+import asyncio
+
+import pytest
+from starlette.testclient import TestClient
+
+from shortener.keygen import KeyAllocator, encode_base62
+from shortener.views import validate_key
+
+
+class FakeSequenceDatabase:
+    """Database stand-in whose key sequence hands out blocks of 3 ids."""
+
+    def __init__(self) -> None:
+        self.value = 0
+
+    async def execute_one(self, query: str, *args) -> tuple:
+        self.value += 3
+        return (self.value, 3)
+
+
+@pytest.mark.parametrize("number,key", [(0, "0"), (61, "z"), (62, "10"), (62**2 - 1, "zz")])
+def test_encode_base62(number: int, key: str) -> None:
+    """Test base62 encoding of block ids."""
+    assert encode_base62(number) == key
+    assert validate_key(key)
+
+
+async def test_allocator_reserves_blocks() -> None:
+    """Test that ids are handed out from memory until the block is used up."""
+    db = FakeSequenceDatabase()
+    allocator = KeyAllocator(db)  # type: ignore[arg-type]
+
+    ids = [await allocator.next_id() for _ in range(5)]
+
+    assert ids == [3, 4, 5, 6, 7]
+    assert allocator.blocks_reserved == 2
+    assert allocator.remaining == 1
+
+
+async def test_allocator_skips_reserved_keys() -> None:
+    """Test that ids whose key is reserved are never handed out as keys."""
+    allocator = KeyAllocator(FakeSequenceDatabase(), reserved_keys=frozenset({"4"}))  # type: ignore[arg-type]
+
+    assert [await allocator.next_key() for _ in range(3)] == ["3", "5", "6"]
+
+
+async def test_concurrent_allocation_is_unique() -> None:
+    """Test that concurrent requests never get the same key."""
+    allocator = KeyAllocator(FakeSequenceDatabase())  # type: ignore[arg-type]
+
+    keys = await asyncio.gather(*(allocator.next_key() for _ in range(20)))
+
+    assert len(set(keys)) == 20
+
+
+def test_create_url_generates_key(test_client: TestClient) -> None:
+    """Test that POST /urls/ without short_url returns a generated key."""
+    test_client.app.state.key_allocator = KeyAllocator(FakeSequenceDatabase())  # type: ignore[arg-type,attr-defined]
+    try:
+        response = test_client.post("/urls/", json={"target_url": "https://example.com/target"})
+    finally:
+        del test_client.app.state.key_allocator  # type: ignore[attr-defined]
+
+    assert response.status_code == 201
+    assert response.json() == {"short_url": "3", "target_url": "https://example.com/target"}
+
+
+def test_missing_sequence_is_database_unavailable(test_client: TestClient) -> None:
+    """Test that a key sequence that cannot be read gives the database-unavailable error, not a crash."""
+
+    class NoSequenceDatabase:
+        async def execute_one(self, query: str, *args) -> None:
+            return None
+
+    test_client.app.state.key_allocator = KeyAllocator(NoSequenceDatabase())  # type: ignore[arg-type,attr-defined]
+    try:
+        response = test_client.post("/urls/", json={"target_url": "https://example.com/target"})
+    finally:
+        del test_client.app.state.key_allocator  # type: ignore[attr-defined]
+
+    assert response.json()["detail"] == "Database unavailable"
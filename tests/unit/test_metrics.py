@@ -0,0 +1,88 @@
+from typing import Generator
+
+import pytest
+from starlette.testclient import TestClient
+
+from shortener.app import app, exception_handlers
+from shortener.fastpath import RedirectFastPath
+from shortener.keyfilter import KeyFilter
+from shortener.metrics import METRICS, Histogram
+
+
+@pytest.fixture(autouse=True)
+def clean_metrics() -> Generator[None, None, None]:
+    """Start every test with an empty registry."""
+    METRICS.reset()
+    yield
+    METRICS.reset()
+
+
+def test_histogram_renders_cumulative_buckets() -> None:
+    """Test that bucket counts are cumulative and end with +Inf."""
+    histogram = Histogram((0.1, 1.0))
+    for value in (0.05, 0.5, 0.7, 3.0):
+        histogram.observe(value)
+
+    lines = histogram.render("latency", 'route="x"')
+
+    assert lines[:3] == [
+        'latency_bucket{route="x",le="0.1"} 1',
+        'latency_bucket{route="x",le="1.0"} 3',
+        'latency_bucket{route="x",le="+Inf"} 4',
+    ]
+    assert lines[-1] == 'latency_count{route="x"} 4'
+
+
+def test_requests_recorded_per_route(test_client: TestClient) -> None:
+    """Test that requests are labelled with their endpoint name and status."""
+    test_client.get("/ping")
+    test_client.get("/urls/bad%20key")
+    test_client.get("/testredirect", follow_redirects=False)
+
+    assert set(METRICS.requests) == {("ping", 200), ("get_url", 400), ("redirect_url", 307)}
+    assert "get_url_target" in METRICS.queries
+
+
+def test_fast_path_records_redirects(test_client: TestClient) -> None:
+    """Test that redirects served by the fast path are recorded under redirect_url."""
+    fast_client = TestClient(RedirectFastPath(app, exception_handlers))
+    fast_client.get("/testredirect", follow_redirects=False)
+    response = fast_client.get("/metrics")
+
+    assert METRICS.requests[("redirect_url", 307)].count == 1
+    assert response.headers["content-type"].startswith("text/plain")
+
+
+def test_metrics_endpoint(test_client: TestClient) -> None:
+    """Test that /metrics serves histograms and pool statistics."""
+    test_client.app.state.db.pool_stats.return_value = {  # type: ignore[attr-defined]
+        "primary": {"pool_size": 5, "requests_waiting": 2, "requests_wait_ms": 1500}
+    }
+    test_client.get("/ping")
+
+    response = test_client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert 'shortener_http_request_duration_seconds_count{route="ping",status="200"} 1' in response.text
+    assert 'shortener_db_requests_waiting{pool="primary"} 2' in response.text
+    assert 'shortener_db_requests_wait_seconds_total{pool="primary"} 1.5' in response.text
+
+
+def test_metrics_report_key_filter(test_client: TestClient, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that /metrics reports the size and estimated false-positive rate of the current key filter."""
+    key_filter = KeyFilter(capacity=100)
+    key_filter.add("abc")
+    monkeypatch.setattr(test_client.app.state, "key_filter", key_filter, raising=False)  # type: ignore[attr-defined]
+
+    response = test_client.get("/metrics")
+    assert "shortener_key_filter_keys 1" in response.text
+    assert f"shortener_key_filter_memory_bytes {key_filter.memory_bytes}" in response.text
+    assert f"shortener_key_filter_false_positive_rate {key_filter.false_positive_rate}" in response.text
+
+    # A filter rebuilt after a reset replaces the old one in app state
+    rebuilt = KeyFilter(capacity=1000)
+    monkeypatch.setattr(test_client.app.state, "key_filter", rebuilt)  # type: ignore[attr-defined]
+    response = test_client.get("/metrics")
+    assert "shortener_key_filter_keys 0" in response.text
+    assert "shortener_key_filter_capacity 1000" in response.text
@@ -0,0 +1,78 @@
+import asyncio
+from types import SimpleNamespace
+
+import psycopg
+from psycopg import AsyncConnection
+from starlette.applications import Starlette
+
+from shortener.app import apply_url_change
+from shortener.cache import UrlCache
+from shortener.database import Database
+from shortener.keyfilter import KeyFilter
+from shortener.settings import PostgresSettings
+
+
+def test_notification_dispatch_ignores_own_changes() -> None:
+    """Test that a process does not react to notifications it published."""
+    db = Database(PostgresSettings())
+    received: list[tuple[str, str]] = []
+    db.add_change_callback(lambda op, url_key: received.append((op, url_key)))
+
+    db.handle_notification(f"{db.instance_id}:update:mine")
+    db.handle_notification("otherworker:update:theirs")
+
+    assert received == [("update", "theirs")]
+
+
+def test_apply_url_change_evicts_and_tracks_keys() -> None:
+    """Test that remote changes evict cached targets and update the key filter."""
+    app = Starlette()
+    app.state.url_cache = UrlCache()
+    app.state.key_filter = KeyFilter(capacity=100)
+    app.state.url_cache.set("abc", "https://example.com/old")
+
+    apply_url_change(app, "update", "abc")
+    apply_url_change(app, "create", "new")
+    apply_url_change(app, "delete", "new")
+
+    assert app.state.url_cache.get("abc") is None
+    assert "new" not in app.state.key_filter
+
+
+async def test_reset_only_after_reconnect(monkeypatch) -> None:
+    """Test that the first LISTEN dispatches no reset and a LISTEN after a lost connection does."""
+    received: list[tuple[str, str]] = []
+    connections = 0
+
+    class FakeListenConnection:
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, *exc_info):
+            return False
+
+        async def execute(self, query):
+            pass
+
+        async def notifies(self):
+            if connections == 1:
+                yield SimpleNamespace(payload="otherworker:update:abc")
+                raise psycopg.OperationalError("connection lost")
+            await asyncio.Event().wait()
+            yield
+
+    async def connect(*args, **kwargs):
+        nonlocal connections
+        connections += 1
+        return FakeListenConnection()
+
+    monkeypatch.setattr(AsyncConnection, "connect", connect)
+    db = Database(PostgresSettings(listen_retry_interval=0.0))
+    db.add_change_callback(lambda op, url_key: received.append((op, url_key)))
+    await db.start_listener()
+    for _ in range(10):
+        await asyncio.sleep(0)
+    await db.stop_listener()
+
+    assert connections == 2
+    assert received == [("update", "abc"), ("reset", "")]
@@ -0,0 +1,92 @@
+import pytest
+from starlette.testclient import TestClient
+
+from shortener.app import app, fast_app
+from shortener.ratelimit import REDIRECT_BUDGET, WRITE_BUDGET, RateLimiter, TokenBuckets, budget_for
+
+
+def test_bucket_refills_at_rate() -> None:
+    """Test that a client gets its burst at once and one token per 1/rate seconds after that."""
+    buckets = TokenBuckets(per_minute=60, burst=3)
+
+    assert [buckets.take("a", now=0.0) for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert buckets.take("a", now=0.0) == pytest.approx(1.0)
+    assert buckets.take("a", now=0.5) == pytest.approx(0.5)
+    assert buckets.take("a", now=1.0) == 0.0
+    assert buckets.take("b", now=1.0) == 0.0
+    assert buckets.rejected == 2
+
+
+def test_idle_buckets_are_evicted() -> None:
+    """Test that only buckets which have refilled completely are dropped."""
+    buckets = TokenBuckets(per_minute=60, burst=10)
+    buckets.take("idle", now=0.0)
+    buckets.take("busy", now=5.0)
+
+    assert buckets.evict_idle(now=10.0) == 1
+    assert len(buckets) == 1
+    assert buckets.evict_idle(now=15.0) == 1
+    assert len(buckets) == 0
+
+
+@pytest.mark.parametrize(
+    "method,path,budget",
+    [
+        ("GET", "/abc", REDIRECT_BUDGET),
+        ("GET", "/status", None),
+        ("GET", "/urls/abc", None),
+        ("POST", "/urls/", WRITE_BUDGET),
+        ("PUT", "/urls/abc", WRITE_BUDGET),
+        ("DELETE", "/urls/abc", WRITE_BUDGET),
+        ("POST", "/abc", None),
+    ],
+)
+def test_budget_for(method: str, path: str, budget: str | None) -> None:
+    """Test which requests are charged to which budget."""
+    assert budget_for(method, path) == budget
+
+
+def test_bucket_count_is_capped() -> None:
+    """Test that new clients past max_clients replace the least recently used bucket."""
+    buckets = TokenBuckets(per_minute=60, burst=1, max_clients=2)
+    buckets.take("a", now=0.0)
+    buckets.take("b", now=0.0)
+    buckets.take("a", now=0.1)
+
+    buckets.take("c", now=0.2)
+    assert len(buckets) == 2
+    assert buckets.evicted == 1
+    assert buckets.take("a", now=0.3) > 0
+    assert buckets.take("b", now=0.3) == 0.0
+
+
+def test_client_key_prefers_known_api_key() -> None:
+    """Test that requests are keyed by a known API key when one is sent and by client IP otherwise."""
+    limiter = RateLimiter(redirects_per_minute=10, writes_per_minute=10, api_keys=["k1"])
+    assert limiter.client_key({"headers": [(b"x-api-key", b"k1")], "client": ("10.0.0.1", 1)}) == "key:k1"
+    assert limiter.client_key({"headers": [(b"x-api-key", b"made-up")], "client": ("10.0.0.1", 1)}) == "ip:10.0.0.1"
+    assert limiter.client_key({"headers": [], "client": ("10.0.0.1", 1)}) == "ip:10.0.0.1"
+
+
+@pytest.mark.parametrize("asgi_app", [app, fast_app])
+def test_clients_over_budget_get_429(test_client: TestClient, monkeypatch, asgi_app) -> None:
+    """Test that redirects and writes have separate budgets on both the app and the fast path."""
+    monkeypatch.setattr(
+        app.state,
+        "rate_limiter",
+        RateLimiter(redirects_per_minute=2, writes_per_minute=1, api_keys=["partner"]),
+        raising=False,
+    )
+    client = TestClient(asgi_app)
+
+    assert [client.get("/abc", follow_redirects=False).status_code for _ in range(3)] == [307, 307, 429]
+    response = client.get("/abc", follow_redirects=False)
+    assert response.json() == {"error": "Too many requests", "detail": "Rate limit exceeded"}
+    assert int(response.headers["retry-after"]) >= 1
+    assert client.get("/abc", headers={"X-API-Key": "partner"}, follow_redirects=False).status_code == 307
+    assert client.get("/abc", headers={"X-API-Key": "random"}, follow_redirects=False).status_code == 429
+
+    assert client.get("/status").status_code == 200
+    assert client.put("/urls/abc", json={"target_url": "https://example.com/1"}).status_code == 200
+    assert client.put("/urls/abc", json={"target_url": "https://example.com/2"}).status_code == 429
+    assert 'shortener_rate_limited_total{budget="redirect"} 3' in client.get("/metrics").text
@@ -0,0 +1,29 @@
+import pytest
+
+from shortener.redirects import RedirectPolicy
+
+
+def test_default_policy() -> None:
+    """Test that by default temporary redirects are not cached and permanent ones are for a day."""
+    policy = RedirectPolicy()
+    assert policy.status_of(None) == 307
+    assert policy.status_of(301) == 301
+    assert policy.cache_control(307) == "no-cache"
+    assert policy.cache_control(301) == "public, max-age=86400"
+    assert policy.cached_for(None) == 0
+    assert policy.cached_for(308) == 86400
+
+
+def test_stale_while_revalidate() -> None:
+    """Test that stale-while-revalidate is only sent with, and added to, a non-zero max-age."""
+    policy = RedirectPolicy(status=302, max_age=300, permanent_max_age=0, stale_while_revalidate=60)
+    assert policy.cache_control(302) == "public, max-age=300, stale-while-revalidate=60"
+    assert policy.cache_control(308) == "no-cache"
+    assert policy.cached_for(None) == 360
+    assert policy.cached_for(308) == 0
+
+
+def test_rejects_other_statuses() -> None:
+    """Test that the default status must be a redirect."""
+    with pytest.raises(ValueError):
+        RedirectPolicy(status=303)
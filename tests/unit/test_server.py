@@ -0,0 +1,27 @@
+from shortener.server import uvicorn_options
+from shortener.settings import AppSettings, PostgresSettings
+
+
+def test_pool_divided_between_workers() -> None:
+    """Test that the connection budget is split across worker processes."""
+    settings = PostgresSettings()
+    settings.min_size, settings.max_size = 4, 32
+
+    per_worker = settings.per_worker(16)
+    assert (per_worker.min_size, per_worker.max_size) == (1, 2)
+    assert settings.per_worker(1) is settings
+
+
+def test_uvicorn_options_from_env(monkeypatch) -> None:
+    """Test that uvicorn tuning options come from APP_ environment variables."""
+    monkeypatch.setenv("APP_BACKLOG", "4096")
+    monkeypatch.setenv("APP_LIMIT_CONCURRENCY", "1000")
+    monkeypatch.setenv("APP_HTTP_PARSER", "httptools")
+
+    options = uvicorn_options(AppSettings())
+    assert options["backlog"] == 4096
+    assert options["limit_concurrency"] == 1000
+    assert options["http"] == "httptools"
+
+    monkeypatch.delenv("APP_LIMIT_CONCURRENCY")
+    assert uvicorn_options(AppSettings())["limit_concurrency"] is None
@@ -0,0 +1,105 @@
+import asyncio
+import time
+
+import pytest
+from starlette.testclient import TestClient
+
+from shortener.app import app, fast_app, run_periodically
+from shortener.settings import AppSettings
+from shortener.shedding import API_PRIORITY, BULK_PRIORITY, LoadShedder, priority_of
+
+
+@pytest.mark.parametrize(
+    "method,path,priority",
+    [
+        ("GET", "/abc", None),
+        ("GET", "/status", None),
+        ("GET", "/urls/", BULK_PRIORITY),
+        ("GET", "/urls/export", BULK_PRIORITY),
+        ("GET", "/urls/abc/stats", BULK_PRIORITY),
+        ("POST", "/urls/bulk", BULK_PRIORITY),
+        ("POST", "/urls/", API_PRIORITY),
+        ("PUT", "/urls/abc", API_PRIORITY),
+        ("GET", "/urls/abc", API_PRIORITY),
+    ],
+)
+def test_priority_of(method: str, path: str, priority: str | None) -> None:
+    """Test which requests may be shed, and in which order."""
+    assert priority_of(method, path) == priority
+
+
+def test_bulk_is_shed_before_api() -> None:
+    """Test that bulk requests are shed at pressure 1 and API requests only at api_pressure."""
+    shedder = LoadShedder(max_loop_lag=0.1, api_pressure=2.0, hold=1.0)
+
+    shedder.observe(0.01, {}, now=0.0)
+    assert shedder.shed(BULK_PRIORITY) == 0.0
+
+    shedder.observe(0.15, {}, now=1.0)
+    assert shedder.shed(BULK_PRIORITY) == 1.0
+    assert shedder.shed(API_PRIORITY) == 0.0
+
+    shedder.observe(0.25, {}, now=1.1)
+    assert shedder.shed(API_PRIORITY) == 1.0
+    assert shedder.stats()["shed_bulk"] == 1
+    assert shedder.stats()["shed_api"] == 1
+
+
+def test_pressure_is_held() -> None:
+    """Test that a spike keeps shedding for hold seconds, then the pressure follows the samples."""
+    shedder = LoadShedder(max_loop_lag=0.1, hold=1.0)
+    shedder.observe(0.3, {}, now=0.0)
+    shedder.observe(0.0, {}, now=0.5)
+    assert shedder.pressure == pytest.approx(3.0)
+    shedder.observe(0.0, {}, now=1.0)
+    assert shedder.pressure == 0.0
+
+
+def test_pool_signals() -> None:
+    """Test that queued connection requests and slow checkouts raise the pressure."""
+    shedder = LoadShedder(max_pool_waiting=10, max_checkout_wait=0.1, hold=0.0)
+    shedder.observe(0.0, {"primary": {"requests_num": 100, "requests_wait_ms": 0}}, now=0.0)
+
+    shedder.observe(0.0, {"primary": {"requests_num": 110, "requests_wait_ms": 500, "requests_waiting": 5}}, now=1.0)
+    assert shedder.checkout_wait == pytest.approx(0.05)
+    assert shedder.pressure == pytest.approx(0.5)
+
+    shedder.observe(0.0, {"primary": {"requests_num": 120, "requests_wait_ms": 3500, "requests_waiting": 5}}, now=2.0)
+    assert shedder.pressure == pytest.approx(3.0)
+
+
+async def test_sampler_measures_loop_lag() -> None:
+    """Test that a blocked event loop shows up as lag."""
+    shedder = LoadShedder(max_loop_lag=0.01)
+    task = asyncio.create_task(run_periodically("load sampling", lambda: shedder.sample(0.01), 0.01))
+    await asyncio.sleep(0.015)
+    time.sleep(0.05)
+    await asyncio.sleep(0.02)
+    task.cancel()
+    assert shedder.pressure >= 3
+    assert shedder.shed(BULK_PRIORITY)
+
+
+def test_thresholds_must_be_positive(monkeypatch) -> None:
+    """Test that a zero threshold is rejected instead of dividing by it later."""
+    with pytest.raises(ValueError):
+        LoadShedder(max_pool_waiting=0)
+    monkeypatch.setenv("APP_SHED_MAX_LOOP_LAG", "0")
+    with pytest.raises(ValueError):
+        AppSettings()
+
+
+@pytest.mark.parametrize("asgi_app", [app, fast_app])
+def test_overloaded_app_sheds_but_redirects(test_client: TestClient, monkeypatch, asgi_app) -> None:
+    """Test that an overloaded worker answers bulk requests with 503 and keeps redirecting."""
+    shedder = LoadShedder(max_loop_lag=0.1)
+    shedder.observe(0.15, {})
+    monkeypatch.setattr(app.state, "load_shedder", shedder, raising=False)
+    client = TestClient(asgi_app)
+
+    response = client.get("/urls/")
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
+    assert client.put("/urls/abc", json={"target_url": "https://example.com/1"}).status_code == 200
+    assert client.get("/abc", follow_redirects=False).status_code == 307
+    assert 'shortener_shed_requests_total{priority="bulk"} 1' in client.get("/metrics").text
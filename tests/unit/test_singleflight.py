@@ -0,0 +1,78 @@
+import asyncio
+
+import pytest
+from starlette.exceptions import HTTPException
+
+from shortener.actions import get_url_target
+from shortener.singleflight import SingleFlight
+from shortener.storage import MemoryStorage, StorageError, TargetRow
+
+
+class SlowStorage(MemoryStorage):
+    """In-memory storage whose lookups take a while and are counted."""
+
+    def __init__(self, error: Exception | None = None) -> None:
+        super().__init__()
+        self.error = error
+        self.lookups = 0
+
+    async def get_target(self, url_key: str, consistent: bool = False) -> TargetRow | None:
+        self.lookups += 1
+        await asyncio.sleep(0.01)
+        if self.error is not None:
+            raise self.error
+        return await super().get_target(url_key, consistent)
+
+
+async def test_concurrent_lookups_share_one_query() -> None:
+    """Test that concurrent lookups of one key run a single query."""
+    storage = SlowStorage()
+    await storage.create("viral", "https://example.com/viral")
+    await storage.create("other", "https://example.com/other")
+    coalescer = SingleFlight()
+
+    targets = await asyncio.gather(
+        *(get_url_target("viral", storage, coalescer=coalescer) for _ in range(50)),
+        get_url_target("other", storage, coalescer=coalescer),
+    )
+
+    assert targets == ["https://example.com/viral"] * 50 + ["https://example.com/other"]
+    assert storage.lookups == 2
+    assert coalescer.stats() == {"executed": 2, "coalesced": 49, "in_flight": 0}
+
+
+async def test_waiters_share_the_exception() -> None:
+    """Test that every waiter sees the error of the shared query."""
+    storage = SlowStorage(error=StorageError("down"))
+    coalescer = SingleFlight()
+
+    results = await asyncio.gather(
+        *(get_url_target("viral", storage, coalescer=coalescer) for _ in range(5)), return_exceptions=True
+    )
+
+    assert all(isinstance(result, HTTPException) and result.status_code == 503 for result in results)
+    assert storage.lookups == 1
+
+
+async def test_cancelled_caller_does_not_cancel_query() -> None:
+    """Test that cancelling the first caller leaves the shared call running for the others."""
+    coalescer = SingleFlight()
+    calls = 0
+
+    async def lookup() -> str:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return "target"
+
+    first = asyncio.create_task(coalescer.do("key", lookup))
+    await asyncio.sleep(0)
+    second = asyncio.create_task(coalescer.do("key", lookup))
+    await asyncio.sleep(0)
+    first.cancel()
+
+    assert await second == "target"
+    with pytest.raises(asyncio.CancelledError):
+        await first
+    assert calls == 1
+    assert len(coalescer) == 0
@@ -0,0 +1,105 @@
+import os
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import pytest
+
+from shortener import snapshot
+from shortener.snapshot import Snapshot, SnapshotError, SnapshotStorage, SnapshotWriter, export_snapshot
+from shortener.storage import MemoryStorage, StorageError
+
+
+def _write(path: Path, links: dict[str, str]) -> int:
+    with SnapshotWriter(str(path)) as writer:
+        for url_key, target in links.items():
+            writer.add(url_key, target)
+        return writer.finish()
+
+
+def test_lookup(tmp_path: Path) -> None:
+    """Test that every key written can be found and unknown keys cannot."""
+    links = {f"k{i}": f"https://example.com/{i}" for i in range(1000)}
+    links["ünï"] = "https://example.com/ü"
+    path = tmp_path / "links.snap"
+    assert _write(path, links) == len(links)
+
+    loaded = Snapshot(str(path))
+    assert loaded.count == len(links)
+    assert all(loaded.get(url_key) == target for url_key, target in links.items())
+    assert loaded.get("missing") is None
+    loaded.close()
+    assert sorted(os.listdir(tmp_path)) == ["links.snap"]
+
+
+def test_hash_collisions(tmp_path: Path, monkeypatch) -> None:
+    """Test that keys sharing a hash are told apart by their bytes."""
+    monkeypatch.setattr(snapshot, "key_hash", lambda url_key: 42)
+    path = tmp_path / "links.snap"
+    _write(path, {"a": "https://example.com/a", "b": "https://example.com/b"})
+
+    loaded = Snapshot(str(path))
+    assert loaded.get("a") == "https://example.com/a"
+    assert loaded.get("b") == "https://example.com/b"
+    assert loaded.get("c") is None
+    loaded.close()
+
+
+def test_rejects_other_files(tmp_path: Path) -> None:
+    """Test that a file that is not a snapshot is refused."""
+    path = tmp_path / "links.snap"
+    path.write_bytes(b"short_url,target_url\n" * 10)
+    with pytest.raises(SnapshotError):
+        Snapshot(str(path))
+
+
+async def test_storage_reloads_replaced_file(tmp_path: Path) -> None:
+    """Test that a snapshot renamed over the served one is picked up by reload()."""
+    path = tmp_path / "links.snap"
+    _write(path, {"abc": "https://example.com/old"})
+    storage = SnapshotStorage(str(path))
+    await storage.connect()
+
+    assert await storage.get_target("abc") == ("https://example.com/old", None, None)
+    assert not await storage.reload()
+
+    _write(path, {"abc": "https://example.com/new", "def": "https://example.com/def"})
+    assert await storage.reload()
+    assert await storage.get_target("abc") == ("https://example.com/new", None, None)
+    assert await storage.get_target("def") == ("https://example.com/def", None, None)
+
+    with pytest.raises(StorageError):
+        await storage.create("ghi", "https://example.com/ghi")
+    await storage.disconnect()
+
+
+async def test_export_from_storage(tmp_path: Path) -> None:
+    """Test exporting the links of a storage backend."""
+    source = MemoryStorage()
+    await source.bulk_create([("a", "https://example.com/a"), ("b", "https://example.com/b")])
+    path = tmp_path / "links.snap"
+
+    assert await export_snapshot(source, str(path)) == 2
+    assert Snapshot(str(path)).get("b") == "https://example.com/b"
+
+
+async def test_expiry_and_redirect_status(tmp_path: Path) -> None:
+    """Test that a snapshot keeps each link's redirect status and hides links once they expire."""
+    source = MemoryStorage()
+    later = datetime.now(timezone.utc) + timedelta(hours=1)
+    await source.create("perm", "https://example.com/perm", redirect_status=308, expires_at=later)
+    await source.create("plain", "https://example.com/plain")
+    path = tmp_path / "links.snap"
+    await export_snapshot(source, str(path))
+
+    with SnapshotWriter(str(tmp_path / "expired.snap")) as writer:
+        writer.add("old", "https://example.com/old", expires_at=datetime.now(timezone.utc) - timedelta(seconds=1))
+        writer.finish()
+
+    storage = SnapshotStorage(str(path))
+    await storage.connect()
+    target, expires_at, redirect_status = await storage.get_target("perm")
+    assert (target, redirect_status) == ("https://example.com/perm", 308)
+    assert abs((expires_at - later).total_seconds()) < 0.001
+    assert await storage.get_target("plain") == ("https://example.com/plain", None, None)
+    await storage.disconnect()
+    assert Snapshot(str(tmp_path / "expired.snap")).get("old") is None
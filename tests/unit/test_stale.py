@@ -0,0 +1,53 @@
+from datetime import datetime, timedelta, timezone
+
+from shortener.stale import StaleCache
+
+
+def test_remember_and_forget() -> None:
+    """Test that remembered targets are served until forgotten or expired, oldest evicted first."""
+    stale = StaleCache(max_size=2)
+    stale.remember("a", "https://example.com/a")
+    stale.remember("b", "https://example.com/b", redirect_status=301)
+    stale.remember("gone", "https://example.com/gone", expires_at=datetime.now(timezone.utc) - timedelta(seconds=1))
+
+    assert stale.get_redirect("a") is None
+    assert stale.get_redirect("b") == ("https://example.com/b", 301)
+    assert stale.get_redirect("gone") is None
+    assert len(stale) == 1
+
+    stale.forget("b")
+    assert stale.get_redirect("b") is None
+    assert stale.served == 1
+
+
+def test_save_and_load(tmp_path) -> None:
+    """Test that a saved cache loads back with its expiry and LRU order."""
+    path = str(tmp_path / "stale.jsonl")
+    later = datetime.now(timezone.utc) + timedelta(hours=1)
+    stale = StaleCache()
+    stale.remember("a", "https://example.com/a", expires_at=later)
+    stale.remember("b", "https://example.com/b", redirect_status=308)
+    assert stale.save(path) == 2
+    with open(path, "a", encoding="utf-8") as f:
+        f.write("not json\n")
+
+    loaded = StaleCache(max_size=1)
+    assert loaded.load(path) == 2
+    assert loaded.items() == [("b", "https://example.com/b", 308, None)]
+    assert StaleCache().load(str(tmp_path / "missing.jsonl")) == 0
+
+    loaded = StaleCache()
+    loaded.load(path)
+    assert loaded.items()[0] == ("a", "https://example.com/a", None, later.timestamp())
+
+
+def test_served_entry_becomes_most_recent() -> None:
+    """Test that serving a stale entry protects it from eviction."""
+    stale = StaleCache(max_size=2)
+    stale.remember("a", "https://example.com/a")
+    stale.remember("b", "https://example.com/b")
+
+    assert stale.get_redirect("a") == ("https://example.com/a", None)
+    stale.remember("c", "https://example.com/c")
+    assert stale.get_redirect("a") is not None
+    assert stale.get_redirect("b") is None
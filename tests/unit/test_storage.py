@@ -0,0 +1,222 @@
+import asyncio
+import contextlib
+import sqlite3
+import time
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from starlette.exceptions import HTTPException
+from starlette.testclient import TestClient
+
+from shortener.actions import get_short_urls_page, get_url_target, sweep_expired_urls
+from shortener.cache import UrlCache
+from shortener.settings import AppSettings
+from shortener.sqlite_storage import SqliteStorage
+from shortener.database import Database
+from shortener.storage import MemoryStorage, PostgresStorage, Storage, StorageError, create_storage
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+async def storage(request, tmp_path) -> AsyncIterator[Storage]:
+    """Provide a connected, empty store of each local backend."""
+    store: Storage = MemoryStorage() if request.param == "memory" else SqliteStorage(str(tmp_path / "urls.db"))
+    await store.connect()
+    yield store
+    await store.disconnect()
+
+
+async def test_crud(storage: Storage) -> None:
+    """Test creating, reading, updating and deleting one mapping."""
+    assert await storage.ping()
+    assert await storage.create("abc", "https://example.com/1")
+    assert not await storage.create("abc", "https://example.com/2")
+    assert await storage.get_target("abc") == ("https://example.com/1", None, None)
+
+    assert await storage.update("abc", "https://example.com/3", redirect_status=308) == (
+        "https://example.com/1",
+        None,
+        None,
+    )
+    assert await storage.update("abc", "https://example.com/3") == ("https://example.com/3", None, 308)
+    assert await storage.get_target("abc") == ("https://example.com/3", None, None)
+    assert not await storage.update("missing", "https://example.com/4")
+
+    assert await storage.delete("abc")
+    assert not await storage.delete("abc")
+    assert await storage.get_target("abc") is None
+
+
+async def test_bulk_create_skips_existing_keys(storage: Storage) -> None:
+    """Test that bulk creation keeps existing keys and the first occurrence of duplicates."""
+    await storage.create("a", "https://example.com/old")
+
+    created = await storage.bulk_create(
+        [("a", "https://example.com/new"), ("b", "https://example.com/b1"), ("b", "https://example.com/b2")]
+    )
+
+    assert created == {"b"}
+    assert await storage.get_target("a") == ("https://example.com/old", None, None)
+    assert await storage.get_target("b") == ("https://example.com/b1", None, None)
+
+
+async def test_keyset_pages_cover_all_rows(storage: Storage) -> None:
+    """Test that following the page cursor returns every row once, newest first."""
+    keys = [f"k{i}" for i in range(7)]
+    for key in keys:
+        await storage.create(key, f"https://example.com/{key}")
+
+    seen = []
+    after = None
+    while True:
+        page, after = await get_short_urls_page(storage, limit=3, after=after)
+        seen.extend(url["short_url"] for url in page)
+        if after is None:
+            break
+
+    assert seen == keys[::-1]
+    assert [row[0] async for row in storage.iter_rows(batch_size=2)] == keys
+    assert [row[0] async for row in storage.iter_rows(batch_size=2, newest_first=True)] == keys[::-1]
+
+
+async def test_cursor_with_offset_pages_correctly(storage: Storage) -> None:
+    """Test that a page cursor with a UTC offset, as decoded from a URL, finds the same position."""
+    for key in ("k0", "k1", "k2"):
+        await storage.create(key, f"https://example.com/{key}")
+    row_id, _, _, created_at = (await storage.list_page(1))[0]
+
+    after = (created_at.astimezone(timezone(timedelta(hours=5))), row_id)
+    assert [row[1] for row in await storage.list_page(10, after=after)] == ["k1", "k0"]
+    assert [row[1] for row in await storage.list_page(10, after=(created_at, row_id))] == ["k1", "k0"]
+
+
+async def test_expired_links_are_hidden_and_swept(storage: Storage) -> None:
+    """Test that expired links are not served and are deleted by the sweeper in batches."""
+    past = datetime.now(timezone.utc) - timedelta(minutes=1)
+    future = datetime.now(timezone.utc) + timedelta(hours=1)
+    for i in range(5):
+        await storage.create(f"old{i}", "https://example.com/old", expires_at=past)
+    await storage.create("soon", "https://example.com/soon", expires_at=future)
+    await storage.create("kept", "https://example.com/kept")
+
+    assert await storage.get_target("old0") is None
+    assert not await storage.update("old0", "https://example.com/revived")
+    target, expires_at, _ = await storage.get_target("soon")
+    assert target == "https://example.com/soon"
+    assert abs((expires_at - future).total_seconds()) < 1
+    assert [row[0] async for row in storage.iter_rows()] == ["soon", "kept"]
+
+    cache = UrlCache(max_size=10, ttl=60.0)
+    cache.set("old1", "https://example.com/old")
+    assert await sweep_expired_urls(storage, cache=cache, batch_size=2, max_batches=2) == 4
+    assert await sweep_expired_urls(storage, cache=cache, batch_size=2) == 1
+    assert cache.get("old1") is None
+    assert not await storage.create("soon", "https://example.com/other")
+    assert await storage.create("old0", "https://example.com/reused")
+
+
+async def test_cache_entry_ends_with_link(storage: Storage) -> None:
+    """Test that a link about to expire is cached only until it does."""
+    await storage.create(
+        "brief", "https://example.com/brief", expires_at=datetime.now(timezone.utc) + timedelta(seconds=5)
+    )
+    cache = UrlCache(max_size=10, ttl=60.0)
+
+    assert await get_url_target("brief", storage, cache=cache) == "https://example.com/brief"
+    _, deadline, _ = cache._entries["brief"]
+    assert deadline < time.monotonic() + 6
+
+    with pytest.raises(HTTPException) as exc_info:
+        await get_url_target("missing", storage)
+    assert exc_info.value.status_code == 404
+
+
+def test_create_storage_rejects_unknown_backend(monkeypatch) -> None:
+    """Test backend selection from APP_STORAGE_BACKEND."""
+    monkeypatch.setenv("APP_STORAGE_BACKEND", "memory")
+    assert isinstance(create_storage(AppSettings()), MemoryStorage)
+
+    monkeypatch.setenv("APP_STORAGE_BACKEND", "postgres")
+    with pytest.raises(ValueError):
+        create_storage(AppSettings())
+
+    monkeypatch.setenv("APP_STORAGE_BACKEND", "redis")
+    with pytest.raises(ValueError):
+        create_storage(AppSettings())
+
+
+def test_app_on_memory_storage(test_client: TestClient) -> None:
+    """Test the endpoints without a Postgres database."""
+    app = test_client.app
+    app.state.db = None  # type: ignore[attr-defined]
+    app.state.storage = MemoryStorage()  # type: ignore[attr-defined]
+
+    response = test_client.post("/urls/", json={"short_url": "mem", "target_url": "https://example.com/mem"})
+    assert response.status_code == 201
+    response = test_client.get("/mem", follow_redirects=False)
+    assert response.headers["location"] == "https://example.com/mem"
+    assert test_client.get("/status").json() == {"db_up": "true", "ready": "true"}
+
+    response = test_client.get("/urls/export?format=csv")
+    lines = response.text.splitlines()
+    assert lines[0] == "short_url,target_url,created_at"
+    assert lines[1].startswith("mem,https://example.com/mem,")
+
+
+async def test_sqlite_write_waits_for_lock_without_blocking_loop(tmp_path) -> None:
+    """Test that a write blocked by another process's lock yields to the event loop, up to busy_timeout."""
+    path = str(tmp_path / "urls.db")
+    storage = SqliteStorage(path, busy_timeout=0.2)
+    await storage.connect()
+    other = sqlite3.connect(path, isolation_level=None)
+    other.execute("BEGIN IMMEDIATE")
+
+    ticks = 0
+
+    async def tick() -> None:
+        nonlocal ticks
+        while True:
+            ticks += 1
+            await asyncio.sleep(0.001)
+
+    ticker = asyncio.create_task(tick())
+    create = asyncio.create_task(storage.create("abc", "https://example.com"))
+    await asyncio.sleep(0.05)
+    assert not create.done() and ticks > 5
+    other.execute("COMMIT")
+    assert await create
+    assert await storage.get_target("abc") == ("https://example.com", None, None)
+
+    other.execute("BEGIN IMMEDIATE")
+    with pytest.raises(StorageError):
+        await storage.delete("abc")
+    other.execute("ROLLBACK")
+    ticker.cancel()
+    other.close()
+    await storage.disconnect()
+
+
+async def test_postgres_sweep_deletes_click_buckets_in_chunks() -> None:
+    """Test that the click buckets of a claimed batch are deleted limit rows at a time before the links."""
+    db = AsyncMock(spec=Database)
+    bucket_rowcounts = iter([2, 2, 1])
+    statements: list[str] = []
+
+    class FakeConnection:
+        async def execute(self, query, params=None):
+            statements.append(" ".join(query.split()[:3]))
+            result = MagicMock()
+            result.rowcount = next(bucket_rowcounts) if "url_hit_buckets" in query.split()[2] else 2
+            result.fetchall = AsyncMock(return_value=[("a",), ("b",)])
+            return result
+
+    @contextlib.asynccontextmanager
+    async def get_connection(replica: bool = False):
+        yield FakeConnection()
+
+    db.get_connection.side_effect = get_connection
+
+    assert await PostgresStorage(db).delete_expired(2) == ["a", "b"]
+    assert statements == (["SELECT url_key FROM"] + ["DELETE FROM url_hit_buckets"] * 3 + ["DELETE FROM short_urls"])
+    assert db.get_connection.call_count == 1